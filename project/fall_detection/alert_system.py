@@ -1,15 +1,23 @@
 """
 预警系统模块
 支持短信和邮箱预警功能
+
+预警通过 AlertManager 的派发队列由固定数量的工作线程发送，
+检测线程只负责入队，不会被网络请求阻塞；发送失败时按指数退避重试
+
+逐帧的摔倒判定先经过 IncidentAggregator：连续的摔倒帧合并为一个事件，
+冷却按事件键（摄像头/跟踪目标）分别计算，短时间内的多个事件合并为一条摘要发送
 """
 
 import smtplib
 import threading
 import time
+import queue
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Hashable, Optional
 import cv2
 import numpy as np
 import os
@@ -19,14 +27,29 @@ import json
 class AlertSystem:
     """预警系统基类"""
     
-    def __init__(self):
-        self.alert_history = []
+    def __init__(self, history_size: int = 500, max_retries: int = 3, retry_backoff: float = 1.0):
+        """
+        Args:
+            history_size: 保留的预警历史条数，超出后丢弃最旧的记录
+            max_retries: 发送失败后的最大重试次数
+            retry_backoff: 首次重试前的等待时间（秒），之后每次翻倍
+        """
+        self.alert_history = deque(maxlen=history_size)
         self.is_enabled = True
         self.alert_cooldown = 60  # 预警冷却时间（秒）
         self.last_alert_time = 0
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = 30.0
+        self.sent_count = 0
+        self.failed_count = 0
+        # 同一通道对连接/会话的使用串行执行（SMTP会话不是线程安全的）
+        self._send_lock = threading.Lock()
+        # 保护冷却判断、计数和历史记录
+        self._state_lock = threading.Lock()
         
     def send_alert(self, message: str, image: Optional[np.ndarray] = None, 
-                   alert_type: str = "fall_detection") -> bool:
+                   alert_type: str = "fall_detection", use_cooldown: bool = True) -> bool:
         """
         发送预警
         
@@ -34,6 +57,7 @@ class AlertSystem:
             message: 预警消息
             image: 预警图像（可选）
             alert_type: 预警类型
+            use_cooldown: 是否检查通道的全局冷却（已由IncidentAggregator按事件冷却的摘要不再检查）
             
         Returns:
             是否发送成功
@@ -41,27 +65,49 @@ class AlertSystem:
         if not self.is_enabled:
             return False
         
-        # 检查冷却时间
+        # 检查冷却时间，通过后先占用冷却窗口，避免并发的预警同时通过检查
         current_time = time.time()
-        if current_time - self.last_alert_time < self.alert_cooldown:
-            return False
+        with self._state_lock:
+            previous_alert_time = self.last_alert_time
+            if use_cooldown:
+                if current_time - self.last_alert_time < self.alert_cooldown:
+                    return False
+                self.last_alert_time = current_time
         
         # 记录预警历史
         alert_record = {
             'timestamp': datetime.now().isoformat(),
             'type': alert_type,
             'message': message,
-            'success': False
+            'success': False,
+            'attempts': 0
         }
         
-        # 发送预警
-        success = self._send_alert_impl(message, image, alert_type)
+        # 发送预警，失败时指数退避重试；只在使用会话时持锁，退避等待不阻塞其他工作线程
+        success = False
+        for attempt in range(self.max_retries + 1):
+            alert_record['attempts'] = attempt + 1
+            try:
+                with self._send_lock:
+                    success = self._send_alert_impl(message, image, alert_type)
+            except Exception as e:
+                print(f"预警发送异常: {e}")
+                success = False
+            if success or attempt == self.max_retries:
+                break
+            time.sleep(min(self.retry_backoff * (2 ** attempt), self.max_backoff))
         alert_record['success'] = success
         
-        if success:
-            self.last_alert_time = current_time
-        
-        self.alert_history.append(alert_record)
+        with self._state_lock:
+            if success:
+                self.last_alert_time = max(self.last_alert_time, current_time)
+                self.sent_count += 1
+            else:
+                # 发送失败时归还占用的冷却窗口
+                if use_cooldown and self.last_alert_time == current_time:
+                    self.last_alert_time = previous_alert_time
+                self.failed_count += 1
+            self.alert_history.append(alert_record)
         return success
     
     def _send_alert_impl(self, message: str, image: Optional[np.ndarray], 
@@ -71,7 +117,7 @@ class AlertSystem:
     
     def get_alert_history(self) -> List[Dict[str, Any]]:
         """获取预警历史"""
-        return self.alert_history.copy()
+        return list(self.alert_history)
     
     def clear_alert_history(self):
         """清空预警历史"""
@@ -88,18 +134,68 @@ class AlertSystem:
     def disable(self):
         """禁用预警系统"""
         self.is_enabled = False
+    
+    def close(self):
+        """释放连接等资源（子类按需重写）"""
+        pass
 
 class EmailAlertSystem(AlertSystem):
     """邮箱预警系统"""
     
-    def __init__(self, smtp_server: str = "smtp.gmail.com", smtp_port: int = 587):
-        super().__init__()
+    def __init__(self, smtp_server: str = "smtp.gmail.com", smtp_port: int = 587, use_tls: bool = True,
+                 session_idle_timeout: float = 120.0, **kwargs):
+        """
+        Args:
+            smtp_server: SMTP服务器地址
+            smtp_port: SMTP端口
+            use_tls: 是否使用STARTTLS（本地测试服务器可关闭）
+            session_idle_timeout: SMTP会话空闲超过该时间后重新连接（服务器通常会断开空闲连接）
+        """
+        super().__init__(**kwargs)
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
+        self.use_tls = use_tls
+        self.session_idle_timeout = session_idle_timeout
         self.sender_email = None
         self.sender_password = None
         self.recipient_emails = []
         self.is_configured = False
+        # 复用的SMTP会话
+        self._smtp = None
+        self._smtp_last_used = 0.0
+        self.connections_opened = 0
+    
+    def _open_session(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.use_tls:
+            server.starttls()
+        if self.sender_password:
+            server.login(self.sender_email, self.sender_password)
+        self.connections_opened += 1
+        return server
+    
+    def _get_session(self) -> smtplib.SMTP:
+        """返回可用的SMTP会话，空闲过久或已断开时重新连接"""
+        if self._smtp is not None and time.time() - self._smtp_last_used > self.session_idle_timeout:
+            self._close_session()
+        if self._smtp is None:
+            self._smtp = self._open_session()
+        self._smtp_last_used = time.time()
+        return self._smtp
+    
+    def _close_session(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._smtp = None
+    
+    def close(self):
+        """关闭复用的SMTP会话"""
+        with self._send_lock:
+            self._close_session()
     
     def configure(self, sender_email: str, sender_password: str, 
                  recipient_emails: List[str]):
@@ -111,10 +207,14 @@ class EmailAlertSystem(AlertSystem):
             sender_password: 发送者密码（应用专用密码）
             recipient_emails: 接收者邮箱列表
         """
-        self.sender_email = sender_email
-        self.sender_password = sender_password
-        self.recipient_emails = recipient_emails
-        self.is_configured = True
+        # 与发送互斥：工作线程可能正在使用旧会话
+        with self._send_lock:
+            self.sender_email = sender_email
+            self.sender_password = sender_password
+            self.recipient_emails = recipient_emails
+            self.is_configured = True
+            # 账号变化后旧会话不再可用
+            self._close_session()
         print("邮箱预警系统配置完成")
     
     def _send_alert_impl(self, message: str, image: Optional[np.ndarray], 
@@ -143,35 +243,25 @@ class EmailAlertSystem(AlertSystem):
             """
             msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
             
-            # 添加图像附件（如果有）
+            # 添加图像附件（如果有），直接在内存中编码，不写临时文件
             if image is not None:
-                # 保存图像到临时文件
-                temp_image_path = f"temp_alert_image_{int(time.time())}.jpg"
-                cv2.imwrite(temp_image_path, image)
-                
-                with open(temp_image_path, 'rb') as f:
-                    img_data = f.read()
-                
-                image_attachment = MIMEImage(img_data)
-                image_attachment.add_header('Content-Disposition', 'attachment', 
-                                          filename=f"fall_detection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
-                msg.attach(image_attachment)
-                
-                # 删除临时文件
-                os.remove(temp_image_path)
-            
-            # 发送邮件
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.sender_password)
+                ok, encoded = cv2.imencode('.jpg', image)
+                if ok:
+                    image_attachment = MIMEImage(encoded.tobytes())
+                    image_attachment.add_header('Content-Disposition', 'attachment', 
+                                              filename=f"fall_detection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
+                    msg.attach(image_attachment)
             
+            # 复用SMTP会话发送邮件
+            server = self._get_session()
             server.send_message(msg)
-            server.quit()
             
             print(f"邮箱预警发送成功: {message}")
             return True
             
         except Exception as e:
+            # 连接可能已失效，丢弃会话，重试时重新连接
+            self._close_session()
             print(f"邮箱预警发送失败: {e}")
             return False
     
@@ -181,9 +271,7 @@ class EmailAlertSystem(AlertSystem):
             return False
         
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.sender_password)
+            server = self._open_session()
             server.quit()
             print("邮箱连接测试成功")
             return True
@@ -194,8 +282,8 @@ class EmailAlertSystem(AlertSystem):
 class SMSAlertSystem(AlertSystem):
     """短信预警系统（使用第三方服务）"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         self.api_key = None
         self.api_secret = None
         self.phone_numbers = []
@@ -258,49 +346,379 @@ class SMSAlertSystem(AlertSystem):
             print(f"短信服务连接测试失败: {e}")
             return False
 
+class IncidentAggregator:
+    """
+    摔倒事件聚合
+    
+    - 同一事件键（如 (摄像头, 跟踪ID)）的连续摔倒帧合并为一个事件，
+      间隔不超过 merge_gap 秒的摔倒帧视为同一事件，避免判定在摔倒/正常之间抖动时重复预警
+    - 冷却按事件键分别计算：某个目标处于冷却中不会影响其他摄像头或目标的预警
+    - 新事件先进入待发送列表，digest_window 秒后（或攒满 max_digest 个）合并为一条摘要发送
+    """
+    
+    def __init__(self, cooldown: float = 60.0, merge_gap: float = 3.0,
+                 digest_window: float = 5.0, max_digest: int = 10):
+        """
+        Args:
+            cooldown: 同一事件键两次预警之间的最短间隔（秒）
+            merge_gap: 摔倒帧之间的间隔不超过该值时合并为同一事件（秒）
+            digest_window: 第一个待发送事件出现后等待合并的时长（秒），0表示立即发送
+            max_digest: 待发送事件达到该数量时立即发送摘要
+        """
+        self.cooldown = cooldown
+        self.merge_gap = merge_gap
+        self.digest_window = digest_window
+        self.max_digest = max_digest
+        self._states: Dict[Hashable, Dict[str, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.incident_count = 0  # 已产生的事件数
+        self.suppressed_count = 0  # 因冷却未发送的事件数
+    
+    def observe(self, key: Hashable, is_fall: bool, confidence: float = 0.0,
+                image: Optional[np.ndarray] = None, location: str = "未知位置",
+                now: Optional[float] = None) -> bool:
+        """
+        输入一次判定结果
+        
+        Args:
+            key: 事件键，同一摄像头的同一目标应使用相同的键
+            is_fall: 本次是否判定为摔倒
+            confidence: 摔倒置信度
+            image: 当前画面，仅在事件待发送且置信度更高时复制保存
+            location: 位置描述
+            now: 当前时间（默认time.time()）
+            
+        Returns:
+            本次判定是否产生了一个需要发送的新事件
+        """
+        if not is_fall:
+            return False
+        now = time.time() if now is None else now
+        
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = {'incident': None, 'cooldown_until': 0.0, 'suppressed': 0}
+            
+            incident = state['incident']
+            if incident is not None and now - incident['last_seen'] <= self.merge_gap:
+                # 同一事件的后续帧：只更新统计，发送前保留置信度最高的画面
+                incident['last_seen'] = now
+                incident['frames'] += 1
+                if confidence > incident['confidence']:
+                    incident['confidence'] = confidence
+                    if not incident['reported'] and image is not None:
+                        incident['image'] = image.copy()
+                return False
+            
+            incident = {
+                'key': key,
+                'location': location,
+                'start': now,
+                'last_seen': now,
+                'frames': 1,
+                'confidence': confidence,
+                'image': None,
+                'reported': False,
+                'suppressed_before': 0
+            }
+            state['incident'] = incident
+            self.incident_count += 1
+            
+            if now < state['cooldown_until']:
+                # 冷却中：事件照常合并，但不发送，计入下一次预警
+                incident['reported'] = True
+                state['suppressed'] += 1
+                self.suppressed_count += 1
+                return False
+            
+            incident['image'] = image.copy() if image is not None else None
+            incident['suppressed_before'] = state['suppressed']
+            state['suppressed'] = 0
+            state['cooldown_until'] = now + self.cooldown
+            self._pending.append(incident)
+            self._prune(now)
+            return True
+    
+    def pop_digest(self, now: Optional[float] = None, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        取出到期的待发送事件
+        
+        Args:
+            now: 当前时间
+            force: 忽略等待时间，取出全部待发送事件
+            
+        Returns:
+            事件快照列表（未到期时为空）
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._pending:
+                return []
+            due = (force or len(self._pending) >= self.max_digest or
+                   now - self._pending[0]['start'] >= self.digest_window)
+            if not due:
+                return []
+            incidents = []
+            for incident in self._pending:
+                incidents.append(dict(incident))
+                # 已发送的事件不再持有画面
+                incident['reported'] = True
+                incident['image'] = None
+            self._pending = []
+            return incidents
+    
+    def seconds_until_due(self, now: Optional[float] = None) -> Optional[float]:
+        """距离下一次摘要到期的秒数，没有待发送事件时返回None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._pending:
+                return None
+            return max(0.0, self._pending[0]['start'] + self.digest_window - now)
+    
+    def reset(self):
+        with self._lock:
+            self._states.clear()
+            self._pending = []
+    
+    def _prune(self, now: float):
+        """删除冷却已结束且事件已结束的键，状态数量不随运行时间增长"""
+        expired = [
+            key for key, state in self._states.items()
+            if now >= state['cooldown_until'] and
+            (state['incident'] is None or now - state['incident']['last_seen'] > self.merge_gap)
+        ]
+        for key in expired:
+            del self._states[key]
+    
+    @staticmethod
+    def format_digest(incidents: List[Dict[str, Any]]) -> str:
+        """把一个或多个事件格式化为预警消息"""
+        def describe(incident):
+            text = (f"置信度: {incident['confidence']:.2f}, 位置: {incident['location']}, "
+                    f"持续 {incident['last_seen'] - incident['start']:.1f} 秒 ({incident['frames']} 次判定)")
+            if incident['suppressed_before']:
+                text += f", 冷却期间另有 {incident['suppressed_before']} 次"
+            return text
+        
+        if len(incidents) == 1:
+            return f"检测到摔倒事件！{describe(incidents[0])}"
+        lines = [f"检测到 {len(incidents)} 起摔倒事件："]
+        for i, incident in enumerate(incidents, 1):
+            time_text = datetime.fromtimestamp(incident['start']).strftime('%H:%M:%S')
+            lines.append(f"{i}. [{time_text}] {describe(incident)}")
+        return "\n".join(lines)
+
 class AlertManager:
-    """预警管理器"""
+    """
+    预警管理器
+    
+    预警任务放入有界派发队列，由固定数量的工作线程依次发送到各预警通道；
+    队列满时丢弃新任务并计数，保证突发的大量摔倒事件不会创建大量线程或阻塞检测
+    
+    逐帧判定结果通过 report_detection 输入，经 IncidentAggregator 合并、按事件冷却后以摘要发送
+    """
     
-    def __init__(self):
-        self.email_alert = EmailAlertSystem()
-        self.sms_alert = SMSAlertSystem()
+    def __init__(self, num_workers: int = 2, queue_size: int = 100, history_size: int = 500,
+                 max_retries: int = 3, retry_backoff: float = 1.0, incident_cooldown: float = 60.0,
+                 merge_gap: float = 3.0, digest_window: float = 5.0):
+        """
+        Args:
+            incident_cooldown: 同一事件键两次预警之间的最短间隔（秒）
+            merge_gap: 摔倒帧间隔不超过该值时合并为同一事件（秒）
+            digest_window: 新事件等待合并为摘要的时长（秒）
+            num_workers: 发送预警的工作线程数
+            queue_size: 派发队列容量
+            history_size: 每个通道保留的预警历史条数
+            max_retries: 每个通道发送失败后的最大重试次数
+            retry_backoff: 首次重试前的等待时间（秒），之后每次翻倍
+        """
+        channel_options = dict(history_size=history_size, max_retries=max_retries, retry_backoff=retry_backoff)
+        self.email_alert = EmailAlertSystem(**channel_options)
+        self.sms_alert = SMSAlertSystem(**channel_options)
         self.alert_methods = []
+        
+        self.num_workers = num_workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers: List[threading.Thread] = []
+        self._workers_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.stats = {'queued': 0, 'dropped': 0}
+        
+        self.incidents = IncidentAggregator(cooldown=incident_cooldown, merge_gap=merge_gap,
+                                            digest_window=digest_window)
+        self._digest_timer: Optional[threading.Timer] = None
+        self._digest_lock = threading.Lock()
     
     def add_email_alert(self, sender_email: str, sender_password: str, 
                        recipient_emails: List[str]):
         """添加邮箱预警"""
         self.email_alert.configure(sender_email, sender_password, recipient_emails)
-        self.alert_methods.append(self.email_alert)
+        if self.email_alert not in self.alert_methods:
+            self.alert_methods.append(self.email_alert)
     
     def add_sms_alert(self, api_key: str, api_secret: str, phone_numbers: List[str]):
         """添加短信预警"""
         self.sms_alert.configure(api_key, api_secret, phone_numbers)
-        self.alert_methods.append(self.sms_alert)
+        if self.sms_alert not in self.alert_methods:
+            self.alert_methods.append(self.sms_alert)
     
     def send_fall_alert(self, confidence: float, image: Optional[np.ndarray] = None, 
-                       location: str = "未知位置"):
-        """发送摔倒预警"""
+                       location: str = "未知位置") -> bool:
+        """发送摔倒预警（异步，立即返回是否成功入队）"""
         message = f"检测到摔倒事件！置信度: {confidence:.2f}, 位置: {location}"
+        # 复制图像，调用方之后可以继续复用该帧缓冲区
+        return self._enqueue(message, image.copy() if image is not None else None, "fall_detection")
+    
+    def send_system_alert(self, message: str, alert_type: str = "system") -> bool:
+        """发送系统预警（异步）"""
+        return self._enqueue(message, None, alert_type)
+    
+    def report_detection(self, key: Hashable, is_fall: bool, confidence: float = 0.0,
+                         image: Optional[np.ndarray] = None, location: str = "未知位置") -> bool:
+        """
+        输入一次摔倒判定结果，由事件聚合决定是否以及何时发送预警
         
-        # 异步发送预警
-        def send_alerts():
-            for alert_method in self.alert_methods:
-                alert_method.send_alert(message, image, "fall_detection")
-        
-        # 在新线程中发送预警，避免阻塞主程序
-        alert_thread = threading.Thread(target=send_alerts)
-        alert_thread.daemon = True
-        alert_thread.start()
-    
-    def send_system_alert(self, message: str, alert_type: str = "system"):
-        """发送系统预警"""
-        def send_alerts():
-            for alert_method in self.alert_methods:
-                alert_method.send_alert(message, None, alert_type)
+        Args:
+            key: 事件键，如 (摄像头, 跟踪ID)
+            is_fall: 是否判定为摔倒
+            confidence: 摔倒置信度
+            image: 当前画面
+            location: 位置描述
+            
+        Returns:
+            是否产生了新的待发送事件
+        """
+        if not self.alert_methods or not self.incidents.observe(key, is_fall, confidence, image, location):
+            return False
+        if not self._send_digest():
+            self._schedule_digest()
+        return True
+    
+    def _schedule_digest(self):
+        """在最早的待发送事件到期时发送摘要"""
+        with self._digest_lock:
+            if self._digest_timer is not None and self._digest_timer.is_alive():
+                return
+            delay = self.incidents.seconds_until_due()
+            if delay is None:
+                return
+            self._digest_timer = threading.Timer(delay, self._on_digest_timer)
+            self._digest_timer.daemon = True
+            self._digest_timer.start()
+    
+    def _on_digest_timer(self):
+        self._send_digest()
+        # 发送期间可能又有新事件加入
+        with self._digest_lock:
+            self._digest_timer = None
+        self._schedule_digest()
+    
+    def _send_digest(self, force: bool = False) -> bool:
+        """把到期的事件合并为一条预警入队，返回是否发送"""
+        incidents = self.incidents.pop_digest(force=force)
+        if not incidents:
+            return False
+        # 附带置信度最高的画面
+        best = max(incidents, key=lambda incident: incident['confidence'])
+        message = IncidentAggregator.format_digest(incidents)
+        return self._enqueue(message, best['image'], "fall_detection", use_cooldown=False)
+    
+    def _enqueue(self, message: str, image: Optional[np.ndarray], alert_type: str,
+                 use_cooldown: bool = True) -> bool:
+        if not self.alert_methods:
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((message, image, alert_type, use_cooldown))
+        except queue.Full:
+            self._count('dropped')
+            print(f"预警队列已满，丢弃预警: {message}")
+            return False
+        self._count('queued')
+        return True
+    
+    def _ensure_workers(self):
+        """按需启动工作线程（只启动一次）"""
+        with self._workers_lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            if not self._workers:
+                self._stop_event.clear()
+            for i in range(len(self._workers), self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"alert-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+    
+    def _worker_loop(self):
+        # 带超时地取任务，以便及时响应停止信号
+        while not self._stop_event.is_set():
+            try:
+                job = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                message, image, alert_type, use_cooldown = job
+                for alert_method in list(self.alert_methods):
+                    alert_method.send_alert(message, image, alert_type, use_cooldown)
+            except Exception as e:
+                print(f"预警派发失败: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def get_dispatch_stats(self) -> Dict[str, int]:
+        """派发统计：入队、因队列满丢弃、当前排队数，各通道发送成功/失败的次数，以及事件数和因冷却未发送的事件数"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['pending'] = self._queue.qsize()
+        stats['sent'] = sum(m.sent_count for m in self.alert_methods)
+        stats['failed'] = sum(m.failed_count for m in self.alert_methods)
+        stats['incidents'] = self.incidents.incident_count
+        stats['suppressed'] = self.incidents.suppressed_count
+        return stats
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即发送待合并的事件摘要，并等待队列中的预警全部处理完成，超时返回False"""
+        self._send_digest(force=True)
+        deadline = None if timeout is None else time.time() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def shutdown(self, timeout: Optional[float] = 10.0):
+        """
+        在timeout内尽量处理完剩余预警，然后停止工作线程并关闭连接
         
-        alert_thread = threading.Thread(target=send_alerts)
-        alert_thread.daemon = True
-        alert_thread.start()
+        超时仍未发送的预警直接丢弃并计入dropped，保证关闭过程不会无限阻塞
+        """
+        with self._digest_lock:
+            if self._digest_timer is not None:
+                self._digest_timer.cancel()
+                self._digest_timer = None
+        self.flush(timeout)
+        self._stop_event.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._count('dropped')
+            self._queue.task_done()
+        with self._workers_lock:
+            for worker in self._workers:
+                worker.join(timeout)
+            self._workers = []
+        for alert_method in self.alert_methods:
+            alert_method.close()
     
     def get_all_alert_history(self) -> List[Dict[str, Any]]:
         """获取所有预警历史"""
@@ -126,6 +126,8 @@ def example_alert_system():
     # 模拟预警
     print("模拟发送摔倒预警...")
     alert_manager.send_fall_alert(0.85, None, "客厅")
+    # 预警在后台线程发送，等待发送完成
+    alert_manager.flush(timeout=10.0)
     
     print("预警系统演示完成")
 
@@ -5,7 +5,7 @@
 
 import numpy as np
 import cv2
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.svm import SVC
 from sklearn.ensemble import RandomForestClassifier
@@ -16,8 +16,12 @@ import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import Dataset, DataLoader
 import joblib
+import json
 import os
 
+from pose_batch import KEYPOINT_INDEX, as_keypoint_array
+from pose_features import FEATURE_DIM, extract_pose_features, extract_sequence_features, trunk_angle
+
 class ThresholdFallDetector:
     """基于阈值的摔倒检测器"""
     
@@ -28,17 +32,28 @@ class ThresholdFallDetector:
             'angle_threshold': 45  # 角度阈值
         }
     
+    @staticmethod
+    def _pose_keypoints(pose) -> List[List[float]]:
+        """将单人姿势（字典或 (17, 3) 数组）转换为按COCO顺序排列的 [x, y, confidence] 列表"""
+        if isinstance(pose, np.ndarray) and pose.ndim == 2:
+            return pose.tolist()
+        return as_keypoint_array(pose)[0].tolist()
+    
     def calculate_pose_ratios(self, pose: Dict[str, Any]) -> Dict[str, float]:
-        """计算姿势的各种比例"""
-        keypoints = pose['keypoints']
+        """计算姿势的各种比例（支持字典或 (17, 3) 数组）"""
+        kps = self._pose_keypoints(pose)
         
-        # 获取关键点坐标
-        left_shoulder = keypoints.get('left_shoulder', {'x': 0, 'y': 0})
-        right_shoulder = keypoints.get('right_shoulder', {'x': 0, 'y': 0})
-        left_hip = keypoints.get('left_hip', {'x': 0, 'y': 0})
-        right_hip = keypoints.get('right_hip', {'x': 0, 'y': 0})
-        left_knee = keypoints.get('left_knee', {'x': 0, 'y': 0})
-        right_knee = keypoints.get('right_knee', {'x': 0, 'y': 0})
+        # 获取关键点坐标，缺失的关键点为0
+        def get_point(name):
+            x, y, _ = kps[KEYPOINT_INDEX[name]]
+            return {'x': x, 'y': y}
+        
+        left_shoulder = get_point('left_shoulder')
+        right_shoulder = get_point('right_shoulder')
+        left_hip = get_point('left_hip')
+        right_hip = get_point('right_hip')
+        left_knee = get_point('left_knee')
+        right_knee = get_point('right_knee')
         
         # 计算躯干高度（肩膀到臀部）
         shoulder_y = (left_shoulder['y'] + right_shoulder['y']) / 2
@@ -100,14 +115,16 @@ class ThresholdFallDetector:
         优化后的阈值法：
         1. 主判据：头部和腰部/脚部高度差小于肩膀到手肘距离（骨骼点8和6的距离）。
         2. 备用判据：两肩膀中点与两髋关节中点连线与垂直线夹角，超过20度判为摔倒。
+        
+        pose可以是旧版字典，也可以是单人的 (17, 3) 关键点数组
         """
-        keypoints = pose.get('keypoints', {})
+        kps = self._pose_keypoints(pose)
         # COCO骨骼点索引
         # 0:nose 5:left_shoulder 6:right_shoulder 11:left_hip 12:right_hip 8:left_elbow 10:right_elbow 15:left_ankle 16:right_ankle
         def get_xy(idx_name):
-            kp = keypoints.get(idx_name)
-            if kp and kp['confidence'] > 0.5:
-                return kp['x'], kp['y']
+            x, y, conf = kps[KEYPOINT_INDEX[idx_name]]
+            if conf > 0.5:
+                return x, y
             return None
         # 主判据
         nose = get_xy('nose')
@@ -163,6 +180,77 @@ class ThresholdFallDetector:
             'angle': angle if 'angle' in locals() else -1
         }
         return is_fall, confidence, features
+    
+    def detect_fall_batch(self, keypoints) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        向量化的阈值法，一次判定多人/多帧，判据与detect_fall完全一致
+        
+        Args:
+            keypoints: PoseBatch、字典列表或形如 (..., 17, 3) 的关键点数组，
+                       例如一帧中所有人 (N, 17, 3) 或整段视频 (T, N, 17, 3)
+            
+        Returns:
+            (is_fall, confidence, features)，形状与输入的前导维度一致；
+            features为特征列字典，无法计算的特征取-1
+        """
+        if isinstance(keypoints, np.ndarray):
+            kps = keypoints.astype(np.float32, copy=False)
+        else:
+            kps = as_keypoint_array(keypoints)
+        lead_shape = kps.shape[:-2]
+        kps = kps.reshape(-1, kps.shape[-2], 3)
+        
+        xy = kps[..., :2]
+        valid = kps[..., 2] > 0.5
+        
+        def col(name):
+            idx = KEYPOINT_INDEX[name]
+            return xy[:, idx], valid[:, idx]
+        
+        nose, nose_ok = col('nose')
+        l_sh, l_sh_ok = col('left_shoulder')
+        r_sh, r_sh_ok = col('right_shoulder')
+        l_el, l_el_ok = col('left_elbow')
+        r_el, r_el_ok = col('right_elbow')
+        l_hip, l_hip_ok = col('left_hip')
+        r_hip, r_hip_ok = col('right_hip')
+        l_ank, l_ank_ok = col('left_ankle')
+        r_ank, r_ank_ok = col('right_ankle')
+        
+        # 肩膀到手肘距离（优先左侧），缺失时使用默认值40
+        shoulder = np.where(l_sh_ok[:, None], l_sh, r_sh)
+        elbow = np.where(l_el_ok[:, None], l_el, r_el)
+        ref_ok = (l_sh_ok | r_sh_ok) & (l_el_ok | r_el_ok)
+        ref_dist = np.where(ref_ok, np.linalg.norm(shoulder - elbow, axis=1), 40.0)
+        
+        # 主判据：头-腰、头-脚高度差
+        hip_ok = l_hip_ok & r_hip_ok
+        mid_hip = (l_hip + r_hip) / 2
+        head_hip_ok = nose_ok & hip_ok
+        head_hip_dy = np.abs(nose[:, 1] - mid_hip[:, 1])
+        fall1 = head_hip_ok & (head_hip_dy < ref_dist)
+        
+        head_foot_ok = nose_ok & l_ank_ok & r_ank_ok
+        head_foot_dy = np.abs(nose[:, 1] - (l_ank[:, 1] + r_ank[:, 1]) / 2)
+        fall2 = head_foot_ok & (head_foot_dy < ref_dist)
+        
+        # 备用判据：肩膀中点-髋关节中点连线与垂直线夹角
+        delta = mid_hip - (l_sh + r_sh) / 2
+        angle_ok = l_sh_ok & r_sh_ok & hip_ok & (delta[:, 1] != 0)
+        angle = trunk_angle(kps)
+        angle_fall = angle_ok & (angle > 20)
+        
+        is_fall = fall1 | fall2 | angle_fall
+        confidence = is_fall.astype(np.float32)
+        features = {
+            'head_hip_dy': np.where(head_hip_ok, head_hip_dy, -1),
+            'head_foot_dy': np.where(head_foot_ok, head_foot_dy, -1),
+            'ref_dist': ref_dist,
+            'angle': np.where(angle_ok, angle, -1)
+        }
+        
+        return (is_fall.reshape(lead_shape), confidence.reshape(lead_shape),
+                {name: values.reshape(lead_shape) for name, values in features.items()})
 
 class TraditionalMLFallDetector:
     """传统机器学习摔倒检测器"""
@@ -174,95 +262,29 @@ class TraditionalMLFallDetector:
         self.is_trained = False
         
     def extract_features(self, poses: List[Dict[str, Any]]) -> np.ndarray:
-        """提取特征向量"""
-        features = []
-        
-        for pose in poses:
-            pose_features = []
-            keypoints = pose['keypoints']
-            
-            # 基础特征：关键点坐标和置信度
-            for name in ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip', 
-                        'left_knee', 'right_knee', 'left_ankle', 'right_ankle']:
-                if name in keypoints:
-                    kp = keypoints[name]
-                    pose_features.extend([kp['x'], kp['y'], kp['confidence']])
-                else:
-                    pose_features.extend([0, 0, 0])
-            
-            # 几何特征
-            ratios = self._calculate_geometric_features(pose)
-            pose_features.extend(list(ratios.values()))
-            
-            features.append(pose_features)
-        
-        return np.array(features)
+        """提取特征向量 (N, FEATURE_DIM)，与训练工具使用同一份特征定义（见pose_features）"""
+        return extract_pose_features(poses)
     
-    def _calculate_geometric_features(self, pose: Dict[str, Any]) -> Dict[str, float]:
-        """计算几何特征"""
-        keypoints = pose['keypoints']
-        
-        # 计算各种比例和角度
-        features = {}
-        
-        # 躯干长度比例
-        if 'left_shoulder' in keypoints and 'left_hip' in keypoints:
-            trunk_length = np.sqrt(
-                (keypoints['left_shoulder']['x'] - keypoints['left_hip']['x'])**2 +
-                (keypoints['left_shoulder']['y'] - keypoints['left_hip']['y'])**2
-            )
-            features['trunk_length'] = trunk_length
-        else:
-            features['trunk_length'] = 0
-        
-        # 腿部长度比例
-        if 'left_hip' in keypoints and 'left_knee' in keypoints:
-            leg_length = np.sqrt(
-                (keypoints['left_hip']['x'] - keypoints['left_knee']['x'])**2 +
-                (keypoints['left_hip']['y'] - keypoints['left_knee']['y'])**2
-            )
-            features['leg_length'] = leg_length
-        else:
-            features['leg_length'] = 0
-        
-        # 躯干角度
-        if all(k in keypoints for k in ['left_shoulder', 'right_shoulder', 'left_hip', 'right_hip']):
-            angle = self._calculate_trunk_angle(keypoints)
-            features['trunk_angle'] = angle
-        else:
-            features['trunk_angle'] = 0
-        
-        return features
-    
-    def _calculate_trunk_angle(self, keypoints: Dict[str, Any]) -> float:
-        """计算躯干角度"""
-        shoulder_center_x = (keypoints['left_shoulder']['x'] + keypoints['right_shoulder']['x']) / 2
-        shoulder_center_y = (keypoints['left_shoulder']['y'] + keypoints['right_shoulder']['y']) / 2
-        hip_center_x = (keypoints['left_hip']['x'] + keypoints['right_hip']['x']) / 2
-        hip_center_y = (keypoints['left_hip']['y'] + keypoints['right_hip']['y']) / 2
-        
-        # 计算与垂直线的角度
-        dx = hip_center_x - shoulder_center_x
-        dy = hip_center_y - shoulder_center_y
-        
-        if dx == 0:
-            return 0
+    def train(self, X: np.ndarray, y: np.ndarray, params: Dict[str, Any] = None):
+        """
+        训练模型
         
-        angle = np.arctan2(dx, dy) * 180 / np.pi
-        return abs(angle)
-    
-    def train(self, X: np.ndarray, y: np.ndarray):
-        """训练模型"""
+        Args:
+            X: 特征矩阵
+            y: 标签
+            params: 覆盖默认超参数，如 {'n_neighbors': 7} 或 {'C': 10}
+        """
         # 数据预处理
         X_scaled = self.scaler.fit_transform(X)
         
         # 选择模型
+        params = params or {}
         if self.model_type == 'knn':
-            self.model = KNeighborsClassifier(n_neighbors=5)
+            self.model = KNeighborsClassifier(**{'n_neighbors': 5, **params})
         elif self.model_type == 'svm':
-            self.model = SVC(kernel='rbf', probability=True)
+            self.model = SVC(**{'kernel': 'rbf', 'probability': True, **params})
         elif self.model_type == 'rf':
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+            self.model = RandomForestClassifier(**{'n_estimators': 100, 'random_state': 42, **params})
         else:
             raise ValueError(f"不支持的模型类型: {self.model_type}")
         
@@ -286,6 +308,16 @@ class TraditionalMLFallDetector:
         
         return predictions.tolist(), probabilities.tolist()
     
+    def predict_features(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """对已提取的特征矩阵进行预测，返回 (预测标签, 摔倒概率)"""
+        if not self.is_trained:
+            raise ValueError("模型未训练")
+        
+        X_scaled = self.scaler.transform(X)
+        predictions = self.model.predict(X_scaled)
+        probabilities = self.model.predict_proba(X_scaled)[:, 1]
+        return predictions, probabilities
+    
     def save_model(self, filepath: str):
         """保存模型"""
         if self.is_trained:
@@ -342,15 +374,33 @@ class LSTMFallDetector(nn.Module):
         output = self.fc(output)
         return output
 
+def _grad_scaler(enabled: bool):
+    """混合精度训练的梯度缩放器，兼容新旧版本PyTorch的接口"""
+    if hasattr(torch.amp, 'GradScaler'):
+        return torch.amp.GradScaler('cuda', enabled=enabled)
+    return torch.cuda.amp.GradScaler(enabled=enabled)
+
 class DeepLearningFallDetector:
-    """深度学习摔倒检测器"""
+    """
+    深度学习摔倒检测器
+    
+    训练好的模型可通过 export_model 导出为 TorchScript 或 ONNX（可选int8动态量化），
+    部署时用 load_exported_model 加载，在CPU上推理，不再依赖Python端的模型定义
+    """
     
-    def __init__(self, model_type: str = 'lstm', input_size: int = 51):
+    EXPORT_FORMATS = ('torchscript', 'onnx')
+    
+    def __init__(self, model_type: str = 'lstm', input_size: int = FEATURE_DIM):
         self.model_type = model_type
         self.input_size = input_size
         self.model = None
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.is_trained = False
+        # 推理后端：eager（训练得到的nn.Module）/ torchscript / onnx
+        self.runtime = 'eager'
+        self._exported_model = None
+        # 预分配的输入缓冲区 (批大小, 序列长度, 特征维度)，按需扩容
+        self._input_buffer = np.zeros((0, 0, 0), dtype=np.float32)
         
     def create_model(self):
         """创建模型"""
@@ -371,87 +421,37 @@ class DeepLearningFallDetector:
             if len(sequence) < sequence_length:
                 continue
             
-            # 提取特征序列
-            sequence_features = []
-            for poses in sequence[-sequence_length:]:  # 取最后sequence_length帧
-                if poses:
-                    pose_features = self._extract_pose_features(poses[0])  # 取第一个人的姿势
-                else:
-                    pose_features = np.zeros(self.input_size)
-                sequence_features.append(pose_features)
-            
-            features_list.append(sequence_features)
+            # 取最后sequence_length帧中每帧第一个人的特征
+            features_list.append(extract_sequence_features(sequence, sequence_length))
             labels_list.append(label)
         
-        return np.array(features_list), np.array(labels_list)
-    
-    def _extract_pose_features(self, pose: Dict[str, Any]) -> np.ndarray:
-        """提取单个姿势的特征"""
-        keypoints = pose['keypoints']
-        features = []
-        
-        # 关键点坐标和置信度
-        for name in ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip', 
-                    'left_knee', 'right_knee', 'left_ankle', 'right_ankle']:
-            if name in keypoints:
-                kp = keypoints[name]
-                features.extend([kp['x'], kp['y'], kp['confidence']])
-            else:
-                features.extend([0, 0, 0])
-        
-        # 几何特征
-        geometric_features = self._calculate_geometric_features(pose)
-        features.extend(list(geometric_features.values()))
-        
-        return np.array(features)
-    
-    def _calculate_geometric_features(self, pose: Dict[str, Any]) -> Dict[str, float]:
-        """计算几何特征"""
-        keypoints = pose['keypoints']
-        features = {}
-        
-        # 计算躯干角度
-        if all(k in keypoints for k in ['left_shoulder', 'right_shoulder', 'left_hip', 'right_hip']):
-            angle = self._calculate_trunk_angle(keypoints)
-            features['trunk_angle'] = angle
-        else:
-            features['trunk_angle'] = 0
-        
-        # 计算高度比例
-        if all(k in keypoints for k in ['left_shoulder', 'left_hip', 'left_knee']):
-            shoulder_y = keypoints['left_shoulder']['y']
-            hip_y = keypoints['left_hip']['y']
-            knee_y = keypoints['left_knee']['y']
-            
-            trunk_height = abs(shoulder_y - hip_y)
-            leg_height = abs(hip_y - knee_y)
-            total_height = trunk_height + leg_height
-            
-            features['height_ratio'] = trunk_height / total_height if total_height > 0 else 0
-        else:
-            features['height_ratio'] = 0
-        
-        return features
-    
-    def _calculate_trunk_angle(self, keypoints: Dict[str, Any]) -> float:
-        """计算躯干角度"""
-        shoulder_center_x = (keypoints['left_shoulder']['x'] + keypoints['right_shoulder']['x']) / 2
-        shoulder_center_y = (keypoints['left_shoulder']['y'] + keypoints['right_shoulder']['y']) / 2
-        hip_center_x = (keypoints['left_hip']['x'] + keypoints['right_hip']['x']) / 2
-        hip_center_y = (keypoints['left_hip']['y'] + keypoints['right_hip']['y']) / 2
-        
-        dx = hip_center_x - shoulder_center_x
-        dy = hip_center_y - shoulder_center_y
-        
-        if dx == 0:
-            return 0
-        
-        angle = np.arctan2(dx, dy) * 180 / np.pi
-        return abs(angle)
+        if not features_list:
+            return np.zeros((0, sequence_length, self.input_size), dtype=np.float32), np.array([])
+        return np.stack(features_list), np.array(labels_list)
     
     def train(self, pose_sequences: List[List[Dict[str, Any]]], labels: List[int], 
-              epochs: int = 50, batch_size: int = 32, learning_rate: float = 0.001):
-        """训练模型"""
+              epochs: int = 50, batch_size: int = 32, learning_rate: float = 0.001,
+              num_workers: int = 0, use_amp: Optional[bool] = None, patience: Optional[int] = 10,
+              val_interval: int = 1, checkpoint_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        训练模型
+        
+        Args:
+            epochs: 最大训练轮数
+            batch_size: 批大小
+            learning_rate: 学习率
+            num_workers: DataLoader的加载进程数
+            use_amp: 是否使用混合精度，默认在GPU上开启
+            patience: 验证损失连续这么多次验证没有下降时提前停止，为None时训练满epochs轮
+            val_interval: 每隔多少轮验证一次
+            checkpoint_path: 验证损失创新低时把模型保存到该路径（与save_model格式相同）
+            
+        Returns:
+            训练摘要：实际训练轮数、最佳轮次和最佳验证损失；训练结束后模型恢复为最佳轮次的权重
+        """
+        # 重新训练后预测使用训练得到的模型，而不是之前加载的导出模型
+        self.runtime = 'eager'
+        self._exported_model = None
         if self.model is None:
             self.create_model()
         
@@ -460,63 +460,99 @@ class DeepLearningFallDetector:
         
         if len(X) == 0:
             print("没有足够的数据进行训练")
-            return
+            return {}
         
         # 划分训练集和验证集
         X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
         
-        # 创建数据加载器
-        train_dataset = PoseDataset(X_train, y_train)
-        val_dataset = PoseDataset(X_val, y_val)
-        
-        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
+        # 创建数据加载器；GPU训练时使用锁页内存，主机到显存的拷贝可以异步进行
+        on_gpu = self.device.type == 'cuda'
+        use_amp = on_gpu if use_amp is None else (use_amp and on_gpu)
+        loader_options = dict(batch_size=batch_size, num_workers=num_workers, pin_memory=on_gpu,
+                              persistent_workers=num_workers > 0)
+        train_loader = DataLoader(PoseDataset(X_train, y_train), shuffle=True, **loader_options)
+        val_loader = DataLoader(PoseDataset(X_val, y_val), shuffle=False, **loader_options)
         
         # 定义损失函数和优化器
         criterion = nn.CrossEntropyLoss()
         optimizer = optim.Adam(self.model.parameters(), lr=learning_rate)
+        scaler = _grad_scaler(use_amp)
+        
+        best_val_loss = float('inf')
+        best_epoch = 0
+        best_state = None
+        stale_checks = 0
+        epoch = 0
         
         # 训练循环
-        for epoch in range(epochs):
+        for epoch in range(1, epochs + 1):
             self.model.train()
-            train_loss = 0
+            # 损失在设备上累加，每轮只同步一次
+            train_loss = torch.zeros((), device=self.device)
             for batch_features, batch_labels in train_loader:
-                batch_features = batch_features.to(self.device)
-                batch_labels = batch_labels.to(self.device)
+                batch_features = batch_features.to(self.device, non_blocking=True)
+                batch_labels = batch_labels.to(self.device, non_blocking=True)
                 
-                optimizer.zero_grad()
-                outputs = self.model(batch_features)
-                loss = criterion(outputs, batch_labels)
-                loss.backward()
-                optimizer.step()
+                optimizer.zero_grad(set_to_none=True)
+                with torch.autocast(device_type=self.device.type, enabled=use_amp):
+                    outputs = self.model(batch_features)
+                    loss = criterion(outputs, batch_labels)
+                scaler.scale(loss).backward()
+                scaler.step(optimizer)
+                scaler.update()
                 
-                train_loss += loss.item()
+                train_loss += loss.detach()
+            
+            if epoch % val_interval != 0 and epoch != epochs:
+                continue
             
             # 验证
-            self.model.eval()
-            val_loss = 0
-            correct = 0
-            total = 0
+            val_loss, val_acc = self._evaluate(val_loader, criterion, use_amp)
             
-            with torch.no_grad():
-                for batch_features, batch_labels in val_loader:
-                    batch_features = batch_features.to(self.device)
-                    batch_labels = batch_labels.to(self.device)
-                    
-                    outputs = self.model(batch_features)
-                    loss = criterion(outputs, batch_labels)
-                    val_loss += loss.item()
-                    
-                    _, predicted = torch.max(outputs.data, 1)
-                    total += batch_labels.size(0)
-                    correct += (predicted == batch_labels).sum().item()
+            if epoch % 10 == 0:
+                print(f'Epoch [{epoch}/{epochs}], Train Loss: {train_loss.item()/len(train_loader):.4f}, '
+                      f'Val Loss: {val_loss:.4f}, Val Acc: {100*val_acc:.2f}%')
             
-            if (epoch + 1) % 10 == 0:
-                print(f'Epoch [{epoch+1}/{epochs}], Train Loss: {train_loss/len(train_loader):.4f}, '
-                      f'Val Loss: {val_loss/len(val_loader):.4f}, Val Acc: {100*correct/total:.2f}%')
+            if val_loss < best_val_loss:
+                best_val_loss = val_loss
+                best_epoch = epoch
+                best_state = {k: v.detach().clone() for k, v in self.model.state_dict().items()}
+                stale_checks = 0
+                if checkpoint_path:
+                    torch.save(self._checkpoint(best_state), checkpoint_path)
+            else:
+                stale_checks += 1
+                if patience is not None and stale_checks >= patience:
+                    print(f"验证损失已连续 {patience} 次未下降，在第 {epoch} 轮提前停止")
+                    break
+        
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
         
         self.is_trained = True
-        print("深度学习模型训练完成")
+        print(f"深度学习模型训练完成，最佳轮次: {best_epoch}，验证损失: {best_val_loss:.4f}")
+        return {'epochs_run': epoch, 'best_epoch': best_epoch, 'best_val_loss': best_val_loss}
+    
+    def _evaluate(self, loader: DataLoader, criterion, use_amp: bool) -> Tuple[float, float]:
+        """计算验证集的平均损失和准确率"""
+        self.model.eval()
+        val_loss = torch.zeros((), device=self.device)
+        correct = torch.zeros((), dtype=torch.long, device=self.device)
+        total = 0
+        
+        with torch.inference_mode():
+            for batch_features, batch_labels in loader:
+                batch_features = batch_features.to(self.device, non_blocking=True)
+                batch_labels = batch_labels.to(self.device, non_blocking=True)
+                
+                with torch.autocast(device_type=self.device.type, enabled=use_amp):
+                    outputs = self.model(batch_features)
+                    val_loss += criterion(outputs, batch_labels).float()
+                
+                correct += (outputs.argmax(dim=1) == batch_labels).sum()
+                total += batch_labels.size(0)
+        
+        return val_loss.item() / max(len(loader), 1), correct.item() / max(total, 1)
     
     def predict(self, pose_sequence: List[Dict[str, Any]], sequence_length: int = 10) -> Tuple[bool, float]:
         """预测摔倒"""
@@ -526,38 +562,104 @@ class DeepLearningFallDetector:
         if len(pose_sequence) < sequence_length:
             return False, 0.0
         
-        # 准备输入数据
-        sequence_features = []
-        for poses in pose_sequence[-sequence_length:]:
-            if poses:
-                pose_features = self._extract_pose_features(poses[0])
-            else:
-                pose_features = np.zeros(self.input_size)
-            sequence_features.append(pose_features)
+        # 特征直接写入预分配的输入缓冲区，空帧补零
+        window = self._input_view(1, sequence_length)[0]
+        extract_sequence_features(pose_sequence, sequence_length, out=window)
         
-        # 转换为tensor
-        input_tensor = torch.FloatTensor([sequence_features]).to(self.device)
+        fall_probability = float(self._fall_probabilities(window[None])[0])
+        return fall_probability > 0.5, fall_probability
+    
+    def _input_view(self, batch_size: int, sequence_length: int) -> np.ndarray:
+        """返回预分配输入缓冲区的 (batch_size, sequence_length, input_size) 视图，容量不足时扩容"""
+        capacity, length, dim = self._input_buffer.shape
+        if (length, dim) != (sequence_length, self.input_size):
+            capacity = 0
+        if batch_size > capacity:
+            self._input_buffer = np.zeros((max(batch_size, capacity * 2), sequence_length, self.input_size),
+                                          dtype=np.float32)
+        return self._input_buffer[:batch_size]
+    
+    def _fall_probabilities(self, inputs: np.ndarray) -> np.ndarray:
+        """按当前推理后端计算摔倒概率，inputs为 (B, sequence_length, D) 的float32数组"""
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        if self.runtime == 'onnx':
+            logits = self._exported_model.run(None, {'input': inputs})[0]
+            logits = logits - logits.max(axis=1, keepdims=True)
+            exp = np.exp(logits)
+            return (exp[:, 1] / exp.sum(axis=1)).astype(np.float32)
+        
+        if self.runtime == 'torchscript':
+            model, device = self._exported_model, torch.device('cpu')
+        else:
+            model, device = self.model, self.device
+            model.eval()
+        # torch.from_numpy与输入数组共享内存，CPU上不产生拷贝
+        input_tensor = torch.from_numpy(inputs)
+        if device.type != 'cpu':
+            input_tensor = input_tensor.to(device, non_blocking=True)
+        with torch.inference_mode():
+            outputs = model(input_tensor)
+            return torch.softmax(outputs, dim=1)[:, 1].cpu().numpy()
+    
+    def extract_pose_features_batch(self, poses) -> np.ndarray:
+        """提取一帧中每个人的特征，返回 (N, D)"""
+        return extract_pose_features(poses)
+    
+    def predict_batch(self, sequences: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次前向计算对多条特征序列打分
         
-        # 预测
-        self.model.eval()
-        with torch.no_grad():
-            outputs = self.model(input_tensor)
-            probabilities = torch.softmax(outputs, dim=1)
-            fall_probability = probabilities[0, 1].item()
-            prediction = fall_probability > 0.5
+        Args:
+            sequences: 特征序列数组 (B, sequence_length, D)
+            
+        Returns:
+            (是否摔倒 (B,), 摔倒概率 (B,))
+        """
+        if not self.is_trained:
+            raise ValueError("模型未训练")
         
-        return prediction, fall_probability
+        if len(sequences) == 0:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.float32)
+        
+        fall_probabilities = self._fall_probabilities(sequences)
+        return fall_probabilities > 0.5, fall_probabilities
+    
+    def predict_tracks(self, tracker, track_ids: List[int] = None) -> Dict[int, Tuple[bool, float]]:
+        """
+        对跟踪器中每个序列已满的目标批量预测
+        
+        Args:
+            tracker: PoseTracker实例，其特征缓冲区由extract_pose_features_batch的输出填充
+            track_ids: 只预测这些目标（默认为本帧出现的所有目标）
+            
+        Returns:
+            {跟踪ID: (是否摔倒, 摔倒概率)}
+        """
+        ready_ids, sequences = tracker.sequences(track_ids)
+        if not ready_ids:
+            return {}
+        
+        predictions, probabilities = self.predict_batch(sequences)
+        return {
+            track_id: (bool(pred), float(prob))
+            for track_id, pred, prob in zip(ready_ids, predictions, probabilities)
+        }
     
     def save_model(self, filepath: str):
         """保存模型"""
+        if self.is_trained and self.runtime != 'eager':
+            raise ValueError("导出的模型不能保存为训练检查点，请直接使用导出文件")
         if self.is_trained:
-            torch.save({
-                'model_state_dict': self.model.state_dict(),
-                'model_type': self.model_type,
-                'input_size': self.input_size
-            }, filepath)
+            torch.save(self._checkpoint(self.model.state_dict()), filepath)
             print(f"模型已保存到: {filepath}")
     
+    def _checkpoint(self, state_dict: Dict[str, torch.Tensor]) -> Dict[str, Any]:
+        return {
+            'model_state_dict': state_dict,
+            'model_type': self.model_type,
+            'input_size': self.input_size
+        }
+    
     def load_model(self, filepath: str):
         """加载模型"""
         if os.path.exists(filepath):
@@ -567,7 +669,92 @@ class DeepLearningFallDetector:
             self.create_model()
             self.model.load_state_dict(checkpoint['model_state_dict'])
             self.is_trained = True
+            self.runtime = 'eager'
+            self._exported_model = None
             print(f"模型已从 {filepath} 加载")
+    
+    def export_model(self, filepath: str, export_format: str = 'torchscript', quantize: bool = False,
+                     sequence_length: int = 10) -> str:
+        """
+        导出模型用于部署
+        
+        Args:
+            filepath: 导出文件路径，同时在旁边写入 <filepath>.json 记录输入形状等信息
+            export_format: torchscript 或 onnx
+            quantize: 是否做int8动态量化（LSTM和全连接层权重量化，推理仅支持CPU）
+            sequence_length: 输入序列长度
+            
+        Returns:
+            导出文件路径
+        """
+        if not self.is_trained or self.runtime != 'eager':
+            raise ValueError("只能导出训练好的模型")
+        if export_format not in self.EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+        
+        directory = os.path.dirname(os.path.abspath(filepath))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        
+        # 在CPU上的副本上导出，不影响当前模型
+        model = LSTMFallDetector(self.input_size, self.model.hidden_size, self.model.num_layers)
+        model.load_state_dict({k: v.cpu() for k, v in self.model.state_dict().items()})
+        model.eval()
+        example = torch.zeros(1, sequence_length, self.input_size)
+        
+        if export_format == 'torchscript':
+            if quantize:
+                model = torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+            with torch.inference_mode():
+                scripted = torch.jit.trace(model, example)
+            scripted = torch.jit.freeze(scripted) if not quantize else scripted
+            torch.jit.save(scripted, filepath)
+        else:
+            # ONNX的量化由onnxruntime在导出的fp32模型上完成
+            fp32_path = filepath + '.fp32.onnx' if quantize else filepath
+            torch.onnx.export(model, example, fp32_path, input_names=['input'], output_names=['logits'],
+                              dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}})
+            if quantize:
+                try:
+                    from onnxruntime.quantization import quantize_dynamic, QuantType
+                except ImportError as e:
+                    raise ImportError("ONNX量化需要安装onnxruntime") from e
+                quantize_dynamic(fp32_path, filepath, weight_type=QuantType.QInt8)
+                os.remove(fp32_path)
+        
+        with open(filepath + '.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': export_format,
+                'quantized': quantize,
+                'model_type': self.model_type,
+                'input_size': self.input_size,
+                'sequence_length': sequence_length
+            }, f, indent=2, ensure_ascii=False)
+        
+        print(f"模型已导出到: {filepath} ({export_format}{', int8' if quantize else ''})")
+        return filepath
+    
+    def load_exported_model(self, filepath: str):
+        """加载 export_model 导出的模型，之后的预测在CPU上使用导出的模型"""
+        with open(filepath + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        if meta['format'] == 'onnx':
+            try:
+                import onnxruntime
+            except ImportError as e:
+                raise ImportError("加载ONNX模型需要安装onnxruntime") from e
+            self._exported_model = onnxruntime.InferenceSession(filepath, providers=['CPUExecutionProvider'])
+        else:
+            self._exported_model = torch.jit.load(filepath, map_location='cpu')
+            self._exported_model.eval()
+        
+        self.runtime = meta['format']
+        self.model_type = meta['model_type']
+        self.input_size = meta['input_size']
+        self.model = None
+        self.is_trained = True
+        print(f"已加载导出模型 {filepath} ({self.runtime}{', int8' if meta['quantized'] else ''})")
 
 if __name__ == "__main__":
     # 测试代码
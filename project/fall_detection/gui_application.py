@@ -15,13 +15,16 @@ from typing import Optional, Dict, Any
 import json
 
 # 导入自定义模块
-from pose_detection import PoseDetector, resize_pose
+from pose_detection import PoseDetector, RoiPoseDetector, resize_pose
 from fall_detection_algorithms import (
     ThresholdFallDetector, 
     TraditionalMLFallDetector, 
     DeepLearningFallDetector
 )
 from alert_system import AlertManager, AlertConfig
+from video_pipeline import LatestFrameQueue, StageStats, RateCounter, MotionGate
+from pose_tracking import PoseTracker
+from pose_features import extract_pose_features
 
 class FallDetectionGUI:
     """摔倒检测GUI应用程序"""
@@ -36,6 +39,7 @@ class FallDetectionGUI:
         self.source_type = tk.StringVar(value="未加载")
         self.frame_status = tk.StringVar(value="未检测")
         self.detect_speed = tk.StringVar(value="-")
+        self.stage_latency = tk.StringVar(value="-")
         self.current_algorithm = tk.StringVar(value="阈值法")
         self.frame_index = 0
         self.total_frames = 0
@@ -48,12 +52,27 @@ class FallDetectionGUI:
         self.detection_interval = 0.05  # 检测间隔（秒）
         self.last_poses = None  # 缓存上一帧的检测结果
         
+        # 解码/推理/渲染流水线
+        self.target_fps = 25.0
+        self.capture_lock = threading.Lock()
+        self.decode_queue = LatestFrameQueue(maxsize=2)
+        self.render_queue = LatestFrameQueue(maxsize=2)
+        self.pipeline_stats = StageStats(window=60)
+        self.display_rate = RateCounter(window_seconds=2.0)
+        self.pipeline_generation = 0
+        self.frame_status_value = "未检测"
+        self.last_stats_update = 0
+        # 运动门控：静止画面低频检测，有运动或疑似摔倒时提高检测频率
+        self.motion_gate = MotionGate(active_interval=self.detection_interval)
+        
         # 显示质量设置
         self.max_display_width = 640
         self.max_display_height = 480
         
         # 初始化组件
         self.pose_detector = PoseDetector()
+        # 整帧/区域推理调度，默认每帧整帧检测，可在设置中开启区域推理
+        self.roi_detector = RoiPoseDetector(self.pose_detector, detect_width=640, enabled=False)
         self.threshold_detector = ThresholdFallDetector()
         self.ml_detector = TraditionalMLFallDetector('svm')
         self.dl_detector = DeepLearningFallDetector('lstm')
@@ -63,7 +82,7 @@ class FallDetectionGUI:
         self.video_capture = None
         self.current_frame = None
         self.current_processed_frame = None
-        self.pose_sequence = []
+        self.pose_tracker = PoseTracker(sequence_length=10)  # 多人跟踪及每人的特征序列
         self.current_detection_results = {
             'threshold': {'is_fall': False, 'confidence': 0.0},
             'ml': {'is_fall': False, 'confidence': 0.0},
@@ -111,6 +130,14 @@ class FallDetectionGUI:
                               font=('Arial', 9), foreground='#009900', width=8)
         speed_label.pack(side=tk.LEFT, padx=5)
         
+        # 各阶段耗时（解码/推理/渲染/端到端延迟）
+        stage_frame = ttk.Frame(status_row)
+        stage_frame.pack(side=tk.LEFT, padx=10)
+        ttk.Label(stage_frame, text="⏱ 阶段耗时:", font=('Arial', 9, 'bold')).pack(side=tk.LEFT)
+        stage_label = ttk.Label(stage_frame, textvariable=self.stage_latency, 
+                              font=('Arial', 9), foreground='#666666', width=52)
+        stage_label.pack(side=tk.LEFT, padx=5)
+        
         # 算法
         algo_frame = ttk.Frame(status_row)
         algo_frame.pack(side=tk.LEFT, padx=10)
@@ -355,10 +382,19 @@ class FallDetectionGUI:
             self.processed_video_label.image = None
 
     def play_video(self):
-        """播放视频，支持暂停/进度条/检测显示"""
+        """播放视频，支持暂停/进度条/检测显示
+        
+        解码、推理、渲染分三个阶段流水线运行：
+        解码线程 -> decode_queue -> 推理线程 -> render_queue -> Tk主线程渲染
+        两个队列都只保留最新的帧，推理慢时丢弃旧帧而不会拖慢显示
+        """
         if self.video_capture is None:
             return
         
+        # 递增代数，让上一轮流水线的线程退出
+        self.pipeline_generation += 1
+        generation = self.pipeline_generation
+        
         self.is_video_playing = True
         self.is_paused = False
         self.pause_button.config(text="暂停")
@@ -368,84 +404,125 @@ class FallDetectionGUI:
         self.frame_info_label.config(text=f"0/{self.total_frames}")
         self.source_type.set("视频")
         
-        def video_loop():
-            frame_count = 0
-            fps_start_time = time.time()
-            last_detection_time = 0
+        self.decode_queue.clear()
+        self.render_queue.clear()
+        self.pipeline_stats.reset()
+        self.display_rate.reset()
+        self.motion_gate.reset()
+        self.roi_detector.reset()
+        
+        def is_running():
+            return self.is_video_playing and generation == self.pipeline_generation
+        
+        threading.Thread(target=self._decode_loop, args=(is_running,), daemon=True).start()
+        threading.Thread(target=self._inference_loop, args=(is_running,), daemon=True).start()
+        self.root.after(0, self._render_loop, is_running)
+    
+    def _decode_loop(self, is_running):
+        """解码阶段：按目标帧率读取视频帧放入decode_queue"""
+        frame_delay = 1.0 / self.target_fps
+        
+        while is_running():
+            if self.is_paused:
+                time.sleep(0.01)
+                continue
             
-            while self.is_video_playing:
-                if self.is_paused:
-                    time.sleep(0.01)
-                    continue
-                
+            t0 = time.time()
+            with self.capture_lock:
+                if self.video_capture is None:
+                    break
                 ret, frame = self.video_capture.read()
                 if not ret:
+                    # 播放结束后从头循环
                     self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    self.frame_index = 0
-                    frame_count = 0
-                    fps_start_time = time.time()
-                    last_detection_time = 0
                     continue
-                
-                self.frame_index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES))
-                self.frame_info_label.config(text=f"{self.frame_index}/{self.total_frames}")
-                self.progress_var.set(self.frame_index)
-                self.current_frame = frame
-                
-                current_time = time.time()
-                
-                # 智能检测：每隔一定时间进行一次完整检测
-                if current_time - last_detection_time > self.detection_interval:
-                    # 完整检测
-                    t0 = time.time()
-                    processed, status, poses = self.detect_and_draw(frame, return_poses=True)
-                    t1 = time.time()
-                    last_detection_time = current_time
-                    
-                    # 计算FPS（每30帧更新一次）
-                    frame_count += 1
-                    if frame_count % 30 == 0:
-                        current_fps_time = time.time()
-                        fps = 30.0 / (current_fps_time - fps_start_time)
-                        self.detect_speed.set(f"{fps:.1f} fps")
-                        fps_start_time = current_fps_time
-                    
-                    self.frame_status.set(status)
-                    self.display_frame(frame, None, poses=poses)
-                else:
-                    # 使用缓存的检测结果，只更新显示
-                    if self.last_poses is not None:
-                        self.display_frame(frame, None, poses=self.last_poses)
-                    else:
-                        self.display_frame(frame, frame)
-                
-                # 控制帧率 - 目标25fps
-                elapsed = time.time() - current_time
-                target_delay = 1.0 / 25.0
-                if elapsed < target_delay:
-                    time.sleep(target_delay - elapsed)
+                frame_index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES))
+            t1 = time.time()
+            self.pipeline_stats.record('decode', t1 - t0)
+            
+            self.decode_queue.put((frame_index, frame, t1))
+            
+            # 控制帧率 - 目标25fps
+            elapsed = time.time() - t0
+            if elapsed < frame_delay:
+                time.sleep(frame_delay - elapsed)
+    
+    def _inference_loop(self, is_running):
+        """推理阶段：取最新解码帧，由运动门控决定是否运行姿势检测"""
+        while is_running():
+            item = self.decode_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_index, frame, decoded_time = item
+            
+            current_time = time.time()
+            if self.motion_gate.should_detect(frame, current_time):
+                # 完整检测
+                poses, status = self.detect_frame(frame)
+                self.pipeline_stats.record('infer', time.time() - current_time)
+                self.frame_status_value = status
+                if status == "摔倒":
+                    # 疑似摔倒时逐帧检测，尽快确认
+                    self.motion_gate.boost(current_time)
+            else:
+                # 使用缓存的检测结果
+                poses = self.last_poses
+            
+            self.render_queue.put((frame_index, frame, poses, decoded_time))
+    
+    def _render_loop(self, is_running):
+        """渲染阶段：在Tk主线程中显示最新的推理结果"""
+        if not is_running():
+            return
         
-        threading.Thread(target=video_loop, daemon=True).start()
-
-    def detect_and_draw(self, frame, return_poses=False):
-        """检测并返回检测后图像和状态"""
-        # 降低检测分辨率以提高速度
-        height, width = frame.shape[:2]
-        if width > 640:  # 限制检测分辨率
-            scale = 640.0 / width
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            detect_frame = cv2.resize(frame, (new_width, new_height))
-        else:
-            detect_frame = frame.copy()
+        item = self.render_queue.get_latest()
+        if item is not None:
+            frame_index, frame, poses, decoded_time = item
+            t0 = time.time()
+            
+            self.frame_index = frame_index
+            self.current_frame = frame
+            self.frame_info_label.config(text=f"{frame_index}/{self.total_frames}")
+            self.progress_var.set(frame_index)
+            self.frame_status.set(self.frame_status_value)
+            if poses is not None:
+                self.display_frame(frame, None, poses=poses)
+            else:
+                self.display_frame(frame, frame)
+            
+            t1 = time.time()
+            self.pipeline_stats.record('render', t1 - t0)
+            self.pipeline_stats.record('latency', t1 - decoded_time)
+            self.display_rate.tick(t1)
+            
+            # 每0.5秒刷新一次各阶段耗时
+            if t1 - self.last_stats_update > 0.5:
+                self.last_stats_update = t1
+                self.detect_speed.set(f"{self.display_rate.rate():.1f} fps")
+                self.stage_latency.set(self.format_pipeline_stats())
         
-        poses = self.pose_detector.detect_pose(detect_frame)
+        self.root.after(10, self._render_loop, is_running)
+    
+    def format_pipeline_stats(self) -> str:
+        """格式化各阶段耗时"""
+        stats = self.pipeline_stats
+        gate = self.motion_gate
+        mode = {'boost': '加速', 'active': '运动', 'idle': '静止'}[gate.mode()]
+        return (f"解码 {stats.mean_ms('decode'):.0f}ms "
+                f"推理 {stats.mean_ms('infer'):.0f}ms 渲染 {stats.mean_ms('render'):.0f}ms "
+                f"延迟 {stats.mean_ms('latency'):.0f}ms 检测 {gate.detection_rate.rate():.1f}次/s({mode})")
+    
+    def detect_frame(self, frame):
+        """检测一帧的姿势并判定状态，返回 (poses, status)"""
+        # 整帧检测时缩小到640宽以提高速度；开启区域推理后只在已知人体附近的区域推理
+        # 返回的姿势均为原图坐标（PoseBatch，避免逐关键点构建字典）
+        poses = self.roi_detector.detect(frame)
         
         # 缓存检测结果
         self.last_poses = poses
         
         if not poses:
-            return frame, "未识别到骨骼点"
+            return poses, "未识别到骨骼点"
         
         # 选择算法
         algo = self.algorithm_var.get()
@@ -455,12 +532,23 @@ class FallDetectionGUI:
         
         # 快速检测逻辑
         if algo in ["threshold", "all"]:
-            for pose in poses:
-                is_fall, confidence, _ = self.threshold_detector.detect_fall(pose)
+            for pose_keypoints in poses.keypoints:
+                is_fall, confidence, _ = self.threshold_detector.detect_fall(pose_keypoints)
                 if is_fall:
                     status = "摔倒"
                     break  # 找到摔倒就停止
         
+        return poses, status
+    
+    def detect_and_draw(self, frame, return_poses=False):
+        """检测并返回检测后图像和状态"""
+        poses, status = self.detect_frame(frame)
+        
+        if not poses:
+            if return_poses:
+                return frame, status, poses
+            return frame, status
+        
         # 绘制骨架（使用原始分辨率）
         processed = self.pose_detector.draw_pose(frame, poses, draw_keypoints=True, draw_skeleton=True, draw_bbox=True)
         
@@ -471,6 +559,7 @@ class FallDetectionGUI:
     def update_detection_interval(self, value):
         """更新检测间隔"""
         self.detection_interval = float(value)
+        self.motion_gate.active_interval = self.detection_interval
         self.log_message(f"检测间隔已更新为: {self.detection_interval:.3f}秒")
 
     def update_display_quality(self, event=None):
@@ -495,7 +584,8 @@ class FallDetectionGUI:
     def on_progress_change(self, val):
         if self.video_capture is not None and self.total_frames>0:
             idx = int(float(val))
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            with self.capture_lock:
+                self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, idx)
             self.frame_index = idx
 
     def load_image(self):
@@ -522,17 +612,19 @@ class FallDetectionGUI:
             filetypes=[("视频文件", "*.mp4 *.avi *.mov *.mkv")]
         )
         if file_path:
-            if self.video_capture is not None:
-                self.video_capture.release()
-            self.video_capture = cv2.VideoCapture(file_path)
+            with self.capture_lock:
+                if self.video_capture is not None:
+                    self.video_capture.release()
+                self.video_capture = cv2.VideoCapture(file_path)
             self.source_type.set("视频")
             self.play_video()
             self.log_message(f"已加载视频: {file_path}", "SUCCESS")
 
     def open_camera(self):
-        if self.video_capture is not None:
-            self.video_capture.release()
-        self.video_capture = cv2.VideoCapture(0)
+        with self.capture_lock:
+            if self.video_capture is not None:
+                self.video_capture.release()
+            self.video_capture = cv2.VideoCapture(0)
         if not self.video_capture.isOpened():
             self.log_message("无法打开摄像头，请检查设备连接", "ERROR")
             return
@@ -543,9 +635,12 @@ class FallDetectionGUI:
     def stop_detection(self):
         """停止检测"""
         self.is_video_playing = False
-        if self.video_capture is not None:
-            self.video_capture.release()
-            self.video_capture = None
+        with self.capture_lock:
+            if self.video_capture is not None:
+                self.video_capture.release()
+                self.video_capture = None
+        self.decode_queue.clear()
+        self.render_queue.clear()
         
         # 清空视频窗口显示
         self.original_video_label.configure(image="", text="请加载图片或视频")
@@ -557,6 +652,7 @@ class FallDetectionGUI:
         self.source_type.set("未加载")
         self.frame_status.set("未检测")
         self.detect_speed.set("-")
+        self.stage_latency.set("-")
         self.frame_info_label.config(text="0/0")
         self.progress_var.set(0)
         
@@ -564,6 +660,9 @@ class FallDetectionGUI:
         self.current_frame = None
         self.current_processed_frame = None
         self.last_poses = None
+        self.pose_tracker.reset()
+        self.motion_gate.reset()
+        self.roi_detector.reset()
         
         self.log_message("已停止检测", "INFO")
         
@@ -579,53 +678,69 @@ class FallDetectionGUI:
         def detection_thread():
             try:
                 # 姿势检测
-                poses = self.pose_detector.detect_pose(self.current_frame)
+                poses = self.pose_detector.detect_pose(self.current_frame, as_array=True)
                 
                 if not poses:
                     self.log_message("未检测到人体姿势")
                     return
                 
-                # 更新姿势序列（用于深度学习）
-                self.pose_sequence.append(poses)
-                if len(self.pose_sequence) > 10:  # 保持最近10帧
-                    self.pose_sequence.pop(0)
-                
                 # 根据选择的算法进行检测
                 algorithm = self.algorithm_var.get()
                 
+                # 每帧只提取一次特征，机器学习和深度学习共用
+                use_ml = algorithm in ["ml", "all"] and self.ml_detector.is_trained
+                use_dl = algorithm in ["dl", "all"] and self.dl_detector.is_trained
+                features = extract_pose_features(poses) if use_ml or use_dl else None
+                
+                # 更新多人跟踪，每个跟踪目标维护自己的特征序列（用于深度学习）
+                track_ids = self.pose_tracker.update(poses, features if use_dl else None)
+                # 各跟踪目标的摔倒置信度（任一算法判定为摔倒即记录，取最大值）
+                fall_tracks: Dict[int, float] = {}
+                
+                def mark_fall(track_id, confidence):
+                    fall_tracks[int(track_id)] = max(fall_tracks.get(int(track_id), 0.0), float(confidence))
+                
                 if algorithm in ["threshold", "all"]:
-                    # 阈值法检测
-                    for pose in poses:
-                        is_fall, confidence, features = self.threshold_detector.detect_fall(pose)
-                        self.current_detection_results['threshold'] = {
-                            'is_fall': is_fall,
-                            'confidence': confidence
-                        }
+                    # 阈值法检测：一次判定画面中所有人
+                    is_fall, confidence, _ = self.threshold_detector.detect_fall_batch(poses.keypoints)
+                    self.current_detection_results['threshold'] = {
+                        'is_fall': bool(is_fall.any()),
+                        'confidence': float(confidence.max())
+                    }
+                    for det_idx in np.flatnonzero(is_fall):
+                        mark_fall(track_ids[det_idx], confidence[det_idx])
                 
-                if algorithm in ["ml", "all"]:
-                    # 机器学习检测
-                    if self.ml_detector.is_trained:
-                        predictions, probabilities = self.ml_detector.predict(poses)
-                        if predictions:
-                            self.current_detection_results['ml'] = {
-                                'is_fall': predictions[0],
-                                'confidence': probabilities[0]
-                            }
+                if use_ml:
+                    # 机器学习检测：画面中所有人一次预测
+                    predictions, probabilities = self.ml_detector.predict_features(features)
+                    self.current_detection_results['ml'] = {
+                        'is_fall': bool(predictions[0]),
+                        'confidence': float(probabilities[0])
+                    }
+                    for det_idx in np.flatnonzero(predictions):
+                        mark_fall(track_ids[det_idx], probabilities[det_idx])
                 
-                if algorithm in ["dl", "all"]:
-                    # 深度学习检测
-                    if self.dl_detector.is_trained and len(self.pose_sequence) >= 10:
-                        is_fall, confidence = self.dl_detector.predict(self.pose_sequence)
+                if use_dl:
+                    # 深度学习检测：所有序列已满的跟踪目标一次批量预测
+                    track_results = self.dl_detector.predict_tracks(self.pose_tracker, track_ids.tolist())
+                    if track_results:
+                        fall_track, (is_fall, confidence) = max(
+                            track_results.items(), key=lambda item: item[1][1])
                         self.current_detection_results['dl'] = {
                             'is_fall': is_fall,
                             'confidence': confidence
                         }
+                        if is_fall:
+                            self.log_message(f"跟踪目标 {fall_track} 疑似摔倒，概率: {confidence:.2f}")
+                        for track_id, (track_fall, track_confidence) in track_results.items():
+                            if track_fall:
+                                mark_fall(track_id, track_confidence)
                 
                 # 更新显示
                 # self.update_result_display() # 删除此行
                 
                 # 检查是否需要发送预警
-                self.check_and_send_alert()
+                self.check_and_send_alert(fall_tracks)
                 
                 self.log_message("检测完成")
                 
@@ -684,24 +799,16 @@ class FallDetectionGUI:
     #         text=f"置信度: {dl_result['confidence']:.2f}" # 删除此行
     #     ) # 删除此行
         
-    def check_and_send_alert(self):
-        """检查并发送预警"""
-        # 检查是否有任何算法检测到摔倒
-        any_fall_detected = any(
-            result['is_fall'] for result in self.current_detection_results.values()
-        )
-        
-        if any_fall_detected:
-            # 计算平均置信度
-            confidences = [
-                result['confidence'] for result in self.current_detection_results.values()
-                if result['is_fall']
-            ]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
-            
-            # 发送预警
-            self.alert_manager.send_fall_alert(avg_confidence, self.current_frame)
-            self.log_message(f"检测到摔倒！已发送预警，置信度: {avg_confidence:.2f}")
+    def check_and_send_alert(self, fall_tracks: Dict[int, float]):
+        """
+        把各跟踪目标的摔倒判定交给预警管理器
+        同一目标的连续摔倒合并为一个事件并按目标分别冷却，多个事件合并为摘要发送
+        """
+        source = self.source_type.get()
+        for track_id, confidence in fall_tracks.items():
+            if self.alert_manager.report_detection((source, track_id), True, confidence,
+                                                   self.current_frame, location=source):
+                self.log_message(f"跟踪目标 {track_id} 摔倒！已加入预警，置信度: {confidence:.2f}")
             
     def configure_alerts(self):
         """配置预警"""
@@ -809,8 +916,11 @@ class FallDetectionGUI:
                 self.ml_detector.load_model("ml_model.pkl")
                 self.log_message("机器学习模型加载成功")
             
-            # 加载深度学习模型
-            if os.path.exists("dl_model.pth"):
+            # 加载深度学习模型，优先使用导出的部署模型（python main.py --mode export）
+            if os.path.exists("dl_model.ts"):
+                self.dl_detector.load_exported_model("dl_model.ts")
+                self.log_message("深度学习模型（导出版）加载成功")
+            elif os.path.exists("dl_model.pth"):
                 self.dl_detector.load_model("dl_model.pth")
                 self.log_message("深度学习模型加载成功")
                 
@@ -824,7 +934,7 @@ class FallDetectionGUI:
                 self.ml_detector.save_model("ml_model.pkl")
                 self.log_message("机器学习模型保存成功")
             
-            if self.dl_detector.is_trained:
+            if self.dl_detector.is_trained and self.dl_detector.runtime == 'eager':
                 self.dl_detector.save_model("dl_model.pth")
                 self.log_message("深度学习模型保存成功")
                 
@@ -837,6 +947,8 @@ class FallDetectionGUI:
             config = {
                 'algorithm': self.algorithm_var.get(),
                 'detection_interval': self.detection_interval,
+                'adaptive_detection': self.motion_gate.enabled,
+                'roi_inference': self.roi_detector.enabled,
                 'display_quality': self.display_quality_var.get() if hasattr(self, 'display_quality_var') else '中等',
                 'alert_settings': {
                     'email_enabled': True,
@@ -888,6 +1000,16 @@ class FallDetectionGUI:
         yolo_combo.grid(row=1, column=1, sticky=tk.EW, padx=5)
         ttk.Label(detect_settings, textvariable=yolo_weight_var, width=16).grid(row=1, column=2, sticky=tk.W)
         
+        # 运动自适应检测：画面静止时降低检测频率
+        adaptive_var = tk.BooleanVar(value=self.motion_gate.enabled)
+        ttk.Checkbutton(detect_settings, text="运动自适应检测（静止画面降低检测频率）",
+                        variable=adaptive_var).grid(row=2, column=0, columnspan=3, sticky=tk.W)
+        
+        # 区域推理：找到人后只在其周围区域推理，定期整帧检测发现新的人
+        roi_var = tk.BooleanVar(value=self.roi_detector.enabled)
+        ttk.Checkbutton(detect_settings, text="区域推理（高分辨率摄像头，只检测已跟踪人体附近区域）",
+                        variable=roi_var).grid(row=3, column=0, columnspan=3, sticky=tk.W)
+        
         # 阈值法参数
         threshold_settings = ttk.LabelFrame(main_settings_frame, text="📏 阈值法参数", padding=10)
         threshold_settings.pack(fill=tk.X, pady=(0, 10))
@@ -960,7 +1082,7 @@ class FallDetectionGUI:
         
         # 预警冷却时间
         ttk.Label(alert_settings, text="预警冷却时间 (秒):").pack(anchor=tk.W)
-        cooldown_var = tk.IntVar(value=60)
+        cooldown_var = tk.IntVar(value=int(self.alert_manager.incidents.cooldown))
         cooldown_scale = ttk.Scale(alert_settings, variable=cooldown_var, from_=10, to=300, 
                                  orient=tk.HORIZONTAL)
         cooldown_scale.pack(fill=tk.X, pady=5)
@@ -976,6 +1098,11 @@ class FallDetectionGUI:
         def apply_settings():
             try:
                 self.detection_interval = interval_var.get()
+                self.motion_gate.active_interval = self.detection_interval
+                self.motion_gate.enabled = adaptive_var.get()
+                self.roi_detector.enabled = roi_var.get()
+                self.roi_detector.reset()
+                self.alert_manager.incidents.cooldown = cooldown_var.get()
                 # 更新阈值法参数
                 self.threshold_detector.height_ratio = height_ratio_var.get()
                 self.threshold_detector.width_ratio = width_ratio_var.get()
@@ -1035,6 +1162,7 @@ class FallDetectionGUI:
         try:
             # 加载预警配置
             config = self.alert_config.config
+            self.alert_manager.incidents.cooldown = config['general'].get('alert_cooldown', 60)
             
             if config['email']['enabled']:
                 self.alert_manager.add_email_alert(
@@ -1058,6 +1186,8 @@ class FallDetectionGUI:
     def on_closing(self):
         """程序关闭时的清理工作"""
         self.stop_detection()
+        # 发完已排队的预警再退出
+        self.alert_manager.shutdown(timeout=5.0)
         self.root.destroy()
 
 def main():
@@ -7,11 +7,12 @@ import os
 import argparse
 from pathlib import Path
 
+import numpy as np
+
 # 添加项目路径到系统路径
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from gui_application import main as gui_main
 from pose_detection import PoseDetector
 from fall_detection_algorithms import ThresholdFallDetector
 from alert_system import AlertManager
@@ -19,8 +20,26 @@ from alert_system import AlertManager
 def run_gui():
     """运行GUI应用程序"""
     print("启动摔倒检测系统GUI...")
+    # 延迟导入，使无界面模式不依赖Tk
+    from gui_application import main as gui_main
     gui_main()
 
+def _score_pose_chunk(fall_detector: ThresholdFallDetector, poses_chunk, first_frame: int):
+    """对一段连续帧的所有姿势做一次向量化摔倒判定，返回摔倒记录"""
+    person_counts = [len(poses) for poses in poses_chunk]
+    if sum(person_counts) == 0:
+        return []
+    
+    all_keypoints = np.concatenate([poses.keypoints for poses in poses_chunk])
+    frame_ids = np.repeat(np.arange(first_frame, first_frame + len(poses_chunk)), person_counts)
+    is_fall, confidences, features = fall_detector.detect_fall_batch(all_keypoints)
+    
+    return [{
+        'frame': int(frame_ids[row]),
+        'confidence': float(confidences[row]),
+        'features': {name: float(values[row]) for name, values in features.items()}
+    } for row in np.flatnonzero(is_fall)]
+
 def run_command_line_detection(video_path: str, output_path: str = None):
     """运行命令行检测"""
     print(f"开始处理视频: {video_path}")
@@ -30,23 +49,20 @@ def run_command_line_detection(video_path: str, output_path: str = None):
     fall_detector = ThresholdFallDetector()
     
     try:
-        # 处理视频
-        poses_sequence = pose_detector.process_video(video_path)
-        
-        print(f"视频处理完成，共 {len(poses_sequence)} 帧")
-        
-        # 检测摔倒
+        # 逐帧流式处理（数组形式），每凑满一段再向量化判定，内存不随视频长度增长
         fall_detections = []
-        for i, poses in enumerate(poses_sequence):
-            if poses:
-                for pose in poses:
-                    is_fall, confidence, features = fall_detector.detect_fall(pose)
-                    if is_fall:
-                        fall_detections.append({
-                            'frame': i,
-                            'confidence': confidence,
-                            'features': features
-                        })
+        total_frames = 0
+        chunk = []
+        for poses in pose_detector.iter_video_poses(video_path, as_array=True):
+            chunk.append(poses)
+            total_frames += 1
+            if len(chunk) >= 256:
+                fall_detections.extend(_score_pose_chunk(fall_detector, chunk, total_frames - len(chunk)))
+                chunk = []
+        if chunk:
+            fall_detections.extend(_score_pose_chunk(fall_detector, chunk, total_frames - len(chunk)))
+        
+        print(f"视频处理完成，共 {total_frames} 帧")
         
         # 输出结果
         if fall_detections:
@@ -61,7 +77,7 @@ def run_command_line_detection(video_path: str, output_path: str = None):
             import json
             result = {
                 'video_path': video_path,
-                'total_frames': len(poses_sequence),
+                'total_frames': total_frames,
                 'fall_detections': fall_detections,
                 'processing_time': 'completed'
             }
@@ -74,14 +90,16 @@ def run_command_line_detection(video_path: str, output_path: str = None):
     except Exception as e:
         print(f"处理失败: {e}")
 
-def run_training(data_path: str, output_path: str = "trained_models"):
+def run_training(data_path: str, output_path: str = "trained_models", num_workers: int = 1,
+                 time_budget: float = None):
     """运行模型训练"""
     print(f"开始训练模型，数据路径: {data_path}")
     
     try:
         from training_utils import ModelTrainer
         
-        trainer = ModelTrainer()
+        # 特征缓存放在模型输出目录下，重复训练同一数据集时跳过特征提取
+        trainer = ModelTrainer(cache_dir=os.path.join(output_path, "feature_cache"))
         
         # 准备数据
         print("准备训练数据...")
@@ -90,7 +108,8 @@ def run_training(data_path: str, output_path: str = "trained_models"):
         
         # 训练传统机器学习模型
         print("训练传统机器学习模型...")
-        ml_results = trainer.train_traditional_ml_models(X, y, output_path)
+        ml_results = trainer.train_traditional_ml_models(X, y, output_path, num_workers=num_workers,
+                                                         time_budget=time_budget)
         
         # 训练深度学习模型
         print("训练深度学习模型...")
@@ -101,16 +120,55 @@ def run_training(data_path: str, output_path: str = "trained_models"):
     except Exception as e:
         print(f"训练失败: {e}")
 
+def run_export(model_path: str, output_path: str = None, export_format: str = 'torchscript',
+               quantize: bool = False):
+    """把训练好的深度学习模型导出为TorchScript/ONNX，用于CPU部署"""
+    from fall_detection_algorithms import DeepLearningFallDetector
+    
+    detector = DeepLearningFallDetector('lstm')
+    detector.load_model(model_path)
+    if not detector.is_trained:
+        print(f"错误: 无法加载模型 {model_path}")
+        return
+    
+    if output_path is None:
+        suffix = '.onnx' if export_format == 'onnx' else '.ts'
+        output_path = os.path.splitext(model_path)[0] + ('_int8' if quantize else '') + suffix
+    
+    try:
+        detector.export_model(output_path, export_format, quantize)
+    except Exception as e:
+        print(f"导出失败: {e}")
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="摔倒检测系统")
-    parser.add_argument('--mode', choices=['gui', 'detect', 'train'], 
+    parser.add_argument('--mode', choices=['gui', 'detect', 'train', 'stream', 'export'], 
                        default='gui', help='运行模式')
     parser.add_argument('--video', type=str, help='视频文件路径')
     parser.add_argument('--output', type=str, help='输出文件路径')
     parser.add_argument('--data', type=str, help='训练数据路径')
+    parser.add_argument('--source', type=str,
+                       help='流式检测输入源：视频文件、视频目录、摄像头索引或网络流地址')
+    parser.add_argument('--events', type=str, default='-',
+                       help='流式检测事件输出路径 (JSON Lines)，- 表示标准输出')
+    parser.add_argument('--annotated-output', type=str,
+                       help='流式检测标注视频输出路径（多个输入源时为目录）')
+    parser.add_argument('--max-frames', type=int, help='每个输入源最多处理的帧数')
+    parser.add_argument('--detect-width', type=int, default=640, help='流式检测的检测分辨率宽度')
+    parser.add_argument('--model', type=str, default='yolov8n-pose.pt', help='流式检测的YOLO姿势模型路径')
+    parser.add_argument('--roi', action='store_true', help='流式检测区域推理：找到人后只在其周围区域推理')
+    parser.add_argument('--device', type=str, default='cuda', help='推理设备 (cpu/cuda)')
     parser.add_argument('--model-output', type=str, default='trained_models',
                        help='模型输出路径')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='并行训练传统模型的进程数')
+    parser.add_argument('--time-budget', type=float, default=None,
+                       help='传统模型训练的时间预算（秒）')
+    parser.add_argument('--dl-model', type=str, help='导出模式：训练得到的深度学习模型 (.pth)')
+    parser.add_argument('--export-format', choices=['torchscript', 'onnx'], default='torchscript',
+                       help='导出格式')
+    parser.add_argument('--quantize', action='store_true', help='导出时做int8动态量化')
     
     args = parser.parse_args()
     
@@ -125,7 +183,19 @@ def main():
         if not args.data:
             print("错误: 训练模式需要指定数据路径 (--data)")
             return
-        run_training(args.data, args.model_output)
+        run_training(args.data, args.model_output, args.workers, args.time_budget)
+    elif args.mode == 'stream':
+        if not args.source:
+            print("错误: 流式检测模式需要指定输入源 (--source)")
+            return
+        from stream_detection import run_stream_detection
+        run_stream_detection(args.source, args.events, args.annotated_output, args.max_frames,
+                             args.detect_width, args.device, args.model, args.roi)
+    elif args.mode == 'export':
+        if not args.dl_model:
+            print("错误: 导出模式需要指定深度学习模型路径 (--dl-model)")
+            return
+        run_export(args.dl_model, args.output, args.export_format, args.quantize)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+姿势数据结构模块
+以列式NumPy数组存储一帧中所有人的骨骼点，字典形式仅用于兼容旧接口
+"""
+
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+# COCO关键点定义
+KEYPOINT_NAMES = [
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle'
+]
+KEYPOINT_INDEX = {name: i for i, name in enumerate(KEYPOINT_NAMES)}
+NUM_KEYPOINTS = len(KEYPOINT_NAMES)
+
+
+class PoseBatch:
+    """
+    一帧中所有人的姿势
+
+    keypoints: (N, 17, 3) float32，最后一维为 x, y, confidence
+    bboxes: (N, 4) float32，缺失的边框用NaN填充
+    scores: (N,) float32，人体检测置信度
+    """
+
+    def __init__(self, keypoints: Optional[np.ndarray] = None, bboxes: Optional[np.ndarray] = None,
+                 scores: Optional[np.ndarray] = None):
+        if keypoints is None:
+            keypoints = np.zeros((0, NUM_KEYPOINTS, 3), dtype=np.float32)
+        self.keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, NUM_KEYPOINTS, 3)
+        num_persons = len(self.keypoints)
+
+        if bboxes is None:
+            bboxes = np.full((num_persons, 4), np.nan, dtype=np.float32)
+        self.bboxes = np.asarray(bboxes, dtype=np.float32).reshape(num_persons, 4)
+
+        if scores is None:
+            scores = np.zeros(num_persons, dtype=np.float32)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(num_persons)
+
+    def __len__(self):
+        return len(self.keypoints)
+
+    def __iter__(self):
+        # 兼容旧代码：逐人迭代时返回字典视图
+        return iter(self.to_dicts())
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        if idx < 0:
+            idx += len(self)
+        return self._pose_dict(idx, self.keypoints[idx].tolist())
+
+    def __repr__(self):
+        return f"PoseBatch(persons={len(self)})"
+
+    @property
+    def xy(self) -> np.ndarray:
+        """关键点坐标 (N, 17, 2)"""
+        return self.keypoints[..., :2]
+
+    @property
+    def confidence(self) -> np.ndarray:
+        """关键点置信度 (N, 17)"""
+        return self.keypoints[..., 2]
+
+    def scale(self, scale_x: float, scale_y: float) -> 'PoseBatch':
+        """返回坐标缩放后的新PoseBatch"""
+        factors = np.array([scale_x, scale_y, 1.0], dtype=np.float32)
+        box_factors = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+        return PoseBatch(self.keypoints * factors, self.bboxes * box_factors, self.scores.copy())
+
+    def select(self, indices) -> 'PoseBatch':
+        """按索引选取部分人体"""
+        return PoseBatch(self.keypoints[indices], self.bboxes[indices], self.scores[indices])
+
+    @classmethod
+    def concatenate(cls, batches: List['PoseBatch']) -> 'PoseBatch':
+        """合并多个PoseBatch"""
+        if len(batches) == 1:
+            return batches[0]
+        if not batches:
+            return cls()
+        return cls(
+            np.concatenate([b.keypoints for b in batches]),
+            np.concatenate([b.bboxes for b in batches]),
+            np.concatenate([b.scores for b in batches])
+        )
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """转换为旧版字典格式"""
+        keypoints = self.keypoints.tolist()
+        return [self._pose_dict(i, kps) for i, kps in enumerate(keypoints)]
+
+    def _pose_dict(self, idx: int, kps: List[List[float]]) -> Dict[str, Any]:
+        bbox = self.bboxes[idx]
+        return {
+            'person_id': idx,
+            'keypoints': {
+                name: {'x': x, 'y': y, 'confidence': conf}
+                for name, (x, y, conf) in zip(KEYPOINT_NAMES, kps)
+            },
+            'bbox': None if np.isnan(bbox).any() else bbox.tolist(),
+            'confidence': float(self.scores[idx])
+        }
+
+    @classmethod
+    def from_dicts(cls, poses: List[Dict[str, Any]]) -> 'PoseBatch':
+        """由旧版字典格式构建，缺失的关键点置为0"""
+        keypoints = np.zeros((len(poses), NUM_KEYPOINTS, 3), dtype=np.float32)
+        bboxes = np.full((len(poses), 4), np.nan, dtype=np.float32)
+        scores = np.zeros(len(poses), dtype=np.float32)
+
+        for i, pose in enumerate(poses):
+            for name, kp in pose.get('keypoints', {}).items():
+                idx = KEYPOINT_INDEX.get(name)
+                if idx is not None:
+                    keypoints[i, idx] = (kp['x'], kp['y'], kp['confidence'])
+            bbox = pose.get('bbox')
+            if bbox is not None and len(bbox) == 4:
+                bboxes[i] = bbox
+            scores[i] = pose.get('confidence', 0.0)
+
+        return cls(keypoints, bboxes, scores)
+
+
+def as_pose_batch(poses) -> PoseBatch:
+    """将PoseBatch、关键点数组或字典列表统一转换为PoseBatch"""
+    if isinstance(poses, PoseBatch):
+        return poses
+    if isinstance(poses, np.ndarray):
+        return PoseBatch(poses)
+    if isinstance(poses, dict):
+        return PoseBatch.from_dicts([poses])
+    return PoseBatch.from_dicts(list(poses) if poses is not None else [])
+
+
+def as_keypoint_array(poses) -> np.ndarray:
+    """将任意姿势表示转换为 (N, 17, 3) 关键点数组"""
+    return as_pose_batch(poses).keypoints
+
+
+def as_pose_dicts(poses) -> List[Dict[str, Any]]:
+    """将任意姿势表示转换为旧版字典列表"""
+    if isinstance(poses, (PoseBatch, np.ndarray)):
+        return as_pose_batch(poses).to_dicts()
+    if isinstance(poses, dict):
+        return [poses]
+    return list(poses)
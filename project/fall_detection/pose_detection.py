@@ -5,15 +5,20 @@
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import os
 from typing import List, Tuple, Dict, Any
 import json
 
+from pose_batch import PoseBatch, KEYPOINT_NAMES, KEYPOINT_INDEX, as_pose_batch
+from pose_tracking import pose_boxes, iou_matrix
+
 def resize_pose(poses, scale_x, scale_y):
     """
     对一组pose结果进行坐标缩放，返回新pose列表
+    输入为PoseBatch时直接对数组缩放并返回PoseBatch
     """
+    if isinstance(poses, PoseBatch):
+        return poses.scale(scale_x, scale_y)
     new_poses = []
     for pose in poses:
         new_pose = dict(pose)
@@ -31,8 +36,118 @@ def resize_pose(poses, scale_x, scale_y):
         new_poses.append(new_pose)
     return new_poses
 
+class SkeletonRenderPlan:
+    """
+    骨架渲染方案
+    将关键点颜色、半径和骨架连接预先编译为数组，绘制时只做索引运算，
+    同色骨架线条合并为一次 cv2.polylines 调用
+    """
+    
+    # 关键点颜色 - 按身体部位分组 (BGR)
+    KEYPOINT_COLORS = {
+        # 头部关键点 - 蓝色系
+        'nose': (255, 100, 100),      # 浅蓝色
+        'left_eye': (255, 150, 150),  # 蓝色
+        'right_eye': (255, 150, 150), # 蓝色
+        'left_ear': (255, 200, 200),  # 浅蓝色
+        'right_ear': (255, 200, 200), # 浅蓝色
+        
+        # 上肢关键点 - 绿色系
+        'left_shoulder': (100, 255, 100),  # 浅绿色
+        'right_shoulder': (100, 255, 100), # 浅绿色
+        'left_elbow': (150, 255, 150),     # 绿色
+        'right_elbow': (150, 255, 150),    # 绿色
+        'left_wrist': (200, 255, 200),     # 浅绿色
+        'right_wrist': (200, 255, 200),    # 浅绿色
+        
+        # 躯干关键点 - 红色系
+        'left_hip': (100, 100, 255),   # 浅红色
+        'right_hip': (100, 100, 255),  # 浅红色
+        
+        # 下肢关键点 - 黄色系
+        'left_knee': (100, 255, 255),  # 浅黄色
+        'right_knee': (100, 255, 255), # 浅黄色
+        'left_ankle': (150, 255, 255), # 黄色
+        'right_ankle': (150, 255, 255) # 黄色
+    }
+    
+    # 重要关键点画得稍大
+    MAJOR_KEYPOINTS = ('nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip')
+    
+    # 骨架连接按颜色分组，组内顺序即绘制顺序
+    SKELETON_GROUPS = [
+        # 头部连接 - 蓝色线条
+        ((255, 100, 100), [('left_eye', 'right_eye'), ('left_eye', 'left_ear'), ('right_eye', 'right_ear'),
+                           ('nose', 'left_eye'), ('nose', 'right_eye')]),
+        # 躯干连接 - 红色线条
+        ((100, 100, 255), [('left_shoulder', 'right_shoulder'), ('left_shoulder', 'left_hip'),
+                           ('right_shoulder', 'right_hip'), ('left_hip', 'right_hip')]),
+        # 上肢连接 - 绿色线条
+        ((100, 255, 100), [('left_shoulder', 'left_elbow'), ('right_shoulder', 'right_elbow'),
+                           ('left_elbow', 'left_wrist'), ('right_elbow', 'right_wrist')]),
+        # 下肢连接 - 黄色线条
+        ((100, 255, 255), [('left_hip', 'left_knee'), ('right_hip', 'right_knee'),
+                           ('left_knee', 'left_ankle'), ('right_knee', 'right_ankle')])
+    ]
+    
+    def __init__(self, conf_threshold: float = 0.5, line_thickness: int = 3):
+        self.conf_threshold = conf_threshold
+        self.line_thickness = line_thickness
+        
+        self.keypoint_colors = [self.KEYPOINT_COLORS.get(name, (0, 255, 0)) for name in KEYPOINT_NAMES]
+        self.keypoint_radii = [4 if name in self.MAJOR_KEYPOINTS else 3 for name in KEYPOINT_NAMES]
+        
+        # 所有连接的端点索引按组依次排列，每组记录 (颜色, 起止位置)
+        pairs = [(KEYPOINT_INDEX[a], KEYPOINT_INDEX[b]) for _, connections in self.SKELETON_GROUPS for a, b in connections]
+        self.line_start = np.array([a for a, _ in pairs], dtype=np.intp)
+        self.line_end = np.array([b for _, b in pairs], dtype=np.intp)
+        self.line_groups = []
+        offset = 0
+        for color, connections in self.SKELETON_GROUPS:
+            self.line_groups.append((color, offset, offset + len(connections)))
+            offset += len(connections)
+    
+    def draw(self, image: np.ndarray, batch: PoseBatch, draw_keypoints=True, draw_skeleton=True, draw_bbox=True):
+        """在image上原地绘制一帧中所有人的姿势"""
+        if len(batch) == 0:
+            return image
+        
+        # 坐标截断为整数像素，与 int() 的行为一致
+        points = batch.xy.astype(np.int32)
+        visible = batch.confidence > self.conf_threshold
+        
+        # 绘制人物边框 - 使用白色边框，更清晰
+        if draw_bbox:
+            for bbox in batch.bboxes[~np.isnan(batch.bboxes).any(axis=1)].astype(np.int32).tolist():
+                cv2.rectangle(image, (bbox[0], bbox[1]), (bbox[2], bbox[3]), (255, 255, 255), 2)
+        
+        # 绘制关键点 - 白色外圈、彩色内圈、黑色中心
+        if draw_keypoints:
+            person_idx, kp_idx = np.nonzero(visible)
+            for (x, y), k in zip(points[person_idx, kp_idx].tolist(), kp_idx.tolist()):
+                radius = self.keypoint_radii[k]
+                cv2.circle(image, (x, y), radius + 1, (255, 255, 255), -1)
+                cv2.circle(image, (x, y), radius, self.keypoint_colors[k], -1)
+                cv2.circle(image, (x, y), 1, (0, 0, 0), -1)
+        
+        # 绘制骨架线条 - 同色的所有线段（所有人）一次绘制
+        if draw_skeleton:
+            line_visible = visible[:, self.line_start] & visible[:, self.line_end]  # (N, E)
+            segments = np.stack([points[:, self.line_start], points[:, self.line_end]], axis=2)  # (N, E, 2, 2)
+            for color, start, end in self.line_groups:
+                group_visible = line_visible[:, start:end]
+                if group_visible.any():
+                    cv2.polylines(image, list(segments[:, start:end][group_visible]), False, color, self.line_thickness)
+        
+        return image
+
+
 class PoseDetector:
-    def __init__(self, model_path: str = "yolov8n-pose.pt", conf_threshold: float = 0.7, device: str = 'cuda'):
+    # 所有检测器共享的骨架渲染方案
+    render_plan = SkeletonRenderPlan()
+    
+    def __init__(self, model_path: str = "yolov8n-pose.pt", conf_threshold: float = 0.7, device: str = 'cuda',
+                 verbose: bool = True):
         """
         初始化姿势检测器
         
@@ -40,23 +155,23 @@ class PoseDetector:
             model_path: YOLO模型路径
             conf_threshold: 置信度阈值
             device: 设备类型 ('cpu' 或 'cuda')
+            verbose: 是否输出YOLO每帧的推理日志；ultralytics的日志直接写到进程的标准输出，
+                     redirect_stdout无法拦截，标准输出另作他用时必须关闭
         """
         self.model_path = model_path
         self.conf_threshold = conf_threshold
         self.device = device
+        self.verbose = verbose
         self.model = None
         self.load_model()
         
         # COCO关键点定义
-        self.keypoint_names = [
-            'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
-            'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
-            'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
-            'left_knee', 'right_knee', 'left_ankle', 'right_ankle'
-        ]
+        self.keypoint_names = list(KEYPOINT_NAMES)
         
     def load_model(self):
         """加载YOLO模型"""
+        # 只在加载模型时导入ultralytics，绘制等不需要模型的功能不依赖它
+        from ultralytics import YOLO
         try:
             print(f"正在加载模型: {self.model_path}")
             self.model = YOLO(self.model_path)
@@ -67,221 +182,215 @@ class PoseDetector:
             print("使用默认模型 yolo11x-pose.pt")
             self.model = YOLO("yolo11x-pose.pt")
     
-    def detect_pose(self, image) -> List[Dict[str, Any]]:
+    def detect_pose(self, image, as_array: bool = False):
         """
         检测图像中的人体姿势
         
         Args:
             image: 输入图像 (numpy array 或 文件路径)
+            as_array: 为True时返回PoseBatch，避免逐关键点构建字典
             
         Returns:
-            包含关键点信息的列表
+            包含关键点信息的列表，或PoseBatch
         """
         if self.model is None:
             raise ValueError("模型未加载")
         
         # 运行推理
-        results = self.model(image, conf=self.conf_threshold, device=self.device)
+        results = self.model(image, conf=self.conf_threshold, device=self.device, verbose=self.verbose)
         
-        poses = []
-        for result in results:
-            if result.keypoints is not None:
-                keypoints = result.keypoints.data.cpu().numpy()
-                confidences = result.keypoints.conf.cpu().numpy()
-                
-                for i, (kp, conf) in enumerate(zip(keypoints, confidences)):
-                    pose_data = {
-                        'person_id': i,
-                        'keypoints': {},
-                        'bbox': result.boxes.xyxy[i].cpu().numpy().tolist() if result.boxes is not None else None,
-                        'confidence': float(result.boxes.conf[i].cpu().numpy()) if result.boxes is not None else 0.0
-                    }
-                    
-                    # 提取关键点坐标和置信度
-                    for j, (name, point, conf_val) in enumerate(zip(self.keypoint_names, kp, conf)):
-                        pose_data['keypoints'][name] = {
-                            'x': float(point[0]),
-                            'y': float(point[1]),
-                            'confidence': float(conf_val)
-                        }
-                    
-                    poses.append(pose_data)
+        batch = PoseBatch.concatenate([self._result_to_batch(result) for result in results])
         
-        return poses
+        return batch if as_array else batch.to_dicts()
     
-    def process_video(self, video_path: str, output_path: str = None, save_frames: bool = False) -> List[List[Dict[str, Any]]]:
+    def detect_pose_batch(self, frames: List[np.ndarray], batch_size: int = 8, as_array: bool = False) -> List[Any]:
         """
-        处理视频文件
+        批量检测多帧图像中的人体姿势
+        
+        将帧按batch_size分组后一次送入模型，减少逐帧调用的开销
         
         Args:
-            video_path: 视频文件路径
-            output_path: 输出视频路径 (可选)
-            save_frames: 是否保存帧数据
+            frames: 图像列表 (numpy array)
+            batch_size: 每次推理的帧数
+            as_array: 为True时每帧返回PoseBatch
             
         Returns:
+            与输入帧一一对应的姿势检测结果列表
+        """
+        if self.model is None:
+            raise ValueError("模型未加载")
+        if batch_size < 1:
+            raise ValueError(f"batch_size必须大于0: {batch_size}")
+        
+        frame_poses = []
+        for start in range(0, len(frames), batch_size):
+            batch = list(frames[start:start + batch_size])
+            results = self.model(batch, conf=self.conf_threshold, device=self.device, verbose=self.verbose)
+            # 批量推理时每帧对应一个result
+            for result in results:
+                batch_poses = self._result_to_batch(result)
+                frame_poses.append(batch_poses if as_array else batch_poses.to_dicts())
+        
+        return frame_poses
+    
+    def detect_pose_rois(self, image: np.ndarray, boxes: np.ndarray, padding: float = 0.2,
+                         imgsz: int = 320) -> PoseBatch:
+        """
+        只在给定人体框附近的区域内检测姿势，所有区域一次批量推理
+        
+        Args:
+            image: 原始分辨率图像
+            boxes: 人体框 (N, 4)，原图坐标
+            padding: 每边向外扩展的比例（相对框的宽高）
+            imgsz: 区域推理的输入尺寸，人体区域远小于整帧，用较小的尺寸即可保持精度
+            
+        Returns:
+            原图坐标的PoseBatch，每个区域最多保留一个与原框最匹配的人，丢失的人不返回
+        """
+        if self.model is None:
+            raise ValueError("模型未加载")
+        if len(boxes) == 0:
+            return PoseBatch()
+        
+        height, width = image.shape[:2]
+        boxes = np.asarray(boxes, dtype=np.float32)
+        pad = np.stack([boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1) * padding
+        regions = np.concatenate([boxes[:, :2] - pad, boxes[:, 2:] + pad], axis=1)
+        regions = np.clip(np.round(regions), 0, [width, height, width, height]).astype(np.int32)
+        
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in regions.tolist()]
+        valid = [i for i, crop in enumerate(crops) if crop.shape[0] >= 16 and crop.shape[1] >= 16]
+        if not valid:
+            return PoseBatch()
+        
+        results = self.model([crops[i] for i in valid], conf=self.conf_threshold, device=self.device, imgsz=imgsz,
+                             verbose=self.verbose)
+        
+        found = []
+        for i, result in zip(valid, results):
+            crop_poses = self._result_to_batch(result)
+            if len(crop_poses) == 0:
+                continue
+            x1, y1 = regions[i, :2]
+            crop_poses = PoseBatch(
+                crop_poses.keypoints + np.array([x1, y1, 0], dtype=np.float32),
+                crop_poses.bboxes + np.array([x1, y1, x1, y1], dtype=np.float32),
+                crop_poses.scores
+            )
+            # 区域内可能出现相邻的其他人，只保留与原框重叠最多的一个
+            ious = iou_matrix(boxes[i:i + 1], pose_boxes(crop_poses))[0]
+            best = int(np.argmax(ious))
+            if ious[best] > 0:
+                found.append(crop_poses.select([best]))
+        
+        merged = PoseBatch.concatenate(found)
+        return self._suppress_duplicates(merged)
+    
+    @staticmethod
+    def _suppress_duplicates(batch: PoseBatch, iou_threshold: float = 0.7) -> PoseBatch:
+        """相邻区域重叠时同一个人可能被检测两次，按置信度保留一个"""
+        if len(batch) < 2:
+            return batch
+        boxes = pose_boxes(batch)
+        ious = iou_matrix(boxes, boxes)
+        keep = []
+        for idx in np.argsort(-batch.scores):
+            if all(ious[idx, k] < iou_threshold for k in keep):
+                keep.append(int(idx))
+        return batch.select(sorted(keep))
+    
+    def _result_to_batch(self, result) -> PoseBatch:
+        """将单帧YOLO推理结果转换为PoseBatch"""
+        if result.keypoints is None:
+            return PoseBatch()
+        
+        xy = result.keypoints.data.cpu().numpy()[..., :2]
+        conf = result.keypoints.conf.cpu().numpy()
+        keypoints = np.concatenate([xy, conf[..., None]], axis=-1)
+        
+        bboxes = None
+        scores = None
+        if result.boxes is not None:
+            bboxes = result.boxes.xyxy.cpu().numpy()
+            scores = result.boxes.conf.cpu().numpy()
+        
+        return PoseBatch(keypoints, bboxes, scores)
+    
+    def iter_video_poses(self, video_path: str, batch_size: int = 1, as_array: bool = False):
+        """
+        逐帧迭代视频的姿势检测结果
+        
+        batch_size > 1 时先缓存解码后的帧，凑满一批再统一推理
+        
+        Args:
+            video_path: 视频文件路径
+            batch_size: 每次推理的帧数
+            as_array: 为True时每帧返回PoseBatch
+            
+        Yields:
             每帧的姿势检测结果
         """
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             raise ValueError(f"无法打开视频文件: {video_path}")
         
-        frame_poses = []
         frame_count = 0
+        pending_frames = []
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # 检测当前帧的姿势
-            poses = self.detect_pose(frame)
-            frame_poses.append(poses)
-            
-            frame_count += 1
-            if frame_count % 30 == 0:  # 每30帧打印一次进度
-                print(f"已处理 {frame_count} 帧")
+        try:
+            while True:
+                ret, frame = cap.read()
+                if ret:
+                    pending_frames.append(frame)
+                
+                # 凑满一批或视频结束时执行推理
+                if pending_frames and (len(pending_frames) >= batch_size or not ret):
+                    if batch_size > 1:
+                        batch_poses = self.detect_pose_batch(pending_frames, batch_size, as_array=as_array)
+                    else:
+                        batch_poses = [self.detect_pose(pending_frames[0], as_array=as_array)]
+                    pending_frames = []
+                    
+                    for poses in batch_poses:
+                        frame_count += 1
+                        if frame_count % 30 == 0:  # 每30帧打印一次进度
+                            print(f"已处理 {frame_count} 帧")
+                        yield poses
+                
+                if not ret:
+                    break
+        finally:
+            cap.release()
         
-        cap.release()
         print(f"视频处理完成，共处理 {frame_count} 帧")
-        
-        return frame_poses
     
-    def draw_pose(self, image, poses, draw_keypoints=True, draw_skeleton=True, draw_bbox=True):
-        """
-        在图像上绘制检测到的姿势（假定输入坐标已与图像分辨率一致）
-        优化版本：使用不同颜色的圆点美化关节点和线条
+    def process_video(self, video_path: str, output_path: str = None, save_frames: bool = False,
+                      batch_size: int = 1, as_array: bool = False) -> List[Any]:
         """
-        image_copy = image.copy()
-        
-        # 定义关键点颜色映射 - 按身体部位分组
-        keypoint_colors = {
-            # 头部关键点 - 蓝色系
-            'nose': (255, 100, 100),      # 浅蓝色
-            'left_eye': (255, 150, 150),  # 蓝色
-            'right_eye': (255, 150, 150), # 蓝色
-            'left_ear': (255, 200, 200),  # 浅蓝色
-            'right_ear': (255, 200, 200), # 浅蓝色
-            
-            # 上肢关键点 - 绿色系
-            'left_shoulder': (100, 255, 100),  # 浅绿色
-            'right_shoulder': (100, 255, 100), # 浅绿色
-            'left_elbow': (150, 255, 150),     # 绿色
-            'right_elbow': (150, 255, 150),    # 绿色
-            'left_wrist': (200, 255, 200),     # 浅绿色
-            'right_wrist': (200, 255, 200),    # 浅绿色
-            
-            # 躯干关键点 - 红色系
-            'left_hip': (100, 100, 255),   # 浅红色
-            'right_hip': (100, 100, 255),  # 浅红色
-            
-            # 下肢关键点 - 黄色系
-            'left_knee': (100, 255, 255),  # 浅黄色
-            'right_knee': (100, 255, 255), # 浅黄色
-            'left_ankle': (150, 255, 255), # 黄色
-            'right_ankle': (150, 255, 255) # 黄色
-        }
-        
-        # 定义骨架连接和对应的线条颜色
-        skeleton_connections = [
-            # 头部连接 - 蓝色线条
-            ('left_eye', 'right_eye'),
-            ('left_eye', 'left_ear'),
-            ('right_eye', 'right_ear'),
-            ('nose', 'left_eye'),
-            ('nose', 'right_eye'),
-            
-            # 躯干连接 - 红色线条
-            ('left_shoulder', 'right_shoulder'),
-            ('left_shoulder', 'left_hip'),
-            ('right_shoulder', 'right_hip'),
-            ('left_hip', 'right_hip'),
-            
-            # 上肢连接 - 绿色线条
-            ('left_shoulder', 'left_elbow'),
-            ('right_shoulder', 'right_elbow'),
-            ('left_elbow', 'left_wrist'),
-            ('right_elbow', 'right_wrist'),
-            
-            # 下肢连接 - 黄色线条
-            ('left_hip', 'left_knee'),
-            ('right_hip', 'right_knee'),
-            ('left_knee', 'left_ankle'),
-            ('right_knee', 'right_ankle')
-        ]
-        
-        # 线条颜色映射
-        line_colors = {
-            # 头部线条 - 蓝色
-            ('left_eye', 'right_eye'): (255, 100, 100),
-            ('left_eye', 'left_ear'): (255, 100, 100),
-            ('right_eye', 'right_ear'): (255, 100, 100),
-            ('nose', 'left_eye'): (255, 100, 100),
-            ('nose', 'right_eye'): (255, 100, 100),
-            
-            # 躯干线条 - 红色
-            ('left_shoulder', 'right_shoulder'): (100, 100, 255),
-            ('left_shoulder', 'left_hip'): (100, 100, 255),
-            ('right_shoulder', 'right_hip'): (100, 100, 255),
-            ('left_hip', 'right_hip'): (100, 100, 255),
-            
-            # 上肢线条 - 绿色
-            ('left_shoulder', 'left_elbow'): (100, 255, 100),
-            ('right_shoulder', 'right_elbow'): (100, 255, 100),
-            ('left_elbow', 'left_wrist'): (100, 255, 100),
-            ('right_elbow', 'right_wrist'): (100, 255, 100),
-            
-            # 下肢线条 - 黄色
-            ('left_hip', 'left_knee'): (100, 255, 255),
-            ('right_hip', 'right_knee'): (100, 255, 255),
-            ('left_knee', 'left_ankle'): (100, 255, 255),
-            ('right_knee', 'right_ankle'): (100, 255, 255)
-        }
+        处理视频文件
         
-        for pose in poses:
-            keypoints = pose['keypoints']
-            
-            # 绘制人物边框
-            if draw_bbox and pose.get('bbox') is not None:
-                bbox = pose['bbox']
-                if len(bbox) == 4:
-                    x1, y1, x2, y2 = map(int, bbox)
-                    # 使用白色边框，更清晰
-                    cv2.rectangle(image_copy, (x1, y1), (x2, y2), (255, 255, 255), 2)
-            
-            # 绘制关键点 - 使用不同颜色和大小的圆点
-            if draw_keypoints:
-                for name, kp in keypoints.items():
-                    if kp['confidence'] > 0.5:
-                        x, y = int(kp['x']), int(kp['y'])
-                        color = keypoint_colors.get(name, (0, 255, 0))  # 默认绿色
-                        
-                        # 根据关键点重要性调整圆点大小
-                        radius = 4 if name in ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip'] else 3
-                        
-                        # 绘制外圈（白色边框）
-                        cv2.circle(image_copy, (x, y), radius + 1, (255, 255, 255), -1)
-                        # 绘制内圈（彩色填充）
-                        cv2.circle(image_copy, (x, y), radius, color, -1)
-                        # 绘制中心点（黑色）
-                        cv2.circle(image_copy, (x, y), 1, (0, 0, 0), -1)
+        Args:
+            video_path: 视频文件路径
+            output_path: 输出视频路径 (可选)
+            save_frames: 是否保存帧数据
+            batch_size: 每次推理的帧数，大于1时启用批量推理
+            as_array: 为True时每帧返回PoseBatch
             
-            # 绘制骨架线条 - 使用不同颜色和粗细
-            if draw_skeleton:
-                for connection in skeleton_connections:
-                    kp1_name, kp2_name = connection
-                    if kp1_name in keypoints and kp2_name in keypoints:
-                        kp1 = keypoints[kp1_name]
-                        kp2 = keypoints[kp2_name]
-                        if kp1['confidence'] > 0.5 and kp2['confidence'] > 0.5:
-                            pt1 = (int(kp1['x']), int(kp1['y']))
-                            pt2 = (int(kp2['x']), int(kp2['y']))
-                            
-                            # 获取线条颜色
-                            line_color = line_colors.get(connection, (255, 0, 0))
-                            
-                            # 绘制线条（稍微粗一些，更清晰）
-                            cv2.line(image_copy, pt1, pt2, line_color, 3)
+        Returns:
+            每帧的姿势检测结果
+        """
+        return list(self.iter_video_poses(video_path, batch_size=batch_size, as_array=as_array))
+    
+    def draw_pose(self, image, poses, draw_keypoints=True, draw_skeleton=True, draw_bbox=True, inplace=False):
+        """
+        在图像上绘制检测到的姿势（假定输入坐标已与图像分辨率一致）
+        使用预先编译的渲染方案：关键点颜色/半径、骨架索引和线条颜色均为常量表
         
+        Args:
+            inplace: 为True时直接在输入图像上绘制，省去整帧拷贝（调用方不再需要原图时使用）
+        """
+        image_copy = image if inplace else image.copy()
+        self.render_plan.draw(image_copy, as_pose_batch(poses), draw_keypoints, draw_skeleton, draw_bbox)
         return image_copy
     
     def extract_features(self, poses: List[Dict[str, Any]]) -> np.ndarray:
@@ -289,11 +398,15 @@ class PoseDetector:
         从姿势数据中提取特征
         
         Args:
-            poses: 姿势检测结果
+            poses: 姿势检测结果 (字典列表、PoseBatch 或 (N, 17, 3) 数组)
             
         Returns:
             特征向量
         """
+        if isinstance(poses, (PoseBatch, np.ndarray)):
+            keypoints = as_pose_batch(poses).keypoints
+            return keypoints.reshape(len(keypoints), -1) if len(keypoints) else np.array([])
+        
         if not poses:
             return np.array([])
         
@@ -315,6 +428,82 @@ class PoseDetector:
         
         return np.array(features)
 
+class RoiPoseDetector:
+    """
+    区域推理调度器
+    
+    找到人之后只在上一帧人体框附近的区域内推理（批量、原始分辨率裁剪），
+    每隔 full_frame_interval 帧或有人丢失时做一次整帧检测以发现新出现的人。
+    整帧检测先缩小到 detect_width 再推理，结果缩放回原图坐标。
+    """
+    
+    def __init__(self, pose_detector: PoseDetector, detect_width: int = 640, enabled: bool = True,
+                 full_frame_interval: int = 15, padding: float = 0.2, roi_imgsz: int = 320, max_rois: int = 4):
+        """
+        Args:
+            pose_detector: 姿势检测器
+            detect_width: 整帧检测的宽度
+            enabled: 为False时每帧都做整帧检测
+            full_frame_interval: 两次整帧检测之间最多间隔的帧数
+            padding: 区域每边向外扩展的比例
+            roi_imgsz: 区域推理的输入尺寸
+            max_rois: 人数超过该值时区域推理不再划算，改为整帧检测
+        """
+        self.pose_detector = pose_detector
+        self.detect_width = detect_width
+        self.enabled = enabled
+        self.full_frame_interval = full_frame_interval
+        self.padding = padding
+        self.roi_imgsz = roi_imgsz
+        self.max_rois = max_rois
+        
+        self.last_boxes = np.zeros((0, 4), dtype=np.float32)
+        self.frames_since_full = 0
+        self.force_full = True
+        self.full_passes = 0
+        self.roi_passes = 0
+    
+    def detect(self, frame: np.ndarray) -> PoseBatch:
+        """检测一帧，返回原图坐标的PoseBatch"""
+        use_roi = (self.enabled and not self.force_full and 0 < len(self.last_boxes) <= self.max_rois
+                   and self.frames_since_full < self.full_frame_interval)
+        
+        if use_roi:
+            poses = self.pose_detector.detect_pose_rois(frame, self.last_boxes, self.padding, self.roi_imgsz)
+            self.roi_passes += 1
+            self.frames_since_full += 1
+            # 有人丢失时下一帧做整帧检测重新定位
+            self.force_full = len(poses) < len(self.last_boxes)
+        else:
+            poses = self.detect_full_frame(frame)
+            self.full_passes += 1
+            self.frames_since_full = 0
+            self.force_full = False
+        
+        self.last_boxes = pose_boxes(poses)
+        self.last_boxes = self.last_boxes[~np.isnan(self.last_boxes).any(axis=1)]
+        return poses
+    
+    def detect_full_frame(self, frame: np.ndarray) -> PoseBatch:
+        """整帧检测：大于detect_width的帧先缩小，结果缩放回原图坐标"""
+        height, width = frame.shape[:2]
+        if width <= self.detect_width:
+            return self.pose_detector.detect_pose(frame, as_array=True)
+        small = cv2.resize(frame, (self.detect_width, int(height * self.detect_width / width)))
+        poses = self.pose_detector.detect_pose(small, as_array=True)
+        return poses.scale(width / small.shape[1], height / small.shape[0])
+    
+    def reset(self):
+        self.last_boxes = np.zeros((0, 4), dtype=np.float32)
+        self.frames_since_full = 0
+        self.force_full = True
+    
+    def roi_ratio(self) -> float:
+        """区域推理占全部推理次数的比例"""
+        total = self.full_passes + self.roi_passes
+        return self.roi_passes / total if total else 0.0
+
+
 if __name__ == "__main__":
     # 测试代码
     detector = PoseDetector()
@@ -327,7 +516,7 @@ if __name__ == "__main__":
         print(f"检测到 {len(poses)} 个人体姿势")
         
         # 绘制结果
-        result_image = detector.draw_pose(image, poses)
+        result_image = detector.draw_pose(image, poses, inplace=True)
         cv2.imshow("Pose Detection", result_image)
         cv2.waitKey(0)
         cv2.destroyAllWindows() 
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+姿势特征模块
+对 (N, 17, 3) 关键点数组用NumPy广播一次计算所有人的特征，
+传统机器学习、深度学习检测器和训练工具共用同一份特征定义
+
+每个人的特征依次为：
+    9个基础关键点的 x, y, confidence（27维）
+    trunk_length  左肩到左髋的距离
+    leg_length    左髋到左膝的距离
+    trunk_angle   肩中点到髋中点连线与垂直方向的夹角（度）
+    height_ratio  躯干高度 / (躯干高度 + 大腿高度)
+"""
+
+import numpy as np
+
+from pose_batch import PoseBatch, KEYPOINT_INDEX, NUM_KEYPOINTS, as_keypoint_array
+
+# 特征定义的版本号，修改特征计算方式时需递增，使旧的特征缓存失效
+FEATURE_VERSION = 2
+
+# 基础特征使用的关键点
+BASE_KEYPOINTS = ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip',
+                  'left_knee', 'right_knee', 'left_ankle', 'right_ankle']
+GEOMETRIC_FEATURES = ['trunk_length', 'leg_length', 'trunk_angle', 'height_ratio']
+
+FEATURE_NAMES = [f"{name}_{field}" for name in BASE_KEYPOINTS
+                 for field in ('x', 'y', 'confidence')] + GEOMETRIC_FEATURES
+FEATURE_DIM = len(FEATURE_NAMES)
+
+_BASE_INDICES = np.array([KEYPOINT_INDEX[name] for name in BASE_KEYPOINTS])
+# 几何特征只用到这5个关键点
+_GEOMETRIC_INDICES = np.array([KEYPOINT_INDEX[name] for name in
+                               ('left_shoulder', 'right_shoulder', 'left_hip', 'right_hip', 'left_knee')])
+
+
+def as_feature_keypoints(poses) -> np.ndarray:
+    """将PoseBatch、字典列表、单人 (17, 3) 或多人 (N, 17, 3) 数组统一为 (N, 17, 3) float32数组"""
+    if isinstance(poses, np.ndarray):
+        return poses.astype(np.float32, copy=False).reshape(-1, *poses.shape[-2:])
+    if isinstance(poses, PoseBatch):
+        return poses.keypoints
+    return as_keypoint_array(poses)
+
+
+def trunk_angle(keypoints: np.ndarray) -> np.ndarray:
+    """肩中点到髋中点连线与垂直方向的夹角（度），(..., 17, 3) -> (...)"""
+    xy = keypoints[..., :2]
+    delta = ((xy[..., KEYPOINT_INDEX['left_hip'], :] + xy[..., KEYPOINT_INDEX['right_hip'], :]) -
+             (xy[..., KEYPOINT_INDEX['left_shoulder'], :] + xy[..., KEYPOINT_INDEX['right_shoulder'], :])) / 2
+    return np.abs(np.degrees(np.arctan2(delta[..., 0], delta[..., 1])))
+
+
+def extract_pose_features(poses) -> np.ndarray:
+    """
+    计算每个人的特征向量
+
+    Args:
+        poses: PoseBatch、字典列表、单人 (17, 3) 或多人 (N, 17, 3) 关键点数组
+
+    Returns:
+        特征矩阵 (N, FEATURE_DIM) float32；x, y, confidence 全为0的关键点视为缺失，
+        依赖缺失关键点的几何特征取0
+    """
+    keypoints = as_feature_keypoints(poses)
+    num_persons = len(keypoints)
+    features = np.zeros((num_persons, FEATURE_DIM), dtype=np.float32)
+    if num_persons == 0:
+        return features
+
+    features[:, :len(BASE_KEYPOINTS) * 3] = keypoints[:, _BASE_INDICES, :].reshape(num_persons, -1)
+
+    # (N, 5, 3)：左肩、右肩、左髋、右髋、左膝
+    points = keypoints[:, _GEOMETRIC_INDICES, :]
+    present = np.any(points != 0, axis=2)
+    x, y = points[..., 0], points[..., 1]
+    ls, rs, lh, rh, lk = range(5)
+    geometric = features[:, len(BASE_KEYPOINTS) * 3:]
+
+    # 躯干长度、腿部长度
+    trunk_height = np.abs(y[:, ls] - y[:, lh])
+    thigh_height = np.abs(y[:, lh] - y[:, lk])
+    geometric[:, 0] = np.hypot(x[:, ls] - x[:, lh], trunk_height) * (present[:, ls] & present[:, lh])
+    geometric[:, 1] = np.hypot(x[:, lh] - x[:, lk], thigh_height) * (present[:, lh] & present[:, lk])
+
+    # 躯干角度：肩髋中点水平方向重合时记为0
+    dx = (x[:, lh] + x[:, rh]) - (x[:, ls] + x[:, rs])
+    dy = (y[:, lh] + y[:, rh]) - (y[:, ls] + y[:, rs])
+    trunk_ok = present[:, :4].all(axis=1) & (dx != 0)
+    geometric[:, 2] = np.abs(np.degrees(np.arctan2(dx, dy))) * trunk_ok
+
+    # 高度比例
+    total_height = trunk_height + thigh_height
+    height_ok = present[:, ls] & present[:, lh] & present[:, lk] & (total_height > 0)
+    geometric[:, 3] = np.divide(trunk_height, total_height, out=np.zeros_like(total_height), where=height_ok)
+
+    return features
+
+
+def extract_sequence_features(frames, sequence_length: int, out: np.ndarray = None) -> np.ndarray:
+    """
+    计算一段序列最后 sequence_length 帧中每帧第一个人的特征，空帧补零
+
+    Args:
+        frames: 每帧的姿势（PoseBatch、字典列表等）组成的序列
+        sequence_length: 序列长度
+        out: 可选的输出数组 (sequence_length, FEATURE_DIM)，提供时直接写入
+
+    Returns:
+        特征序列 (sequence_length, FEATURE_DIM)
+    """
+    if out is None:
+        out = np.zeros((sequence_length, FEATURE_DIM), dtype=np.float32)
+    else:
+        out[:] = 0
+
+    window = list(frames[-sequence_length:])
+    first_persons = np.zeros((len(window), NUM_KEYPOINTS, 3), dtype=np.float32)
+    has_person = np.zeros(len(window), dtype=bool)
+    for i, poses in enumerate(window):
+        keypoints = as_feature_keypoints(poses)
+        if len(keypoints):
+            first_persons[i] = keypoints[0]
+            has_person[i] = True
+
+    # 所有帧一次计算
+    offset = sequence_length - len(window)
+    out[offset:][has_person] = extract_pose_features(first_persons[has_person])
+    return out
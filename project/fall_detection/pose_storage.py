@@ -0,0 +1,254 @@
+"""
+姿势序列存储模块
+每个视频保存为一个可内存映射的 .npy 数据文件和一个小的 .npz 索引文件：
+
+    <name>.poses.npy   (P, 56) float32，每行一个人：17x3关键点 + 4边框 + 1置信度
+    <name>.index.npz   帧偏移量 offsets (F+1,)、标签、处理时间等
+
+数据文件在处理视频时逐帧追加写入，读取时按需内存映射，无需整体加载
+旧版JSON格式通过 load_pose_sequence 以相同接口读取
+"""
+
+import os
+import json
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from pose_batch import PoseBatch, NUM_KEYPOINTS, as_pose_batch
+
+POSE_DATA_SUFFIX = '.poses.npy'
+POSE_INDEX_SUFFIX = '.index.npz'
+STORAGE_VERSION = 1
+
+KEYPOINT_COLUMNS = NUM_KEYPOINTS * 3
+ROW_WIDTH = KEYPOINT_COLUMNS + 4 + 1  # 关键点 + 边框 + 置信度
+
+# .npy文件头预留的长度，写完数据后回填真实的shape
+_NPY_HEADER_SIZE = 128
+
+
+def _npy_header(num_rows: int) -> bytes:
+    """生成固定长度的 .npy v1.0 文件头"""
+    header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (num_rows, ROW_WIDTH)
+    magic = b'\x93NUMPY\x01\x00'
+    pad = _NPY_HEADER_SIZE - len(magic) - 2 - len(header) - 1
+    if pad < 0:
+        raise ValueError("npy文件头超出预留长度")
+    header_bytes = (header + ' ' * pad + '\n').encode('latin1')
+    return magic + len(header_bytes).to_bytes(2, 'little') + header_bytes
+
+
+class PoseSequenceWriter:
+    """逐帧追加写入姿势序列"""
+
+    def __init__(self, base_path: str, label: int, source: str = ""):
+        """
+        Args:
+            base_path: 输出路径（不含后缀），生成 base_path.poses.npy 和 base_path.index.npz
+            label: 样本标签 (1=摔倒, 0=正常)
+            source: 源视频路径，写入索引便于追溯
+        """
+        self.base_path = base_path
+        self.label = label
+        self.source = source
+        self.data_path = base_path + POSE_DATA_SUFFIX
+        self.index_path = base_path + POSE_INDEX_SUFFIX
+        self.offsets = [0]
+        self.num_rows = 0
+        self._file = open(self.data_path + '.tmp', 'wb')
+        self._file.write(_npy_header(0))
+
+    def append(self, poses):
+        """追加一帧的检测结果 (PoseBatch 或字典列表)"""
+        batch = as_pose_batch(poses)
+        if len(batch):
+            rows = np.concatenate([
+                batch.keypoints.reshape(len(batch), -1),
+                batch.bboxes,
+                batch.scores[:, None]
+            ], axis=1).astype('<f4', copy=False)
+            self._file.write(rows.tobytes())
+            self.num_rows += len(batch)
+        self.offsets.append(self.num_rows)
+
+    def close(self):
+        """回填文件头并写入索引"""
+        if self._file is None:
+            return
+        self._file.seek(0)
+        self._file.write(_npy_header(self.num_rows))
+        self._file.close()
+        self._file = None
+        os.replace(self.data_path + '.tmp', self.data_path)
+
+        # 索引同样先写临时文件再替换：索引存在即视为样本已完成，不能留下写了一半的索引
+        with open(self.index_path + '.tmp', 'wb') as f:
+            np.savez(
+                f,
+                version=STORAGE_VERSION,
+                offsets=np.asarray(self.offsets, dtype=np.int64),
+                label=self.label,
+                source=self.source,
+                processed_time=datetime.now().isoformat()
+            )
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self.data_path + '.tmp')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PoseSequence:
+    """按需读取的姿势序列，按帧索引返回PoseBatch"""
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self.base_path = index_path[:-len(POSE_INDEX_SUFFIX)]
+        with np.load(index_path) as index:
+            self.offsets = index['offsets']
+            self.label = int(index['label'])
+            self.source = str(index['source'])
+            self.processed_time = str(index['processed_time'])
+        self._rows = None
+
+    @property
+    def rows(self) -> np.ndarray:
+        """所有人的数据行 (P, 56)，以内存映射方式打开"""
+        if self._rows is None:
+            self._rows = np.load(self.base_path + POSE_DATA_SUFFIX, mmap_mode='r')
+        return self._rows
+
+    @property
+    def person_counts(self) -> np.ndarray:
+        """每帧检测到的人数 (F,)"""
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: Union[int, slice]):
+        if isinstance(idx, slice):
+            return [self.frame(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self.frame(idx)
+
+    def __iter__(self) -> Iterator[PoseBatch]:
+        for i in range(len(self)):
+            yield self.frame(i)
+
+    def frame(self, idx: int) -> PoseBatch:
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return self._rows_to_batch(np.asarray(self.rows[start:end]))
+
+    def first_person_keypoints(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        每帧第一个人的关键点 (F, 17, 3)，无人的帧为0
+        配合 person_counts > 0 可筛选出有效帧；指定 [start, stop) 时只读取这段帧，便于分块处理长视频
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        keypoints = np.zeros((stop - start, NUM_KEYPOINTS, 3), dtype=np.float32)
+        has_person = self.person_counts[start:stop] > 0
+        if has_person.any():
+            first_rows = self.offsets[start:stop][has_person]
+            keypoints[has_person] = np.asarray(self.rows[first_rows, :KEYPOINT_COLUMNS]).reshape(-1, NUM_KEYPOINTS, 3)
+        return keypoints
+
+    def to_dict_sequence(self) -> List[List[Dict[str, Any]]]:
+        """转换为旧版的嵌套字典格式"""
+        return [batch.to_dicts() for batch in self]
+
+    @staticmethod
+    def _rows_to_batch(rows: np.ndarray) -> PoseBatch:
+        return PoseBatch(
+            rows[:, :KEYPOINT_COLUMNS].reshape(-1, NUM_KEYPOINTS, 3),
+            rows[:, KEYPOINT_COLUMNS:KEYPOINT_COLUMNS + 4],
+            rows[:, -1]
+        )
+
+
+class JsonPoseSequence:
+    """旧版JSON姿势序列，提供与PoseSequence相同的读取接口"""
+
+    def __init__(self, json_path: str):
+        self.index_path = json_path
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.label = int(data['label'])
+        self.source = data.get('source', '')
+        self.processed_time = data.get('processed_time', '')
+        self._frames = [PoseBatch.from_dicts(poses) for poses in data['poses_sequence']]
+
+    @property
+    def person_counts(self) -> np.ndarray:
+        return np.array([len(batch) for batch in self._frames], dtype=np.int64)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, idx):
+        return self._frames[idx]
+
+    def __iter__(self) -> Iterator[PoseBatch]:
+        return iter(self._frames)
+
+    def first_person_keypoints(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        frames = self._frames[start:stop]
+        keypoints = np.zeros((len(frames), NUM_KEYPOINTS, 3), dtype=np.float32)
+        for i, batch in enumerate(frames):
+            if len(batch):
+                keypoints[i] = batch.keypoints[0]
+        return keypoints
+
+    def to_dict_sequence(self) -> List[List[Dict[str, Any]]]:
+        return [batch.to_dicts() for batch in self._frames]
+
+
+def is_pose_sequence_file(filename: str) -> bool:
+    """是否为姿势序列文件（新版索引或旧版JSON）"""
+    if filename.endswith(POSE_INDEX_SUFFIX):
+        return True
+    return filename.endswith('.json') and filename != 'metadata.json'
+
+
+def load_pose_sequence(path: str):
+    """根据后缀打开姿势序列文件"""
+    if path.endswith(POSE_INDEX_SUFFIX):
+        return PoseSequence(path)
+    return JsonPoseSequence(path)
+
+
+def list_pose_sequence_files(data_path: str) -> List[str]:
+    """列出目录中的姿势序列文件；同名样本同时存在两种格式时优先使用新版"""
+    files = sorted(f for f in os.listdir(data_path) if is_pose_sequence_file(f))
+    binary_bases = {f[:-len(POSE_INDEX_SUFFIX)] for f in files if f.endswith(POSE_INDEX_SUFFIX)}
+    return [
+        os.path.join(data_path, f) for f in files
+        if f.endswith(POSE_INDEX_SUFFIX) or f[:-len('.json')] not in binary_bases
+    ]
+
+
+def pose_output_exists(base_path: str, storage_format: str = 'npy') -> bool:
+    """某个样本的输出是否已完整写出（索引文件在数据文件之后写入）"""
+    if storage_format == 'json':
+        return os.path.exists(base_path + '.json')
+    return os.path.exists(base_path + POSE_INDEX_SUFFIX) and os.path.exists(base_path + POSE_DATA_SUFFIX)
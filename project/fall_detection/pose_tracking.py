@@ -0,0 +1,204 @@
+"""
+多人姿势跟踪模块
+基于边框IoU为每帧检测到的人分配稳定的跟踪ID，并为每个跟踪目标维护定长的特征环形缓冲区
+"""
+
+import warnings
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from pose_batch import PoseBatch, as_pose_batch
+
+
+class FeatureRingBuffer:
+    """定长特征环形缓冲区，写入为O(1)，避免list.pop(0)"""
+
+    def __init__(self, capacity: int, feature_dim: int):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, feature_dim), dtype=np.float32)
+        self.index = 0  # 下一次写入的位置
+        self.count = 0
+
+    def append(self, features: np.ndarray):
+        self.data[self.index] = features
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def is_full(self) -> bool:
+        return self.count == self.capacity
+
+    def ordered(self) -> np.ndarray:
+        """按时间顺序（旧 -> 新）返回缓冲区内容"""
+        if self.count < self.capacity:
+            return self.data[:self.count]
+        return np.roll(self.data, -self.index, axis=0)
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+
+class Track:
+    """单个跟踪目标"""
+
+    def __init__(self, track_id: int, bbox: np.ndarray, sequence_length: int):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.sequence_length = sequence_length
+        self.buffer: Optional[FeatureRingBuffer] = None
+        self.hits = 1  # 累计匹配次数
+        self.missed = 0  # 连续未匹配的帧数
+
+    def push_features(self, features: np.ndarray):
+        if self.buffer is None:
+            self.buffer = FeatureRingBuffer(self.sequence_length, len(features))
+        self.buffer.append(features)
+
+    def push_missing(self):
+        """本帧未检测到该目标时写入零特征，与训练时空帧补零的方式一致"""
+        if self.buffer is not None:
+            self.buffer.append(np.zeros(self.buffer.data.shape[1], dtype=np.float32))
+
+
+def keypoint_bboxes(keypoints: np.ndarray, conf_threshold: float = 0.3) -> np.ndarray:
+    """由可信关键点的外接矩形估计边框，(N, 17, 3) -> (N, 4)，无可信关键点时为NaN"""
+    valid = keypoints[..., 2] > conf_threshold
+    x = np.where(valid, keypoints[..., 0], np.nan)
+    y = np.where(valid, keypoints[..., 1], np.nan)
+    with warnings.catch_warnings():
+        # 全部关键点不可信时nanmin/nanmax返回NaN并告警，这里属于预期情况
+        warnings.simplefilter('ignore', RuntimeWarning)
+        boxes = np.stack([np.nanmin(x, axis=1), np.nanmin(y, axis=1),
+                          np.nanmax(x, axis=1), np.nanmax(y, axis=1)], axis=1)
+    return boxes.astype(np.float32)
+
+
+def pose_boxes(batch: PoseBatch) -> np.ndarray:
+    """每个人的边框 (N, 4)：优先使用检测边框，缺失时用关键点外接矩形代替"""
+    boxes = batch.bboxes.copy()
+    missing = np.isnan(boxes).any(axis=1)
+    if missing.any():
+        boxes[missing] = keypoint_bboxes(batch.keypoints[missing])
+    return boxes
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """计算两组边框之间的IoU矩阵，(A, 4) x (B, 4) -> (A, B)，NaN边框的IoU为0"""
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iou = inter / (area_a + area_b - inter)
+    return np.nan_to_num(iou, nan=0.0)
+
+
+class PoseTracker:
+    """轻量级IoU跟踪器"""
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 15, sequence_length: int = 10):
+        """
+        Args:
+            iou_threshold: 匹配所需的最小IoU
+            max_missed: 连续未匹配超过该帧数后删除跟踪目标
+            sequence_length: 每个目标特征缓冲区的长度（序列模型的窗口长度）
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.sequence_length = sequence_length
+        self.tracks: Dict[int, Track] = {}
+        self.next_id = 0
+
+    def update(self, poses, features: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        用一帧的检测结果更新跟踪器
+
+        Args:
+            poses: 本帧姿势 (PoseBatch、字典列表或 (N, 17, 3) 数组)
+            features: 与poses一一对应的特征矩阵 (N, D)，提供时写入各目标的缓冲区
+
+        Returns:
+            每个检测结果对应的跟踪ID数组 (N,)
+        """
+        batch = as_pose_batch(poses)
+        boxes = pose_boxes(batch)
+        track_ids = np.full(len(batch), -1, dtype=np.int64)
+
+        active = list(self.tracks.values())
+        matched = set()
+        if active and len(batch):
+            ious = iou_matrix(np.stack([t.bbox for t in active]), boxes)
+            # 贪心匹配：IoU从高到低依次配对
+            for flat_idx in np.argsort(-ious, axis=None):
+                t_idx, d_idx = np.unravel_index(flat_idx, ious.shape)
+                if ious[t_idx, d_idx] < self.iou_threshold:
+                    break
+                track = active[t_idx]
+                if track_ids[d_idx] != -1 or track.track_id in matched:
+                    continue
+                track_ids[d_idx] = track.track_id
+                matched.add(track.track_id)
+
+        for det_idx in range(len(batch)):
+            if track_ids[det_idx] == -1:
+                track = Track(self.next_id, boxes[det_idx], self.sequence_length)
+                self.tracks[track.track_id] = track
+                self.next_id += 1
+                track_ids[det_idx] = track.track_id
+                matched.add(track.track_id)
+            else:
+                track = self.tracks[int(track_ids[det_idx])]
+                track.bbox = boxes[det_idx]
+                track.hits += 1
+                track.missed = 0
+
+            if features is not None:
+                track.push_features(features[det_idx])
+
+        # 未匹配的目标计数，超时删除
+        for track_id in list(self.tracks):
+            if track_id in matched:
+                continue
+            track = self.tracks[track_id]
+            track.missed += 1
+            track.push_missing()
+            if track.missed > self.max_missed:
+                del self.tracks[track_id]
+
+        return track_ids
+
+    def sequences(self, track_ids: Optional[List[int]] = None) -> Tuple[List[int], np.ndarray]:
+        """
+        收集缓冲区已满的跟踪目标的特征序列
+
+        Args:
+            track_ids: 只收集这些目标（默认为本帧匹配到的所有目标）
+
+        Returns:
+            (跟踪ID列表, 特征序列数组 (T, sequence_length, D))
+        """
+        if track_ids is None:
+            track_ids = [tid for tid, t in self.tracks.items() if t.missed == 0]
+
+        ready_ids = []
+        sequences = []
+        for track_id in track_ids:
+            track = self.tracks.get(int(track_id))
+            if track is None or track.buffer is None or not track.buffer.is_full():
+                continue
+            ready_ids.append(int(track_id))
+            sequences.append(track.buffer.ordered())
+
+        if not sequences:
+            return [], np.zeros((0, self.sequence_length, 0), dtype=np.float32)
+        return ready_ids, np.stack(sequences)
+
+    def reset(self):
+        self.tracks.clear()
+        self.next_id = 0
@@ -0,0 +1,281 @@
+"""
+无界面流式摔倒检测模块
+逐帧解码、检测、判定，内存占用与视频长度无关，可在没有Tk的服务器上运行
+
+支持的输入源：
+    - 单个视频文件
+    - 视频目录（按文件名顺序依次处理）
+    - 摄像头索引（如 0）
+    - 网络流地址（rtsp:// / http:// 等 OpenCV 可打开的地址）
+
+摔倒事件以JSON Lines格式输出，每行一个事件，可选输出带骨架标注的视频
+
+用法:
+    python stream_detection.py --source videos/ --events events.jsonl
+    python stream_detection.py --source 0 --annotated-output out.mp4
+"""
+
+import os
+import sys
+import cv2
+import json
+import time
+import argparse
+import contextlib
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Union
+
+from pose_detection import PoseDetector, RoiPoseDetector
+from fall_detection_algorithms import ThresholdFallDetector
+from pose_tracking import PoseTracker
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+def iter_sources(source: str) -> Iterator[Union[str, int]]:
+    """展开输入源：目录展开为其中的视频文件，纯数字视为摄像头索引"""
+    if source.isdigit():
+        yield int(source)
+    elif os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(VIDEO_EXTENSIONS):
+                yield os.path.join(source, name)
+    else:
+        yield source
+
+
+def is_live_source(source: Union[str, int]) -> bool:
+    """摄像头和网络流没有固定时长，事件时间使用墙上时钟"""
+    return isinstance(source, int) or '://' in str(source)
+
+
+class JsonLinesSink:
+    """JSON Lines事件输出，每个事件写一行并立即刷新"""
+
+    def __init__(self, path: str = '-'):
+        self.path = path
+        self._owns_file = path != '-'
+        self._file: TextIO = open(path, 'a', encoding='utf-8') if self._owns_file else sys.stdout
+
+    def emit(self, event: Dict[str, Any]):
+        self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+
+class StreamingFallDetector:
+    """流式摔倒检测：解码 -> 缩放检测 -> 跟踪 -> 判定 -> 事件/标注输出"""
+
+    def __init__(self, pose_detector: PoseDetector, fall_detector: Optional[ThresholdFallDetector] = None,
+                 detect_width: int = 640, min_fall_frames: int = 3, recover_frames: int = 15,
+                 roi_inference: bool = False):
+        """
+        Args:
+            pose_detector: 姿势检测器
+            fall_detector: 摔倒判定器（默认为阈值法）
+            detect_width: 检测分辨率宽度，大于该宽度的帧先缩小再检测
+            min_fall_frames: 同一目标连续判定为摔倒的帧数达到该值才产生事件，过滤单帧误判
+            recover_frames: 摔倒后连续正常的帧数达到该值才视为恢复，之后可再次产生事件
+            roi_inference: 找到人后只在其周围区域推理，定期整帧检测
+        """
+        self.pose_detector = pose_detector
+        self.fall_detector = fall_detector or ThresholdFallDetector()
+        self.detect_width = detect_width
+        self.min_fall_frames = min_fall_frames
+        self.recover_frames = recover_frames
+        self.roi_detector = RoiPoseDetector(pose_detector, detect_width=detect_width, enabled=roi_inference)
+
+    def process_source(self, source: Union[str, int], sink: JsonLinesSink,
+                       annotated_path: Optional[str] = None, max_frames: Optional[int] = None) -> Dict[str, Any]:
+        """
+        处理单个输入源
+
+        Args:
+            source: 视频路径、网络流地址或摄像头索引
+            sink: 事件输出
+            annotated_path: 标注视频输出路径，为None时不输出
+            max_frames: 最多处理的帧数（用于摄像头等无尽输入源）
+
+        Returns:
+            该输入源的处理统计
+        """
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            sink.emit({'event': 'error', 'source': str(source), 'message': '无法打开输入源',
+                       'time': datetime.now().isoformat()})
+            return {'source': str(source), 'frames': 0, 'falls': 0, 'error': '无法打开输入源'}
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = fps if fps and fps > 1 else 25.0
+        live = is_live_source(source)
+        tracker = PoseTracker()
+        self.roi_detector.reset()
+        # 每个跟踪目标的状态：连续摔倒帧数、连续正常帧数、是否处于摔倒中
+        track_states: Dict[int, Dict[str, Any]] = {}
+        writer = None
+        frame_index = 0
+        falls = 0
+        start_time = time.time()
+
+        sink.emit({'event': 'source_start', 'source': str(source), 'fps': fps, 'live': live,
+                   'time': datetime.now().isoformat()})
+
+        try:
+            while max_frames is None or frame_index < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                poses = self.roi_detector.detect(frame)
+                track_ids = tracker.update(poses)
+                is_fall, confidences, _ = self.fall_detector.detect_fall_batch(poses.keypoints)
+
+                for det_idx, track_id in enumerate(track_ids.tolist()):
+                    state = track_states.setdefault(track_id, {'fall_frames': 0, 'normal_frames': 0, 'fallen': False})
+                    if is_fall[det_idx]:
+                        state['fall_frames'] += 1
+                        state['normal_frames'] = 0
+                    else:
+                        state['normal_frames'] += 1
+                        state['fall_frames'] = 0
+                        if state['fallen'] and state['normal_frames'] >= self.recover_frames:
+                            state['fallen'] = False
+
+                    if not state['fallen'] and state['fall_frames'] >= self.min_fall_frames:
+                        state['fallen'] = True
+                        falls += 1
+                        sink.emit(self._fall_event(source, frame_index, fps, live, track_id,
+                                                   float(confidences[det_idx]), poses.bboxes[det_idx]))
+
+                # 已删除的跟踪目标不再保留状态，内存不随视频长度增长
+                for track_id in list(track_states):
+                    if track_id not in tracker.tracks:
+                        del track_states[track_id]
+
+                if annotated_path:
+                    if writer is None:
+                        writer = self._open_writer(annotated_path, fps, frame)
+                    self._annotate(frame, poses, is_fall)
+                    writer.write(frame)
+
+                frame_index += 1
+                if frame_index % 100 == 0:
+                    elapsed = time.time() - start_time
+                    print(f"[{source}] 已处理 {frame_index} 帧, {frame_index / elapsed:.1f} FPS", file=sys.stderr)
+        except KeyboardInterrupt:
+            print(f"[{source}] 已中断", file=sys.stderr)
+            raise
+        finally:
+            cap.release()
+            if writer is not None:
+                writer.release()
+            summary = {
+                'source': str(source),
+                'frames': frame_index,
+                'falls': falls,
+                'elapsed': time.time() - start_time,
+                'roi_ratio': round(self.roi_detector.roi_ratio(), 3)
+            }
+            sink.emit({'event': 'source_end', **summary, 'time': datetime.now().isoformat()})
+
+        return summary
+
+    @staticmethod
+    def _fall_event(source, frame_index: int, fps: float, live: bool, track_id: int,
+                    confidence: float, bbox: np.ndarray) -> Dict[str, Any]:
+        event = {
+            'event': 'fall',
+            'source': str(source),
+            'frame': frame_index,
+            'track_id': track_id,
+            'confidence': round(confidence, 4),
+            'bbox': None if np.isnan(bbox).any() else [round(float(v), 1) for v in bbox],
+            'time': datetime.now().isoformat()
+        }
+        if not live:
+            event['video_time'] = round(frame_index / fps, 3)
+        return event
+
+    @staticmethod
+    def _open_writer(path: str, fps: float, frame: np.ndarray) -> cv2.VideoWriter:
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        height, width = frame.shape[:2]
+        fourcc = cv2.VideoWriter_fourcc(*('mp4v' if path.lower().endswith('.mp4') else 'MJPG'))
+        return cv2.VideoWriter(path, fourcc, fps, (width, height))
+
+    def _annotate(self, frame: np.ndarray, poses, is_fall: np.ndarray):
+        """在帧上原地绘制骨架，摔倒的人用红框标出"""
+        self.pose_detector.draw_pose(frame, poses, inplace=True)
+        for bbox in poses.bboxes[is_fall]:
+            if not np.isnan(bbox).any():
+                x1, y1, x2, y2 = map(int, bbox)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
+                cv2.putText(frame, 'FALL', (x1, max(y1 - 8, 0)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+
+
+def annotated_output_path(annotated_output: Optional[str], source: Union[str, int], multiple: bool) -> Optional[str]:
+    """多个输入源时annotated_output视为目录，每个源输出一个文件"""
+    if not annotated_output:
+        return None
+    if not multiple:
+        return annotated_output
+    name = f"camera{source}" if isinstance(source, int) else os.path.splitext(os.path.basename(str(source)))[0]
+    return os.path.join(annotated_output, f"{name}_annotated.mp4")
+
+
+def run_stream_detection(source: str, events_path: str = '-', annotated_output: Optional[str] = None,
+                         max_frames: Optional[int] = None, detect_width: int = 640, device: str = 'cuda',
+                         model_path: str = "yolov8n-pose.pt", roi_inference: bool = False) -> List[Dict[str, Any]]:
+    """依次处理所有输入源，返回每个源的统计"""
+    sources = list(iter_sources(source))
+    if not sources:
+        print(f"未找到视频文件: {source}", file=sys.stderr)
+        return []
+
+    # 事件输出到标准输出时，其余日志改写到标准错误，保证标准输出只有JSON Lines
+    sink = JsonLinesSink(events_path)
+    summaries = []
+    with contextlib.redirect_stdout(sys.stderr if events_path == '-' else sys.stdout):
+        # 关闭YOLO的逐帧日志：它直接写进程标准输出，不受上面的重定向影响，会混入JSON Lines
+        pose_detector = PoseDetector(model_path=model_path, device=device, verbose=False)
+        detector = StreamingFallDetector(pose_detector, detect_width=detect_width, roi_inference=roi_inference)
+        try:
+            for src in sources:
+                out_path = annotated_output_path(annotated_output, src, len(sources) > 1)
+                summaries.append(detector.process_source(src, sink, out_path, max_frames))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.close()
+    return summaries
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="无界面流式摔倒检测")
+    parser.add_argument('--source', type=str, required=True,
+                        help='视频文件、视频目录、摄像头索引或网络流地址')
+    parser.add_argument('--events', type=str, default='-', help='JSON Lines事件输出路径，- 表示标准输出')
+    parser.add_argument('--annotated-output', type=str,
+                        help='标注视频输出路径（多个输入源时为目录）')
+    parser.add_argument('--max-frames', type=int, help='每个输入源最多处理的帧数')
+    parser.add_argument('--detect-width', type=int, default=640, help='检测分辨率宽度')
+    parser.add_argument('--device', type=str, default='cuda', help='推理设备 (cpu/cuda)')
+    parser.add_argument('--model', type=str, default='yolov8n-pose.pt', help='YOLO姿势模型路径')
+    parser.add_argument('--roi', action='store_true', help='区域推理：找到人后只在其周围区域推理')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    run_stream_detection(args.source, args.events, args.annotated_output, args.max_frames,
+                         args.detect_width, args.device, args.model, args.roi)
+
+
+if __name__ == "__main__":
+    main()
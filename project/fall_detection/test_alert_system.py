@@ -0,0 +1,297 @@
+"""
+预警系统测试
+在本机启动一个最小的SMTP服务器（不使用TLS、不需要登录），检查邮箱预警的会话复用、
+失败后的退避重试、退避等待不阻塞其他发送，以及预警历史的条数上限；
+用卡住的预警通道检查 AlertManager 的有界派发队列、工作线程数和关闭不阻塞；
+检查 IncidentAggregator 的事件合并、按事件键冷却和摘要合并
+
+用法:
+    python -m pytest test_alert_system.py
+"""
+
+import time
+import threading
+import socketserver
+
+from alert_system import AlertSystem, EmailAlertSystem, AlertManager, IncidentAggregator
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """只实现smtplib发送邮件用到的命令"""
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 localhost test SMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self._reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server.lock:
+                    reject = server.reject_data > 0
+                    if reject:
+                        server.reject_data -= 1
+                    else:
+                        server.messages += 1
+                self._reply("451 Temporary failure" if reject else "250 Queued")
+            elif command.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.reject_data = 0
+
+
+def _start_server():
+    server = _SMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _email_alert(server, **kwargs):
+    alert = EmailAlertSystem(smtp_server='127.0.0.1', smtp_port=server.server_address[1], use_tls=False, **kwargs)
+    # 密码为空时不登录
+    alert.configure("sender@example.com", "", ["receiver@example.com"])
+    return alert
+
+
+def test_email_session_reused_and_history_bounded():
+    server = _start_server()
+    alert = _email_alert(server, history_size=3)
+    try:
+        for i in range(5):
+            assert alert.send_alert(f"摔倒 {i}", use_cooldown=False)
+    finally:
+        alert.close()
+        server.shutdown()
+        server.server_close()
+
+    assert alert.connections_opened == 1
+    assert server.connections == 1
+    assert server.messages == 5
+    assert alert.sent_count == 5
+
+    history = alert.get_alert_history()
+    assert len(history) == 3
+    assert [record['message'] for record in history] == ["摔倒 2", "摔倒 3", "摔倒 4"]
+
+
+def test_email_retry_with_backoff_after_failure():
+    server = _start_server()
+    server.reject_data = 1
+    alert = _email_alert(server, retry_backoff=0.2, max_retries=2)
+    try:
+        start = time.perf_counter()
+        assert alert.send_alert("摔倒", use_cooldown=False)
+        elapsed = time.perf_counter() - start
+    finally:
+        alert.close()
+        server.shutdown()
+        server.server_close()
+
+    record = alert.get_alert_history()[-1]
+    assert record['success'] and record['attempts'] == 2
+    assert elapsed >= 0.2
+    # 失败后丢弃会话，重试时重新连接
+    assert alert.connections_opened == 2
+    assert server.messages == 1
+    assert alert.sent_count == 1 and alert.failed_count == 0
+
+
+def test_backoff_does_not_block_other_sends():
+    server = _start_server()
+    server.reject_data = 1
+    alert = _email_alert(server, retry_backoff=1.0, max_retries=1)
+    try:
+        failing = threading.Thread(target=alert.send_alert, args=("第一条",), kwargs={'use_cooldown': False})
+        failing.start()
+        # 等第一条进入退避等待
+        deadline = time.time() + 5
+        while server.reject_data and time.time() < deadline:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        assert alert.send_alert("第二条", use_cooldown=False)
+        elapsed = time.perf_counter() - start
+        failing.join(5)
+    finally:
+        alert.close()
+        server.shutdown()
+        server.server_close()
+
+    assert elapsed < 0.5
+    assert server.messages == 2
+    assert alert.sent_count == 2
+
+
+class _GatedChannel(AlertSystem):
+    """发送时阻塞直到 gate 打开的预警通道，用于模拟卡住的发送"""
+
+    def __init__(self):
+        super().__init__(max_retries=0)
+        self.alert_cooldown = 0
+        self.gate = threading.Event()
+        self.messages = []
+        self.threads = set()
+
+    def _send_alert_impl(self, message, image, alert_type):
+        self.threads.add(threading.get_ident())
+        self.gate.wait(10)
+        self.messages.append(message)
+        return True
+
+
+def _blocked_manager(num_workers=2, queue_size=3):
+    """返回所有工作线程都卡在发送上的预警管理器"""
+    manager = AlertManager(num_workers=num_workers, queue_size=queue_size)
+    channel = _GatedChannel()
+    manager.alert_methods.append(channel)
+    for i in range(num_workers):
+        assert manager.send_system_alert(f"占用 {i}")
+    # 工作线程都已取走任务（一个在发送，其余等待通道的发送锁）
+    deadline = time.time() + 5
+    while manager.get_dispatch_stats()['pending'] and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.get_dispatch_stats()['pending'] == 0
+    return manager, channel
+
+
+def test_manager_queue_bounded_and_drops_when_full():
+    manager, channel = _blocked_manager(num_workers=2, queue_size=3)
+    try:
+        accepted = [manager.send_system_alert(f"预警 {i}") for i in range(10)]
+        assert accepted == [True] * 3 + [False] * 7
+        stats = manager.get_dispatch_stats()
+        assert stats['queued'] == 5 and stats['dropped'] == 7 and stats['pending'] == 3
+        # 突发预警不会创建更多线程
+        assert len(manager._workers) == 2
+    finally:
+        channel.gate.set()
+    assert manager.flush(timeout=5)
+    assert len(channel.messages) == 5
+    assert len(channel.threads) <= 2
+    manager.shutdown(timeout=5)
+    assert manager._workers == []
+
+
+def test_manager_shutdown_does_not_block_on_full_queue():
+    manager, channel = _blocked_manager(num_workers=2, queue_size=3)
+    workers = list(manager._workers)
+    for i in range(3):
+        assert manager.send_system_alert(f"预警 {i}")
+
+    start = time.perf_counter()
+    manager.shutdown(timeout=0.2)
+    elapsed = time.perf_counter() - start
+    channel.gate.set()
+
+    # flush 0.2s + 每个工作线程最多等待 0.2s
+    assert elapsed < 2.0
+    stats = manager.get_dispatch_stats()
+    assert stats['pending'] == 0 and stats['dropped'] == 3
+    for worker in workers:
+        worker.join(5)
+        assert not worker.is_alive()
+
+
+def test_incident_merges_fall_frames_within_merge_gap():
+    incidents = IncidentAggregator(cooldown=60, merge_gap=3, digest_window=5)
+    assert incidents.observe('cam1', True, 0.6, now=100.0)
+    assert not incidents.observe('cam1', True, 0.9, now=101.0)
+    assert not incidents.observe('cam1', False, now=102.0)
+    assert not incidents.observe('cam1', True, 0.7, now=103.5)
+    assert incidents.incident_count == 1
+
+    digest = incidents.pop_digest(now=105.0)
+    assert len(digest) == 1
+    incident = digest[0]
+    assert incident['frames'] == 3
+    assert incident['confidence'] == 0.9
+    assert (incident['start'], incident['last_seen']) == (100.0, 103.5)
+
+    # 间隔超过 merge_gap 的摔倒帧是新事件（仍在冷却中，不发送）
+    assert not incidents.observe('cam1', True, 0.8, now=107.0)
+    assert incidents.incident_count == 2
+
+
+def test_incident_cooldown_is_per_key():
+    incidents = IncidentAggregator(cooldown=30, merge_gap=3, digest_window=0)
+    assert incidents.observe('cam1', True, 0.8, now=0.0)
+    # cam1 冷却中的新事件不发送，但计数
+    assert not incidents.observe('cam1', True, 0.8, now=5.0)
+    assert not incidents.observe('cam1', True, 0.8, now=15.0)
+    # 其他摄像头不受 cam1 冷却的影响
+    assert incidents.observe('cam2', True, 0.7, now=10.0)
+    assert incidents.suppressed_count == 2
+
+    # 冷却结束后的下一次预警带上冷却期间未发送的次数
+    assert incidents.observe('cam1', True, 0.9, now=31.0)
+    by_key = {incident['key']: incident for incident in incidents.pop_digest(now=31.0)}
+    assert by_key['cam1']['suppressed_before'] == 2
+    assert by_key['cam2']['suppressed_before'] == 0
+    assert "冷却期间另有 2 次" in IncidentAggregator.format_digest([by_key['cam1']])
+
+
+def test_incidents_batched_into_one_digest():
+    incidents = IncidentAggregator(cooldown=60, merge_gap=3, digest_window=5, max_digest=10)
+    for i, key in enumerate(['cam1', 'cam2', 'cam3']):
+        assert incidents.observe(key, True, 0.5 + 0.1 * i, now=100.0 + i)
+    assert incidents.pop_digest(now=104.0) == []
+    assert incidents.seconds_until_due(now=104.0) == 1.0
+
+    digest = incidents.pop_digest(now=105.0)
+    assert [incident['key'] for incident in digest] == ['cam1', 'cam2', 'cam3']
+    assert incidents.pop_digest(now=200.0) == []
+    assert IncidentAggregator.format_digest(digest).startswith("检测到 3 起摔倒事件")
+
+    # 攒满 max_digest 个时不等待
+    incidents = IncidentAggregator(digest_window=60, max_digest=2)
+    incidents.observe('cam1', True, now=0.0)
+    incidents.observe('cam2', True, now=0.0)
+    assert len(incidents.pop_digest(now=0.0)) == 2
+
+
+def test_manager_sends_incidents_as_one_digest():
+    manager = AlertManager(num_workers=2, incident_cooldown=60, merge_gap=3, digest_window=0.3)
+    channel = _GatedChannel()
+    channel.gate.set()
+    manager.alert_methods.append(channel)
+    try:
+        for key in ['cam1', 'cam2', 'cam3']:
+            assert manager.report_detection(key, True, 0.8)
+            # 同一事件的后续帧不产生新事件
+            assert not manager.report_detection(key, True, 0.9)
+        deadline = time.time() + 5
+        while not channel.messages and time.time() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.3)
+    finally:
+        manager.shutdown(timeout=5)
+
+    assert len(channel.messages) == 1
+    assert channel.messages[0].startswith("检测到 3 起摔倒事件")
+    stats = manager.get_dispatch_stats()
+    assert stats['incidents'] == 3 and stats['sent'] == 1
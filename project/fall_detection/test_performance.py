@@ -1,180 +1,399 @@
 """
-性能测试脚本
-测试优化后的摔倒检测系统性能
+性能基准测试脚本
+分阶段测试摔倒检测系统的性能：解码、缩放、姿势检测、摔倒判定、骨架绘制、特征提取
+
+- 输入固定：合成图像/姿势使用固定随机种子，也可通过 --video 指定录制的视频
+- 每个阶段先预热再计时，报告 p50/p95/p99 延迟和峰值内存(RSS)
+- 结果保存为JSON，可与基线对比，发现性能回退时以非零状态码退出
+
+用法:
+    python test_performance.py                                   # 合成输入，打印结果
+    python test_performance.py --video sample.mp4 --output bench.json
+    python test_performance.py --save-baseline baseline.json     # 保存基线
+    python test_performance.py --baseline baseline.json          # 与基线对比
 """
 
+import os
+import sys
 import cv2
+import json
 import time
+import argparse
+import platform
+import tempfile
 import numpy as np
-from pose_detection import PoseDetector
-from fall_detection_algorithms import ThresholdFallDetector
-
-def test_detection_speed():
-    """测试检测速度"""
-    print("开始性能测试...")
-    
-    # 初始化检测器
-    pose_detector = PoseDetector()
-    threshold_detector = ThresholdFallDetector()
-    
-    # 创建测试图像
-    test_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-    
-    # 测试不同分辨率的检测速度
-    resolutions = [
-        (320, 240),
-        (480, 360), 
-        (640, 480),
-        (800, 600)
-    ]
-    
-    print("\n检测速度测试结果:")
-    print("-" * 50)
-    
-    for width, height in resolutions:
-        # 调整图像大小
-        resized_image = cv2.resize(test_image, (width, height))
-        
-        # 测试检测速度
-        times = []
-        for _ in range(10):  # 测试10次取平均值
-            start_time = time.time()
-            
-            # 姿势检测
-            poses = pose_detector.detect_pose(resized_image)
-            
-            # 摔倒检测
-            if poses:
-                for pose in poses:
-                    is_fall, confidence, _ = threshold_detector.detect_fall(pose)
-            
-            # 绘制骨架
-            if poses:
-                processed = pose_detector.draw_pose(resized_image, poses)
-            
-            end_time = time.time()
-            times.append(end_time - start_time)
-        
-        avg_time = np.mean(times)
-        fps = 1.0 / avg_time
-        
-        print(f"分辨率 {width}x{height}: {avg_time*1000:.1f}ms ({fps:.1f} FPS)")
-    
-    print("-" * 50)
-
-def test_draw_performance():
-    """测试绘制性能"""
-    print("\n绘制性能测试:")
-    print("-" * 50)
-    
-    pose_detector = PoseDetector()
-    
-    # 创建测试图像
-    test_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-    
-    # 模拟检测结果
-    mock_poses = [{
-        'keypoints': {
-            'nose': {'x': 320, 'y': 100, 'confidence': 0.9},
-            'left_shoulder': {'x': 280, 'y': 150, 'confidence': 0.8},
-            'right_shoulder': {'x': 360, 'y': 150, 'confidence': 0.8},
-            'left_elbow': {'x': 250, 'y': 200, 'confidence': 0.7},
-            'right_elbow': {'x': 390, 'y': 200, 'confidence': 0.7},
-            'left_wrist': {'x': 220, 'y': 250, 'confidence': 0.6},
-            'right_wrist': {'x': 420, 'y': 250, 'confidence': 0.6},
-            'left_hip': {'x': 300, 'y': 300, 'confidence': 0.8},
-            'right_hip': {'x': 340, 'y': 300, 'confidence': 0.8},
-            'left_knee': {'x': 290, 'y': 400, 'confidence': 0.7},
-            'right_knee': {'x': 350, 'y': 400, 'confidence': 0.7},
-            'left_ankle': {'x': 280, 'y': 480, 'confidence': 0.6},
-            'right_ankle': {'x': 360, 'y': 480, 'confidence': 0.6}
-        },
-        'bbox': [250, 80, 390, 500],
-        'confidence': 0.85
-    }]
-    
-    # 测试不同绘制选项的性能
-    draw_options = [
-        ("完整绘制", True, True, True),
-        ("仅骨架", False, True, True),
-        ("仅关键点", True, False, True),
-        ("仅边框", False, False, True)
-    ]
-    
-    for name, draw_kp, draw_skel, draw_bbox in draw_options:
-        times = []
-        for _ in range(20):  # 测试20次
-            start_time = time.time()
-            processed = pose_detector.draw_pose(
-                test_image, mock_poses, 
-                draw_keypoints=draw_kp, 
-                draw_skeleton=draw_skel, 
-                draw_bbox=draw_bbox
-            )
-            end_time = time.time()
-            times.append(end_time - start_time)
-        
-        avg_time = np.mean(times)
-        fps = 1.0 / avg_time
-        print(f"{name}: {avg_time*1000:.1f}ms ({fps:.1f} FPS)")
-    
-    print("-" * 50)
-
-def test_memory_usage():
-    """测试内存使用情况"""
-    print("\n内存使用测试:")
-    print("-" * 50)
-    
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from pose_batch import PoseBatch
+
+# 固定随机种子，保证每次运行的输入一致
+SEED = 20240101
+DETECT_WIDTH = 640
+
+# 模拟检测结果（单人站立姿势，640x480坐标系）
+MOCK_POSE = {
+    'keypoints': {
+        'nose': {'x': 320, 'y': 100, 'confidence': 0.9},
+        'left_eye': {'x': 312, 'y': 92, 'confidence': 0.85},
+        'right_eye': {'x': 328, 'y': 92, 'confidence': 0.85},
+        'left_ear': {'x': 302, 'y': 96, 'confidence': 0.7},
+        'right_ear': {'x': 338, 'y': 96, 'confidence': 0.7},
+        'left_shoulder': {'x': 280, 'y': 150, 'confidence': 0.8},
+        'right_shoulder': {'x': 360, 'y': 150, 'confidence': 0.8},
+        'left_elbow': {'x': 250, 'y': 200, 'confidence': 0.7},
+        'right_elbow': {'x': 390, 'y': 200, 'confidence': 0.7},
+        'left_wrist': {'x': 220, 'y': 250, 'confidence': 0.6},
+        'right_wrist': {'x': 420, 'y': 250, 'confidence': 0.6},
+        'left_hip': {'x': 300, 'y': 300, 'confidence': 0.8},
+        'right_hip': {'x': 340, 'y': 300, 'confidence': 0.8},
+        'left_knee': {'x': 290, 'y': 400, 'confidence': 0.7},
+        'right_knee': {'x': 350, 'y': 400, 'confidence': 0.7},
+        'left_ankle': {'x': 280, 'y': 470, 'confidence': 0.6},
+        'right_ankle': {'x': 360, 'y': 470, 'confidence': 0.6}
+    },
+    'bbox': [210, 80, 430, 480],
+    'confidence': 0.85
+}
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
     import psutil
-    import os
-    
-    process = psutil.Process(os.getpid())
-    initial_memory = process.memory_info().rss / 1024 / 1024  # MB
-    
-    print(f"初始内存使用: {initial_memory:.1f} MB")
-    
-    # 创建检测器
-    pose_detector = PoseDetector()
+    return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
+
+
+def peak_rss_mb() -> float:
+    """进程启动以来的峰值常驻内存（MB）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux单位为KB，macOS为字节
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        # Windows: 使用峰值工作集
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().peak_wset / 1024 / 1024
+
+
+def make_synthetic_frames(num_frames: int, width: int, height: int) -> List[np.ndarray]:
+    """生成固定的合成帧：带噪声的背景上移动的矩形"""
+    rng = np.random.default_rng(SEED)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(num_frames):
+        frame = background.copy()
+        x = int((i * 7) % max(width - 100, 1))
+        cv2.rectangle(frame, (x, height // 4), (x + 80, height // 4 + 240), (40, 40, 200), -1)
+        frames.append(frame)
+    return frames
+
+
+def make_synthetic_poses(num_persons: int, width: int, height: int) -> PoseBatch:
+    """由模拟姿势平移缩放出固定的多人姿势"""
+    rng = np.random.default_rng(SEED)
+    base = PoseBatch.from_dicts([MOCK_POSE]).scale(width / 640, height / 480)
+    batches = []
+    for _ in range(num_persons):
+        shift = rng.uniform(-0.3, 0.3, 2) * (width, height)
+        keypoints = base.keypoints.copy()
+        keypoints[..., :2] += shift
+        keypoints[..., :2] += rng.normal(0, 3, keypoints[..., :2].shape)
+        bboxes = base.bboxes + np.tile(shift, 2)
+        batches.append(PoseBatch(keypoints, bboxes, base.scores))
+    return PoseBatch.concatenate(batches)
+
+
+def write_video(frames: List[np.ndarray], path: str, fps: float = 30.0):
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+
+class BenchmarkRunner:
+    """按阶段计时，记录延迟分位数与内存"""
+
+    def __init__(self, warmup: int = 5, iterations: int = 50):
+        self.warmup = warmup
+        self.iterations = iterations
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, name: str, func: Callable[[], Any], iterations: Optional[int] = None,
+            items_per_call: int = 1):
+        """
+        预热后重复执行func并记录耗时
+
+        Args:
+            name: 阶段名称
+            func: 无参数的被测函数
+            iterations: 覆盖默认的计时次数
+            items_per_call: 每次调用处理的条目数（帧/人），用于计算单条耗时
+        """
+        iterations = iterations or self.iterations
+        for _ in range(self.warmup):
+            func()
+
+        times = np.empty(iterations, dtype=np.float64)
+        for i in range(iterations):
+            start = time.perf_counter()
+            func()
+            times[i] = time.perf_counter() - start
+
+        times_ms = times * 1000
+        p50, p95, p99 = np.percentile(times_ms, [50, 95, 99])
+        self.results[name] = {
+            'iterations': iterations,
+            'items_per_call': items_per_call,
+            'mean_ms': float(times_ms.mean()),
+            'min_ms': float(times_ms.min()),
+            'max_ms': float(times_ms.max()),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'per_item_p50_ms': float(p50 / items_per_call),
+            'rss_mb': current_rss_mb(),
+            'peak_rss_mb': peak_rss_mb()
+        }
+        print(f"{name:<28} p50 {p50:8.3f}ms  p95 {p95:8.3f}ms  p99 {p99:8.3f}ms  "
+              f"RSS {self.results[name]['rss_mb']:.1f}MB")
+
+
+def bench_decode(runner: BenchmarkRunner, video_path: str, num_frames: int):
+    """解码阶段：顺序读取视频帧"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"无法打开视频: {video_path}")
+        return
+
+    def read_frame():
+        ret, _ = cap.read()
+        if not ret:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            cap.read()
+
+    runner.run('decode', read_frame, iterations=num_frames)
+    cap.release()
+
+
+def load_frames(video_path: str, max_frames: int) -> List[np.ndarray]:
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def cycle(items: List[Any]) -> Callable[[], Any]:
+    """按顺序循环返回列表元素，让每次计时使用不同的输入帧"""
+    state = {'index': 0}
+
+    def next_item():
+        item = items[state['index'] % len(items)]
+        state['index'] += 1
+        return item
+    return next_item
+
+
+def run_benchmarks(args) -> Dict[str, Any]:
+    from fall_detection_algorithms import ThresholdFallDetector
+    from training_utils import FeatureExtractor
+
+    runner = BenchmarkRunner(warmup=args.warmup, iterations=args.iterations)
+    rss_start = current_rss_mb()
+
+    # 准备输入：录制的视频或固定的合成视频
+    temp_dir = None
+    if args.video:
+        video_path = args.video
+        input_desc = {'type': 'recorded', 'video': os.path.abspath(args.video)}
+    else:
+        temp_dir = tempfile.mkdtemp(prefix='fall_bench_')
+        video_path = os.path.join(temp_dir, 'synthetic.avi')
+        write_video(make_synthetic_frames(args.frames, args.width, args.height), video_path)
+        input_desc = {'type': 'synthetic', 'seed': SEED, 'size': [args.width, args.height]}
+
+    frames = load_frames(video_path, args.frames)
+    if not frames:
+        raise RuntimeError(f"无法从 {video_path} 读取帧")
+    height, width = frames[0].shape[:2]
+    input_desc.update({'frames': len(frames), 'resolution': [width, height]})
+    print(f"输入: {input_desc}")
+    print("-" * 100)
+
+    # 解码
+    bench_decode(runner, video_path, min(len(frames), runner.iterations))
+
+    # 缩放到检测分辨率
+    next_frame = cycle(frames)
+    scale = DETECT_WIDTH / width
+    detect_size = (DETECT_WIDTH, int(height * scale))
+    runner.run('resize', lambda: cv2.resize(next_frame(), detect_size, interpolation=cv2.INTER_LINEAR))
+    detect_frames = [cv2.resize(f, detect_size, interpolation=cv2.INTER_LINEAR) for f in frames]
+
+    # 姿势检测（需要YOLO模型）
+    detected = []
+    if not args.skip_model:
+        from pose_detection import PoseDetector
+        rss_before_model = current_rss_mb()
+        pose_detector = PoseDetector(device=args.device)
+        runner.results['model_load'] = {'rss_delta_mb': current_rss_mb() - rss_before_model}
+        next_detect_frame = cycle(detect_frames)
+        runner.run('detect_pose', lambda: pose_detector.detect_pose(next_detect_frame(), as_array=True),
+                   iterations=args.model_iterations)
+        detected = [pose_detector.detect_pose(f, as_array=True) for f in detect_frames[:10]]
+
+    # 摔倒判定与特征提取使用固定的合成姿势，保证不同机器/模型之间可比
+    poses = make_synthetic_poses(args.persons, width, height)
+    pose_dicts = poses.to_dicts()
     threshold_detector = ThresholdFallDetector()
-    
-    after_init_memory = process.memory_info().rss / 1024 / 1024
-    print(f"初始化后内存: {after_init_memory:.1f} MB")
-    print(f"检测器占用: {after_init_memory - initial_memory:.1f} MB")
-    
-    # 模拟视频处理
-    test_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-    
-    for i in range(100):
-        poses = pose_detector.detect_pose(test_image)
-        if poses:
-            processed = pose_detector.draw_pose(test_image, poses)
-        
-        if i % 20 == 0:
-            current_memory = process.memory_info().rss / 1024 / 1024
-            print(f"处理 {i} 帧后内存: {current_memory:.1f} MB")
-    
-    final_memory = process.memory_info().rss / 1024 / 1024
-    print(f"最终内存使用: {final_memory:.1f} MB")
-    print(f"内存增长: {final_memory - after_init_memory:.1f} MB")
-    
-    print("-" * 50)
+    runner.run('detect_fall', lambda: [threshold_detector.detect_fall(p) for p in pose_dicts],
+               items_per_call=len(pose_dicts))
+    runner.run('detect_fall_batch', lambda: threshold_detector.detect_fall_batch(poses.keypoints),
+               items_per_call=len(poses))
+
+    feature_extractor = FeatureExtractor()
+    runner.run('extract_features', lambda: feature_extractor.extract_features_from_poses(poses.keypoints),
+               items_per_call=len(poses))
+    sequence = np.repeat(poses.keypoints, 30, axis=0)
+    runner.run('extract_features_sequence', lambda: feature_extractor.extract_features_from_poses(sequence),
+               items_per_call=len(sequence))
+
+    # 骨架绘制（原分辨率），直接使用渲染方案，与 PoseDetector.draw_pose 的绘制相同且不需要模型
+    from pose_detection import SkeletonRenderPlan
+    render_plan = SkeletonRenderPlan()
+    runner.run('draw_pose', lambda: render_plan.draw(next_frame().copy(), poses), items_per_call=len(poses))
+    canvas = frames[0].copy()
+    runner.run('draw_pose_inplace', lambda: render_plan.draw(canvas, poses), items_per_call=len(poses))
+
+    if temp_dir:
+        os.remove(video_path)
+        os.rmdir(temp_dir)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'device': None if args.skip_model else args.device,
+            'warmup': args.warmup,
+            'iterations': args.iterations,
+            'persons': args.persons,
+            'input': input_desc,
+            'detected_persons': [len(d) for d in detected]
+        },
+        'memory': {
+            'start_rss_mb': rss_start,
+            'end_rss_mb': current_rss_mb(),
+            'peak_rss_mb': peak_rss_mb()
+        },
+        'stages': {k: v for k, v in runner.results.items() if 'p50_ms' in v},
+        'model_load': runner.results.get('model_load')
+    }
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any],
+                          tolerance: float, metrics=('p50_ms', 'p95_ms')) -> List[str]:
+    """
+    与基线逐阶段对比
+
+    Returns:
+        回退描述列表，某阶段某指标超过 基线 * (1 + tolerance) 即视为回退
+    """
+    regressions = []
+    print("\n与基线对比:")
+    print("-" * 100)
+    if baseline.get('meta', {}).get('input') != results['meta']['input']:
+        print("警告: 基线与本次运行的输入不同，对比结果仅供参考")
+    for stage, current in results['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if base is None:
+            print(f"{stage:<28} (基线中无此阶段)")
+            continue
+        parts = []
+        for metric in metrics:
+            if not base.get(metric):
+                continue
+            ratio = current[metric] / base[metric]
+            flag = ''
+            if ratio > 1 + tolerance:
+                flag = ' !!'
+                regressions.append(f"{stage}.{metric}: {base[metric]:.3f}ms -> {current[metric]:.3f}ms ({ratio:.2f}x)")
+            parts.append(f"{metric} {base[metric]:8.3f} -> {current[metric]:8.3f}ms ({ratio:5.2f}x){flag}")
+        print(f"{stage:<28} " + "  ".join(parts))
+
+    base_peak = baseline.get('memory', {}).get('peak_rss_mb')
+    if base_peak:
+        peak = results['memory']['peak_rss_mb']
+        ratio = peak / base_peak
+        print(f"{'peak_rss':<28} {base_peak:.1f} -> {peak:.1f}MB ({ratio:.2f}x)")
+        if ratio > 1 + tolerance:
+            regressions.append(f"peak_rss_mb: {base_peak:.1f}MB -> {peak:.1f}MB ({ratio:.2f}x)")
+    print("-" * 100)
+    return regressions
+
+
+def save_json(data: Dict[str, Any], path: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到: {path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="摔倒检测系统性能基准测试")
+    parser.add_argument('--video', type=str, help='录制的测试视频（默认使用固定的合成视频）')
+    parser.add_argument('--frames', type=int, default=60, help='读取/生成的帧数')
+    parser.add_argument('--width', type=int, default=1280, help='合成视频宽度')
+    parser.add_argument('--height', type=int, default=720, help='合成视频高度')
+    parser.add_argument('--persons', type=int, default=3, help='合成姿势的人数')
+    parser.add_argument('--warmup', type=int, default=5, help='每个阶段的预热次数')
+    parser.add_argument('--iterations', type=int, default=100, help='每个阶段的计时次数')
+    parser.add_argument('--model-iterations', type=int, default=30, help='姿势检测阶段的计时次数')
+    parser.add_argument('--device', type=str, default='cpu', help='姿势检测设备 (cpu/cuda)')
+    parser.add_argument('--skip-model', action='store_true', help='跳过需要YOLO模型的阶段')
+    parser.add_argument('--output', type=str, help='结果JSON输出路径')
+    parser.add_argument('--baseline', type=str, help='基线JSON路径，用于检测性能回退')
+    parser.add_argument('--save-baseline', type=str, help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对回退比例')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    print("摔倒检测系统性能基准测试")
+    print("=" * 100)
+
+    results = run_benchmarks(args)
+    print(f"\n峰值内存: {results['memory']['peak_rss_mb']:.1f}MB")
+
+    if args.output:
+        save_json(results, args.output)
+    if args.save_baseline:
+        save_json(results, args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("发现性能回退:")
+            for item in regressions:
+                print(f"  - {item}")
+            return 1
+        print("未发现性能回退")
+
+    return 0
+
 
 if __name__ == "__main__":
-    print("摔倒检测系统性能测试")
-    print("=" * 60)
-    
-    try:
-        test_detection_speed()
-        test_draw_performance()
-        test_memory_usage()
-        
-        print("\n性能测试完成！")
-        print("\n优化建议:")
-        print("1. 使用较低分辨率进行检测 (640x480 或更低)")
-        print("2. 调整检测间隔以平衡速度和准确性")
-        print("3. 选择适当的显示质量设置")
-        print("4. 使用GPU加速 (如果可用)")
-        
-    except Exception as e:
-        print(f"测试过程中出现错误: {e}")
-        print("请确保已安装所有依赖包") 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+流式检测命令行测试
+用替身YOLO模型运行 stream_detection，检查事件输出到标准输出时每一行都是合法的JSON
+
+替身模型模仿ultralytics的日志行为：导入时绑定进程的标准输出，verbose=True（默认）时
+每次推理都写一行日志，contextlib.redirect_stdout 无法拦截
+
+用法:
+    python -m pytest test_stream_detection.py
+"""
+
+import os
+import sys
+import json
+import subprocess
+import textwrap
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+FAKE_ULTRALYTICS = textwrap.dedent('''
+    import sys
+    import numpy as np
+
+    # 与ultralytics一致：日志输出绑定在导入时的标准输出上
+    _LOG_STREAM = sys.stdout
+
+
+    class _Tensor:
+        def __init__(self, data):
+            self.data = np.asarray(data, dtype=np.float32)
+
+        def cpu(self):
+            return self
+
+        def numpy(self):
+            return self.data
+
+
+    class _Keypoints:
+        def __init__(self, keypoints):
+            self.data = _Tensor(keypoints)
+            self.conf = _Tensor(keypoints[..., 2])
+
+
+    class _Boxes:
+        def __init__(self, boxes):
+            self.xyxy = _Tensor(boxes)
+            self.conf = _Tensor(np.full(len(boxes), 0.9))
+
+
+    class _Result:
+        def __init__(self, width, height):
+            # 一个躺倒的人：肩、髋、膝在同一水平线上
+            keypoints = np.zeros((1, 17, 3), dtype=np.float32)
+            keypoints[0, :, 0] = np.linspace(0.2, 0.8, 17) * width
+            keypoints[0, :, 1] = 0.7 * height
+            keypoints[0, :, 2] = 0.9
+            self.keypoints = _Keypoints(keypoints)
+            self.boxes = _Boxes(np.array([[0.2 * width, 0.6 * height, 0.8 * width, 0.8 * height]]))
+
+
+    class YOLO:
+        def __init__(self, model_path):
+            self.model_path = model_path
+
+        def __call__(self, source, verbose=True, **kwargs):
+            images = source if isinstance(source, list) else [source]
+            if verbose:
+                for i, image in enumerate(images):
+                    _LOG_STREAM.write(f"{i}: {image.shape[0]}x{image.shape[1]} 1 person, 5.0ms\\n")
+                _LOG_STREAM.write("Speed: 1.0ms preprocess, 5.0ms inference, 1.0ms postprocess\\n")
+                _LOG_STREAM.flush()
+            return [_Result(image.shape[1], image.shape[0]) for image in images]
+''')
+
+
+def _write_video(path, num_frames=30, width=320, height=240):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (width, height))
+    rng = np.random.default_rng(0)
+    for _ in range(num_frames):
+        writer.write(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+    writer.release()
+
+
+def test_stream_cli_stdout_is_json_lines(tmp_path):
+    fake_dir = tmp_path / "fake"
+    (fake_dir / "ultralytics").mkdir(parents=True)
+    (fake_dir / "ultralytics" / "__init__.py").write_text(FAKE_ULTRALYTICS, encoding='utf-8')
+    video_path = str(tmp_path / "clip.avi")
+    _write_video(video_path)
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(fake_dir), HERE, env.get('PYTHONPATH', '')])
+    proc = subprocess.run(
+        [sys.executable, os.path.join(HERE, "stream_detection.py"),
+         '--source', video_path, '--events', '-', '--device', 'cpu'],
+        capture_output=True, text=True, encoding='utf-8', env=env, timeout=120
+    )
+    assert proc.returncode == 0, proc.stderr
+
+    lines = proc.stdout.splitlines()
+    assert lines, "标准输出没有任何事件"
+    events = [json.loads(line) for line in lines]
+
+    kinds = [event['event'] for event in events]
+    assert kinds[0] == 'source_start'
+    assert kinds[-1] == 'source_end'
+    assert events[-1]['frames'] == 30
+    assert 'fall' in kinds
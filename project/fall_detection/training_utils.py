@@ -5,69 +5,164 @@
 
 import os
 import json
+import time
+import hashlib
+import pickle
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import cv2
-from typing import List, Dict, Any, Tuple
+import psutil
+from typing import List, Dict, Any, Iterator, Tuple, Optional
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, ParameterGrid
 from sklearn.metrics import classification_report, confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 
 from pose_detection import PoseDetector
+from pose_batch import KEYPOINT_INDEX
+from pose_features import (
+    BASE_KEYPOINTS, FEATURE_NAMES, FEATURE_VERSION, as_feature_keypoints, extract_pose_features
+)
+from pose_storage import (
+    PoseSequenceWriter, is_pose_sequence_file, list_pose_sequence_files, load_pose_sequence, pose_output_exists,
+    POSE_DATA_SUFFIX, POSE_INDEX_SUFFIX
+)
 from fall_detection_algorithms import TraditionalMLFallDetector, DeepLearningFallDetector
 
 class DataPreprocessor:
     """数据预处理器"""
     
-    def __init__(self, pose_detector: PoseDetector):
+    def __init__(self, pose_detector: PoseDetector, batch_size: int = 8, storage_format: str = 'npy'):
+        """
+        Args:
+            pose_detector: 姿势检测器
+            batch_size: 离线处理时每次推理的帧数
+            storage_format: 'npy' 为逐帧追加写入的二进制格式，'json' 为旧版JSON格式
+        """
+        if storage_format not in ('npy', 'json'):
+            raise ValueError(f"不支持的存储格式: {storage_format}")
         self.pose_detector = pose_detector
+        self.batch_size = batch_size
+        self.storage_format = storage_format
         self.processed_data = []
         
-    def process_video_dataset(self, dataset_path: str, output_path: str = "processed_data"):
+    def process_video_dataset(self, dataset_path: str, output_path: str = "processed_data",
+                              num_workers: int = 1, skip_existing: bool = True):
         """
         处理视频数据集
         
         Args:
             dataset_path: 数据集路径，包含fall和normal子文件夹
             output_path: 输出路径
+            num_workers: 并行处理视频的进程数，大于1时每个进程加载一份模型
+            skip_existing: 跳过输出已存在的视频，用于中断后继续处理
         """
         if not os.path.exists(output_path):
             os.makedirs(output_path)
         
-        # 处理摔倒视频
-        fall_path = os.path.join(dataset_path, "fall")
-        if os.path.exists(fall_path):
-            self._process_videos_in_folder(fall_path, output_path, label=1)
+        # 收集摔倒视频和正常视频的处理任务
+        jobs = []
+        for folder_name, label in (("fall", 1), ("normal", 0)):
+            folder_path = os.path.join(dataset_path, folder_name)
+            if os.path.exists(folder_path):
+                jobs.extend(self._collect_video_jobs(folder_path, output_path, label, skip_existing))
         
-        # 处理正常视频
-        normal_path = os.path.join(dataset_path, "normal")
-        if os.path.exists(normal_path):
-            self._process_videos_in_folder(normal_path, output_path, label=0)
+        if num_workers > 1 and len(jobs) > 1:
+            self._process_jobs_parallel(jobs, num_workers)
+        else:
+            self._process_jobs_serial(jobs)
         
         # 保存处理后的数据
         self.save_processed_data(output_path)
         
     def _process_videos_in_folder(self, folder_path: str, output_path: str, label: int):
         """处理文件夹中的视频"""
-        video_files = [f for f in os.listdir(folder_path) 
-                      if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))]
-        
+        self._process_jobs_serial(self._collect_video_jobs(folder_path, output_path, label))
+    
+    def _collect_video_jobs(self, folder_path: str, output_path: str, label: int,
+                            skip_existing: bool = False) -> List[Tuple[str, str, int]]:
+        """列出文件夹中待处理的视频，返回 (视频路径, 输出路径前缀, 标签) 列表"""
+        video_files = sorted(f for f in os.listdir(folder_path) 
+                             if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')))
+        
+        jobs = []
+        skipped = 0
         for video_file in video_files:
-            video_path = os.path.join(folder_path, video_file)
-            print(f"处理视频: {video_file}")
-            
-            try:
+            output_base = os.path.join(output_path, f"{os.path.splitext(video_file)[0]}_{label}")
+            if skip_existing and pose_output_exists(output_base, self.storage_format):
+                skipped += 1
+                continue
+            jobs.append((os.path.join(folder_path, video_file), output_base, label))
+        
+        if skipped:
+            print(f"{folder_path}: 跳过 {skipped} 个已处理的视频")
+        return jobs
+    
+    def _process_jobs_serial(self, jobs: List[Tuple[str, str, int]]):
+        """在当前进程中依次处理视频"""
+        progress = _PreprocessProgress(len(jobs))
+        for job in jobs:
+            result = self._process_single_video(*job)
+            self._record_result(result)
+            progress.update(result)
+    
+    def _process_jobs_parallel(self, jobs: List[Tuple[str, str, int]], num_workers: int):
+        """使用进程池并行处理视频，每个工作进程各自加载一份模型"""
+        detector = self.pose_detector
+        init_args = (detector.model_path, detector.conf_threshold, detector.device,
+                     self.batch_size, self.storage_format)
+        progress = _PreprocessProgress(len(jobs))
+        print(f"使用 {num_workers} 个进程处理 {len(jobs)} 个视频")
+        
+        # spawn方式启动，避免fork后CUDA上下文不可用
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=context,
+                                 initializer=_init_preprocess_worker, initargs=init_args) as executor:
+            futures = [executor.submit(_preprocess_worker_job, job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                self._record_result(result)
+                progress.update(result)
+    
+    def _record_result(self, result: Dict[str, Any]):
+        if result['output'] is not None:
+            self.processed_data.append(os.path.basename(result['output']))
+    
+    def _process_single_video(self, video_path: str, output_base: str, label: int) -> Dict[str, Any]:
+        """处理单个视频并保存结果"""
+        video_file = os.path.basename(video_path)
+        print(f"处理视频: {video_file}")
+        result = {'video': video_file, 'output': None, 'frames': 0, 'error': None}
+        
+        try:
+            if self.storage_format == 'npy':
+                # 边检测边写入，内存中不保留整段视频的结果
+                with PoseSequenceWriter(output_base, label, source=video_path) as writer:
+                    for poses in self.pose_detector.iter_video_poses(
+                            video_path, batch_size=self.batch_size, as_array=True):
+                        writer.append(poses)
+                result['output'] = writer.index_path
+                result['frames'] = len(writer)
+            else:
                 # 处理视频
-                poses_sequence = self.pose_detector.process_video(video_path)
+                poses_sequence = self.pose_detector.process_video(video_path, batch_size=self.batch_size)
                 
                 # 保存处理结果
-                output_file = os.path.join(output_path, f"{video_file[:-4]}_{label}.json")
+                output_file = output_base + ".json"
                 self._save_poses_sequence(poses_sequence, output_file, label)
-                
-            except Exception as e:
-                print(f"处理视频 {video_file} 失败: {e}")
+                result['output'] = output_file
+                result['frames'] = len(poses_sequence)
+            
+        except Exception as e:
+            print(f"处理视频 {video_file} 失败: {e}")
+            result['error'] = str(e)
+        
+        return result
     
     def _save_poses_sequence(self, poses_sequence: List[List[Dict[str, Any]]], 
                            output_file: str, label: int):
@@ -79,8 +174,10 @@ class DataPreprocessor:
             'processed_time': datetime.now().isoformat()
         }
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        # 先写临时文件再替换，中断时不会留下不完整的结果
+        with open(output_file + '.tmp', 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(output_file + '.tmp', output_file)
     
     def save_processed_data(self, output_path: str):
         """保存处理后的数据"""
@@ -92,7 +189,7 @@ class DataPreprocessor:
         
         # 收集所有数据文件
         for file in os.listdir(output_path):
-            if file.endswith('.json'):
+            if is_pose_sequence_file(file):
                 metadata['data_files'].append(file)
         
         # 保存元数据
@@ -102,148 +199,203 @@ class DataPreprocessor:
         
         print(f"数据处理完成，共处理 {metadata['total_samples']} 个样本")
 
+class _PreprocessProgress:
+    """汇总数据集预处理进度"""
+    
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.frames = 0
+        self.start_time = time.time()
+    
+    def update(self, result: Dict[str, Any]):
+        self.done += 1
+        self.frames += result['frames']
+        if result['error'] is not None:
+            self.failed += 1
+        
+        elapsed = time.time() - self.start_time
+        eta = elapsed / self.done * (self.total - self.done)
+        fps = self.frames / elapsed if elapsed > 0 else 0.0
+        print(f"进度: {self.done}/{self.total} 个视频 (失败 {self.failed}), "
+              f"{self.frames} 帧, {fps:.1f} 帧/秒, 已用时 {elapsed:.0f}s, 预计剩余 {eta:.0f}s")
+
+
+# 进程池工作进程中的预处理器（每个进程一份模型）
+_worker_preprocessor = None
+
+
+def _init_preprocess_worker(model_path: str, conf_threshold: float, device: str,
+                            batch_size: int, storage_format: str):
+    """工作进程初始化：加载模型"""
+    global _worker_preprocessor
+    detector = PoseDetector(model_path, conf_threshold=conf_threshold, device=device)
+    _worker_preprocessor = DataPreprocessor(detector, batch_size=batch_size, storage_format=storage_format)
+
+
+def _preprocess_worker_job(job: Tuple[str, str, int]) -> Dict[str, Any]:
+    """工作进程中处理单个视频"""
+    return _worker_preprocessor._process_single_video(*job)
+
+
 class FeatureExtractor:
-    """特征提取器"""
+    """特征提取器，特征定义与检测器共用（见pose_features）"""
+    
+    # 特征定义的版本号，修改特征计算方式时需递增，使旧的特征缓存失效
+    VERSION = FEATURE_VERSION
+    
+    # 基础特征使用的关键点
+    BASE_KEYPOINTS = BASE_KEYPOINTS
     
     def __init__(self):
-        self.feature_names = []
-        
+        self.feature_names = list(FEATURE_NAMES)
+    
     def extract_features_from_poses(self, poses: List[Dict[str, Any]]) -> np.ndarray:
-        """从姿势数据中提取特征"""
-        if not poses:
-            return np.array([])
-        
-        features = []
-        for pose in poses:
-            pose_features = self._extract_single_pose_features(pose)
-            features.append(pose_features)
-        
-        return np.array(features)
-    
-    def _extract_single_pose_features(self, pose: Dict[str, Any]) -> List[float]:
-        """提取单个姿势的特征"""
-        keypoints = pose['keypoints']
-        features = []
-        
-        # 基础关键点特征
-        for name in ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip', 
-                    'left_knee', 'right_knee', 'left_ankle', 'right_ankle']:
-            if name in keypoints:
-                kp = keypoints[name]
-                features.extend([kp['x'], kp['y'], kp['confidence']])
-            else:
-                features.extend([0, 0, 0])
-        
-        # 几何特征
-        geometric_features = self._calculate_geometric_features(keypoints)
-        features.extend(list(geometric_features.values()))
-        
-        return features
+        """从姿势数据中提取特征（支持字典列表、PoseBatch 或 (N, 17, 3) 数组），返回 (N, FEATURE_DIM)"""
+        return extract_pose_features(poses)
+
+class FeatureCache:
+    """
+    特征缓存
+    以姿势文件内容的哈希和特征提取器版本为键，保存每个文件提取出的特征矩阵
+    """
     
-    def _calculate_geometric_features(self, keypoints: Dict[str, Any]) -> Dict[str, float]:
-        """计算几何特征"""
-        features = {}
-        
-        # 躯干长度
-        if 'left_shoulder' in keypoints and 'left_hip' in keypoints:
-            trunk_length = np.sqrt(
-                (keypoints['left_shoulder']['x'] - keypoints['left_hip']['x'])**2 +
-                (keypoints['left_shoulder']['y'] - keypoints['left_hip']['y'])**2
-            )
-            features['trunk_length'] = trunk_length
-        else:
-            features['trunk_length'] = 0
-        
-        # 腿部长度
-        if 'left_hip' in keypoints and 'left_knee' in keypoints:
-            leg_length = np.sqrt(
-                (keypoints['left_hip']['x'] - keypoints['left_knee']['x'])**2 +
-                (keypoints['left_hip']['y'] - keypoints['left_knee']['y'])**2
-            )
-            features['leg_length'] = leg_length
-        else:
-            features['leg_length'] = 0
-        
-        # 躯干角度
-        if all(k in keypoints for k in ['left_shoulder', 'right_shoulder', 'left_hip', 'right_hip']):
-            angle = self._calculate_trunk_angle(keypoints)
-            features['trunk_angle'] = angle
-        else:
-            features['trunk_angle'] = 0
-        
-        # 高度比例
-        if all(k in keypoints for k in ['left_shoulder', 'left_hip', 'left_knee']):
-            shoulder_y = keypoints['left_shoulder']['y']
-            hip_y = keypoints['left_hip']['y']
-            knee_y = keypoints['left_knee']['y']
-            
-            trunk_height = abs(shoulder_y - hip_y)
-            leg_height = abs(hip_y - knee_y)
-            total_height = trunk_height + leg_height
-            
-            features['height_ratio'] = trunk_height / total_height if total_height > 0 else 0
-        else:
-            features['height_ratio'] = 0
-        
-        return features
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
     
-    def _calculate_trunk_angle(self, keypoints: Dict[str, Any]) -> float:
-        """计算躯干角度"""
-        shoulder_center_x = (keypoints['left_shoulder']['x'] + keypoints['right_shoulder']['x']) / 2
-        shoulder_center_y = (keypoints['left_shoulder']['y'] + keypoints['right_shoulder']['y']) / 2
-        hip_center_x = (keypoints['left_hip']['x'] + keypoints['right_hip']['x']) / 2
-        hip_center_y = (keypoints['left_hip']['y'] + keypoints['right_hip']['y']) / 2
-        
-        dx = hip_center_x - shoulder_center_x
-        dy = hip_center_y - shoulder_center_y
-        
-        if dx == 0:
-            return 0
-        
-        angle = np.arctan2(dx, dy) * 180 / np.pi
-        return abs(angle)
+    @staticmethod
+    def file_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+        """计算姿势文件内容的哈希，新版格式同时包含数据文件和索引文件"""
+        paths = [file_path]
+        if file_path.endswith(POSE_INDEX_SUFFIX):
+            paths.append(file_path[:-len(POSE_INDEX_SUFFIX)] + POSE_DATA_SUFFIX)
+        
+        digest = hashlib.sha1()
+        for path in paths:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _cache_path(self, content_hash: str, version: int) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}_v{version}.npz")
+    
+    def load(self, content_hash: str, version: int):
+        """读取缓存，未命中时返回None"""
+        cache_path = self._cache_path(content_hash, version)
+        if not os.path.exists(cache_path):
+            self.misses += 1
+            return None
+        try:
+            with np.load(cache_path) as cached:
+                self.hits += 1
+                return cached['features'], cached['labels']
+        except Exception as e:
+            print(f"读取特征缓存 {cache_path} 失败: {e}")
+            self.misses += 1
+            return None
+    
+    def save(self, content_hash: str, version: int, features: np.ndarray, labels: np.ndarray):
+        """写入缓存（先写临时文件再替换，避免并发训练读到不完整的缓存）"""
+        cache_path = self._cache_path(content_hash, version)
+        tmp_path = cache_path[:-len('.npz')] + '.tmp.npz'
+        np.savez(tmp_path, features=features, labels=labels)
+        os.replace(tmp_path, cache_path)
+    
+    def clear(self):
+        for file in os.listdir(self.cache_dir):
+            if file.endswith('.npz'):
+                os.remove(os.path.join(self.cache_dir, file))
+
 
 class ModelTrainer:
     """模型训练器"""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: 特征缓存目录，默认为None，不使用缓存也不创建目录；
+                命令行训练放在模型输出目录下的 feature_cache 中
+        """
         self.feature_extractor = FeatureExtractor()
+        self.feature_cache = FeatureCache(cache_dir) if cache_dir else None
         self.training_history = []
         
     def prepare_training_data(self, data_path: str) -> Tuple[np.ndarray, np.ndarray]:
-        """准备训练数据"""
+        """准备训练数据，已缓存的文件直接读取特征矩阵"""
         features_list = []
         labels_list = []
         
-        # 加载所有数据文件
-        for file in os.listdir(data_path):
-            if file.endswith('.json') and file != 'metadata.json':
-                file_path = os.path.join(data_path, file)
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    poses_sequence = data['poses_sequence']
-                    label = data['label']
-                    
-                    # 提取特征
-                    for poses in poses_sequence:
-                        if poses:  # 确保有检测到姿势
-                            features = self.feature_extractor.extract_features_from_poses(poses)
-                            if len(features) > 0:
-                                # 取第一个人的特征
-                                features_list.append(features[0])
-                                labels_list.append(label)
-                
-                except Exception as e:
-                    print(f"加载数据文件 {file} 失败: {e}")
+        # 加载所有数据文件（二进制格式按需内存映射，旧版JSON整体读取）
+        for file_path in list_pose_sequence_files(data_path):
+            try:
+                features, labels = self._load_file_features(file_path)
+                if len(features) > 0:
+                    features_list.append(features)
+                    labels_list.append(labels)
+            
+            except Exception as e:
+                print(f"加载数据文件 {os.path.basename(file_path)} 失败: {e}")
+        
+        if self.feature_cache is not None:
+            print(f"特征缓存: 命中 {self.feature_cache.hits}, 未命中 {self.feature_cache.misses}")
         
-        return np.array(features_list), np.array(labels_list)
+        if not features_list:
+            return np.array([]), np.array([])
+        return np.concatenate(features_list), np.concatenate(labels_list)
+    
+    def _load_file_features(self, file_path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """提取单个姿势文件的特征，优先读取缓存"""
+        version = self.feature_extractor.VERSION
+        content_hash = None
+        if self.feature_cache is not None:
+            content_hash = self.feature_cache.file_hash(file_path)
+            cached = self.feature_cache.load(content_hash, version)
+            if cached is not None:
+                return cached
+        
+        sequence = load_pose_sequence(file_path)
+        
+        # 取每帧第一个人的姿势，一次性提取所有有效帧的特征
+        has_person = sequence.person_counts > 0
+        if has_person.any():
+            keypoints = sequence.first_person_keypoints()[has_person]
+            features = self.feature_extractor.extract_features_from_poses(keypoints)
+        else:
+            features = np.zeros((0, 0), dtype=np.float32)
+        labels = np.full(len(features), sequence.label, dtype=np.int64)
+        
+        if self.feature_cache is not None:
+            self.feature_cache.save(content_hash, version, features, labels)
+        return features, labels
     
     def train_traditional_ml_models(self, X: np.ndarray, y: np.ndarray, 
-                                  output_dir: str = "trained_models"):
-        """训练传统机器学习模型"""
+                                  output_dir: str = "trained_models",
+                                  algorithms: List[str] = None,
+                                  param_grid: Dict[str, Dict[str, List[Any]]] = None,
+                                  num_workers: int = 1, time_budget: Optional[float] = None):
+        """
+        训练传统机器学习模型（支持超参数网格和多进程并行）
+        
+        Args:
+            X: 特征矩阵
+            y: 标签
+            output_dir: 模型和评估报告的输出目录
+            algorithms: 参与训练的算法，默认为 knn / svm / rf
+            param_grid: 各算法的超参数网格，如 {'knn': {'n_neighbors': [3, 5, 7]}}
+            num_workers: 并行训练的进程数，1 表示在当前进程中依次训练
+            time_budget: 总时间预算（秒）。多进程时为硬限制，到期后终止仍在训练的工作进程；
+                单进程时为软限制，只在开始下一个候选模型前检查，已开始的训练会进行到结束
+        
+        报告中的 fit_time_s 为训练耗时；fit_peak_rss_mb 为同一次训练期间进程常驻内存(RSS)相对
+        训练开始时的峰值增量，包含原生库分配。多进程时每个候选模型在新的工作进程中训练，各自从
+        干净的进程开始统计；单进程时在当前进程中统计，前面候选模型释放后留在进程中的内存会使后面的增量偏小
+        """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
@@ -252,40 +404,133 @@ class ModelTrainer:
             X, y, test_size=0.2, random_state=42, stratify=y
         )
         
-        # 训练不同算法
-        algorithms = ['knn', 'svm', 'rf']
-        results = {}
+        # 展开候选模型：每个算法 x 每组超参数
+        candidates = self._build_sweep_candidates(algorithms or ['knn', 'svm', 'rf'], param_grid or {})
+        print(f"共 {len(candidates)} 个候选模型, 使用 {num_workers} 个进程")
         
-        for algo in algorithms:
-            print(f"训练 {algo.upper()} 模型...")
-            
-            model = TraditionalMLFallDetector(algo)
-            model.train(X_train, y_train)
+        start_time = time.time()
+        if num_workers > 1 and len(candidates) > 1:
+            outcomes = self._run_sweep_parallel(candidates, X_train, y_train, X_test, num_workers, time_budget)
+        else:
+            outcomes = self._run_sweep_serial(candidates, X_train, y_train, X_test, time_budget)
+        
+        results = {}
+        for name, algo, params in candidates:
+            outcome = outcomes.get(name)
+            if outcome is None:
+                print(f"{name} 超出时间预算，已跳过")
+                continue
+            if outcome.get('error'):
+                print(f"{name} 训练失败: {outcome['error']}")
+                continue
             
-            # 评估模型
-            predictions, probabilities = model.predict(X_test)
-            accuracy = np.mean(predictions == y_test)
+            model = outcome.pop('model')
+            predictions = outcome['predictions']
+            accuracy = float(np.mean(predictions == y_test))
             
             # 保存模型
-            model_path = os.path.join(output_dir, f"{algo}_model.pkl")
+            model_path = os.path.join(output_dir, f"{name}_model.pkl")
             model.save_model(model_path)
             
-            results[algo] = {
+            results[name] = {
+                'algorithm': algo,
+                'params': params,
                 'accuracy': accuracy,
-                'predictions': predictions,
-                'probabilities': probabilities,
-                'model_path': model_path
+                'model_path': model_path,
+                **outcome
             }
             
-            print(f"{algo.upper()} 模型准确率: {accuracy:.4f}")
+            print(f"{name} 模型准确率: {accuracy:.4f}, 训练 {outcome['fit_time']:.2f}s, "
+                  f"推理 {outcome['predict_ms_per_sample']:.4f}ms/样本")
+        
+        print(f"模型搜索完成, 总耗时 {time.time() - start_time:.1f}s")
         
         # 生成评估报告
-        self._generate_evaluation_report(results, y_test, output_dir)
+        if results:
+            self._generate_evaluation_report(results, y_test, output_dir)
         
         return results
     
-    def train_deep_learning_model(self, data_path: str, output_dir: str = "trained_models"):
-        """训练深度学习模型"""
+    @staticmethod
+    def _build_sweep_candidates(algorithms: List[str],
+                                param_grid: Dict[str, Dict[str, List[Any]]]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """生成 (候选名称, 算法, 超参数) 列表，无网格的算法使用默认参数且名称与算法相同"""
+        candidates = []
+        for algo in algorithms:
+            grid = param_grid.get(algo)
+            if not grid:
+                candidates.append((algo, algo, {}))
+                continue
+            for params in ParameterGrid(grid):
+                suffix = '_'.join(f"{key}{value}" for key, value in sorted(params.items()))
+                candidates.append((f"{algo}_{suffix}", algo, params))
+        return candidates
+    
+    def _run_sweep_serial(self, candidates, X_train, y_train, X_test,
+                          time_budget: Optional[float]) -> Dict[str, Dict[str, Any]]:
+        """在当前进程中依次训练，超出预算后不再开始新的候选（已开始的训练无法中断）"""
+        start_time = time.time()
+        outcomes = {}
+        for name, algo, params in candidates:
+            if time_budget is not None and time.time() - start_time > time_budget:
+                break
+            print(f"训练 {name} 模型...")
+            outcomes[name] = _fit_sweep_candidate(algo, params, X_train, y_train, X_test)
+        return outcomes
+    
+    def _run_sweep_parallel(self, candidates, X_train, y_train, X_test, num_workers: int,
+                            time_budget: Optional[float]) -> Dict[str, Dict[str, Any]]:
+        """
+        多进程并行训练
+        
+        每个工作进程只训练一个候选模型（maxtasksperchild=1），RSS从干净的进程开始统计；
+        超出时间预算时终止所有工作进程，正在训练的候选模型不会在返回后继续占用CPU
+        """
+        # 预算包含启动工作进程的时间（spawn方式启动时要导入本模块，这段时间无法中断）
+        deadline = None if time_budget is None else time.time() + time_budget
+        outcomes = {}
+        finished = queue.Queue()
+        ctx = multiprocessing.get_context('spawn')
+        pool = ctx.Pool(
+            processes=min(num_workers, len(candidates)),
+            initializer=_init_sweep_worker,
+            initargs=(X_train, y_train, X_test),
+            maxtasksperchild=1
+        )
+        try:
+            for name, algo, params in candidates:
+                pool.apply_async(_sweep_worker_job, (algo, params),
+                                 callback=lambda result, name=name: finished.put((name, result)),
+                                 error_callback=lambda e, name=name: finished.put((name, {'error': str(e)})))
+            
+            while len(outcomes) < len(candidates):
+                remaining = None if deadline is None else max(0.0, deadline - time.time())
+                try:
+                    name, outcome = finished.get(timeout=remaining)
+                except queue.Empty:
+                    print(f"超出时间预算 {time_budget}s, 终止剩余 {len(candidates) - len(outcomes)} 个候选模型")
+                    break
+                outcomes[name] = outcome
+                print(f"{name} 训练完成 ({len(outcomes)}/{len(candidates)})")
+        finally:
+            if len(outcomes) == len(candidates):
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+        return outcomes
+    
+    def train_deep_learning_model(self, data_path: str, output_dir: str = "trained_models",
+                                  num_workers: int = 0, patience: Optional[int] = 10):
+        """
+        训练深度学习模型
+        
+        Args:
+            data_path: 处理后的姿势数据目录
+            output_dir: 模型输出目录
+            num_workers: DataLoader的加载进程数
+            patience: 早停的耐心值（验证次数），为None时训练满全部轮数
+        """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
@@ -293,24 +538,18 @@ class ModelTrainer:
         pose_sequences = []
         labels = []
         
-        for file in os.listdir(data_path):
-            if file.endswith('.json') and file != 'metadata.json':
-                file_path = os.path.join(data_path, file)
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    poses_sequence = data['poses_sequence']
-                    label = data['label']
-                    
-                    # 只保留有足够帧数的序列
-                    if len(poses_sequence) >= 10:
-                        pose_sequences.append(poses_sequence)
-                        labels.append(label)
+        for file_path in list_pose_sequence_files(data_path):
+            try:
+                # 二进制格式只在取用帧时才读取数据
+                poses_sequence = load_pose_sequence(file_path)
                 
-                except Exception as e:
-                    print(f"加载数据文件 {file} 失败: {e}")
+                # 只保留有足够帧数的序列
+                if len(poses_sequence) >= 10:
+                    pose_sequences.append(poses_sequence)
+                    labels.append(poses_sequence.label)
+            
+            except Exception as e:
+                print(f"加载数据文件 {os.path.basename(file_path)} 失败: {e}")
         
         if len(pose_sequences) == 0:
             print("没有足够的数据进行深度学习训练")
@@ -320,10 +559,10 @@ class ModelTrainer:
         dl_model = DeepLearningFallDetector('lstm')
         
         try:
-            dl_model.train(pose_sequences, labels, epochs=50, batch_size=32)
-            
-            # 保存模型
+            # 训练过程中验证损失创新低时即写入检查点，结束时保存最佳轮次的权重
             model_path = os.path.join(output_dir, "lstm_model.pth")
+            dl_model.train(pose_sequences, labels, epochs=50, batch_size=32, num_workers=num_workers,
+                           patience=patience, checkpoint_path=model_path)
             dl_model.save_model(model_path)
             
             print("深度学习模型训练完成")
@@ -348,14 +587,12 @@ class ModelTrainer:
         axes[0, 0].set_ylabel('准确率')
         axes[0, 0].set_ylim(0, 1)
         
-        # 混淆矩阵
-        for i, algo in enumerate(algorithms):
+        # 混淆矩阵（候选模型较多时只画准确率最高的3个）
+        ranked = sorted(algorithms, key=lambda name: results[name]['accuracy'], reverse=True)
+        for i, algo in enumerate(ranked[:3], start=1):
             row = i // 2
             col = i % 2
             
-            if row == 0 and col == 0:
-                continue  # 跳过第一个位置（准确率图）
-            
             cm = confusion_matrix(y_test, results[algo]['predictions'])
             sns.heatmap(cm, annot=True, fmt='d', ax=axes[row, col])
             axes[row, col].set_title(f'{algo.upper()} 混淆矩阵')
@@ -369,15 +606,35 @@ class ModelTrainer:
         plt.savefig(plot_path, dpi=300, bbox_inches='tight')
         plt.close()
         
+        # 准确率与开销汇总表，便于按精度和推理成本选择模型
+        summary = pd.DataFrame([{
+            'model': algo,
+            'algorithm': results[algo].get('algorithm', algo),
+            'params': json.dumps(results[algo].get('params', {})),
+            'accuracy': results[algo]['accuracy'],
+            'fit_time_s': results[algo].get('fit_time'),
+            'predict_ms_per_sample': results[algo].get('predict_ms_per_sample'),
+            'fit_peak_rss_mb': results[algo].get('fit_peak_rss_mb'),
+            'model_size_mb': results[algo].get('model_size_mb')
+        } for algo in ranked])
+        summary.to_csv(os.path.join(output_dir, 'model_sweep.csv'), index=False)
+        
         # 生成文本报告
         report_path = os.path.join(output_dir, 'evaluation_report.txt')
         with open(report_path, 'w', encoding='utf-8') as f:
             f.write("模型评估报告\n")
             f.write("=" * 50 + "\n\n")
             
-            for algo in algorithms:
+            for algo in ranked:
                 f.write(f"{algo.upper()} 模型:\n")
                 f.write(f"准确率: {results[algo]['accuracy']:.4f}\n")
+                if 'fit_time' in results[algo]:
+                    f.write(f"超参数: {results[algo]['params']}\n")
+                    f.write(f"训练耗时: {results[algo]['fit_time']:.3f}s, "
+                            f"训练峰值内存增量(RSS): {results[algo]['fit_peak_rss_mb']:.2f}MB\n")
+                    f.write(f"推理耗时: {results[algo]['predict_time']:.3f}s "
+                            f"({results[algo]['predict_ms_per_sample']:.4f}ms/样本), "
+                            f"模型大小: {results[algo]['model_size_mb']:.2f}MB\n")
                 
                 # 详细分类报告
                 report = classification_report(y_test, results[algo]['predictions'])
@@ -386,53 +643,208 @@ class ModelTrainer:
         
         print(f"评估报告已保存到: {output_dir}")
 
+
+def _peak_rss_increase(func, interval: float = 0.005) -> int:
+    """
+    执行func期间进程常驻内存(RSS)相对开始时的最大增量（字节）
+    
+    后台线程按 interval 采样RSS，包含libsvm等原生库的分配；极短的分配峰值可能采不到
+    """
+    process = psutil.Process(os.getpid())
+    baseline = process.memory_info().rss
+    peak = baseline
+    done = threading.Event()
+    
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, process.memory_info().rss)
+            done.wait(interval)
+    
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        func()
+    finally:
+        done.set()
+        sampler.join()
+    peak = max(peak, process.memory_info().rss)
+    return peak - baseline
+
+
+def _fit_sweep_candidate(algo: str, params: Dict[str, Any], X_train: np.ndarray,
+                         y_train: np.ndarray, X_test: np.ndarray) -> Dict[str, Any]:
+    """
+    训练并评估单个候选模型，记录训练/推理耗时和内存占用
+    
+    训练只进行一次，在RSS采样期间计时（采样线程每5ms读取一次RSS，开销可忽略）
+    """
+    model = TraditionalMLFallDetector(algo)
+    fit_time = 0.0
+    
+    def fit():
+        nonlocal fit_time
+        fit_start = time.perf_counter()
+        model.train(X_train, y_train, params)
+        fit_time = time.perf_counter() - fit_start
+    
+    fit_peak = _peak_rss_increase(fit)
+    
+    predict_start = time.perf_counter()
+    predictions, probabilities = model.predict_features(X_test)
+    predict_time = time.perf_counter() - predict_start
+    
+    return {
+        'model': model,
+        'predictions': predictions,
+        'probabilities': probabilities,
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+        'predict_ms_per_sample': predict_time / max(len(X_test), 1) * 1000,
+        'fit_peak_rss_mb': fit_peak / 1024 / 1024,
+        'model_size_mb': len(pickle.dumps(model.model)) / 1024 / 1024
+    }
+
+
+# 模型搜索工作进程的训练数据
+_sweep_data = None
+
+
+def _init_sweep_worker(X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray):
+    global _sweep_data
+    _sweep_data = (X_train, y_train, X_test)
+
+
+def _sweep_worker_job(algo: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """工作进程中训练单个候选模型"""
+    return _fit_sweep_candidate(algo, params, *_sweep_data)
+
+
+def lttb_indices(points: np.ndarray, num_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets降采样
+    
+    按顺序把点分成 num_out-2 个桶，每个桶保留与前一个保留点、下一个桶均值构成三角形面积最大的点，
+    折线的形状（尖峰、拐点）基本保留
+    
+    Args:
+        points: 按时间顺序排列的点 (N, 2)；时间序列可传入 (帧号, 值)
+        num_out: 保留的点数
+        
+    Returns:
+        保留点的索引（升序，包含首尾点）
+    """
+    num_points = len(points)
+    if num_out >= num_points or num_out < 3:
+        return np.arange(num_points)
+    
+    points = np.asarray(points, dtype=np.float64)
+    edges = np.linspace(1, num_points - 1, num_out - 1).astype(np.int64)
+    selected = np.empty(num_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, num_points - 1
+    
+    prev = points[0]
+    for i in range(num_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_point = points[end:edges[i + 2]].mean(axis=0) if i + 2 < len(edges) else points[-1]
+        bucket = points[start:end]
+        area = np.abs((prev[0] - next_point[0]) * (bucket[:, 1] - prev[1]) -
+                      (prev[0] - bucket[:, 0]) * (next_point[1] - prev[1]))
+        selected[i + 1] = start + int(np.argmax(area))
+        prev = points[selected[i + 1]]
+    
+    return selected
+
+
 class DataVisualizer:
-    """数据可视化器"""
+    """
+    数据可视化器
     
-    def __init__(self):
-        pass
+    按块读取每帧第一个人的关键点，只保留绘图用到的列（NumPy数组），
+    绘图前用LTTB降采样，长时间录像也能在有限内存内快速出图
+    """
+    
+    TRAJECTORY_KEYPOINTS = ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip']
+    # 特征变化图绘制的特征（鼻子、左右肩的 x, y, confidence）
+    PLOT_FEATURES = FEATURE_NAMES[:9]
+    
+    def __init__(self, max_points: Optional[int] = 2000, chunk_size: int = 4096):
+        """
+        Args:
+            max_points: 每条曲线绘制的最大点数，超过时用LTTB降采样，为None时绘制全部点
+            chunk_size: 每次读取的帧数
+        """
+        self.max_points = max_points
+        self.chunk_size = chunk_size
     
     def visualize_pose_data(self, poses_sequence: List[List[Dict[str, Any]]], 
                            output_path: str = "visualization"):
-        """可视化姿势数据"""
+        """可视化姿势数据（支持 load_pose_sequence 打开的序列或每帧姿势的列表）"""
         if not os.path.exists(output_path):
             os.makedirs(output_path)
         
-        # 提取关键点轨迹
-        keypoint_trajectories = self._extract_keypoint_trajectories(poses_sequence)
+        # 提取关键点轨迹和特征（一次遍历）
+        keypoint_trajectories, features = self._extract_series(poses_sequence)
         
         # 绘制轨迹图
         self._plot_trajectories(keypoint_trajectories, output_path)
         
         # 绘制特征变化图
-        self._plot_feature_changes(poses_sequence, output_path)
+        self._plot_feature_changes(features, output_path)
     
-    def _extract_keypoint_trajectories(self, poses_sequence: List[List[Dict[str, Any]]]) -> Dict[str, List[Tuple[float, float]]]:
-        """提取关键点轨迹"""
-        trajectories = {}
-        keypoint_names = ['nose', 'left_shoulder', 'right_shoulder', 'left_hip', 'right_hip']
-        
-        for name in keypoint_names:
-            trajectories[name] = []
-        
+    def _iter_first_person_keypoints(self, poses_sequence) -> Iterator[np.ndarray]:
+        """按块产出每帧第一个人的关键点 (chunk, 17, 3)，无人的帧为0"""
+        if hasattr(poses_sequence, 'first_person_keypoints'):
+            # 姿势序列文件：按帧范围读取，二进制格式只映射需要的行
+            for start in range(0, len(poses_sequence), self.chunk_size):
+                yield poses_sequence.first_person_keypoints(start, start + self.chunk_size)
+            return
+        
+        chunk = []
         for poses in poses_sequence:
-            if poses:
-                pose = poses[0]  # 取第一个人的姿势
-                keypoints = pose['keypoints']
-                
-                for name in keypoint_names:
-                    if name in keypoints:
-                        kp = keypoints[name]
-                        trajectories[name].append((kp['x'], kp['y']))
-                    else:
-                        trajectories[name].append((0, 0))
-            else:
-                for name in keypoint_names:
-                    trajectories[name].append((0, 0))
+            keypoints = as_feature_keypoints(poses) if poses is not None else ()
+            chunk.append(keypoints[0] if len(keypoints) else np.zeros((len(KEYPOINT_INDEX), 3), dtype=np.float32))
+            if len(chunk) == self.chunk_size:
+                yield np.stack(chunk)
+                chunk = []
+        if chunk:
+            yield np.stack(chunk)
+    
+    def _extract_series(self, poses_sequence) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        一次遍历提取关键点轨迹和绘图用的特征列
         
-        return trajectories
+        Returns:
+            ({关键点名: 轨迹 (F, 2)}, 特征 (F, len(PLOT_FEATURES)))
+        """
+        trajectory_idx = [KEYPOINT_INDEX[name] for name in self.TRAJECTORY_KEYPOINTS]
+        feature_idx = [FEATURE_NAMES.index(name) for name in self.PLOT_FEATURES]
+        trajectory_chunks = []
+        feature_chunks = []
+        
+        for keypoints in self._iter_first_person_keypoints(poses_sequence):
+            trajectory_chunks.append(keypoints[:, trajectory_idx, :2].copy())
+            feature_chunks.append(extract_pose_features(keypoints)[:, feature_idx])
+        
+        if not trajectory_chunks:
+            trajectories = np.zeros((0, len(trajectory_idx), 2), dtype=np.float32)
+            features = np.zeros((0, len(feature_idx)), dtype=np.float32)
+        else:
+            trajectories = np.concatenate(trajectory_chunks)
+            features = np.concatenate(feature_chunks)
+        
+        return {name: trajectories[:, i] for i, name in enumerate(self.TRAJECTORY_KEYPOINTS)}, features
+    
+    def _extract_keypoint_trajectories(self, poses_sequence: List[List[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+        """提取关键点轨迹 {关键点名: (F, 2)}，无人的帧为 (0, 0)"""
+        return self._extract_series(poses_sequence)[0]
     
-    def _plot_trajectories(self, trajectories: Dict[str, List[Tuple[float, float]]], 
+    def _downsample(self, points: np.ndarray) -> np.ndarray:
+        if self.max_points is None or len(points) <= self.max_points:
+            return points
+        return points[lttb_indices(points, self.max_points)]
+    
+    def _plot_trajectories(self, trajectories: Dict[str, np.ndarray], 
                           output_path: str):
         """绘制关键点轨迹"""
         plt.figure(figsize=(12, 8))
@@ -441,9 +853,10 @@ class DataVisualizer:
         keypoint_names = list(trajectories.keys())
         
         for i, name in enumerate(keypoint_names):
-            trajectory = trajectories[name]
-            x_coords = [point[0] for point in trajectory]
-            y_coords = [point[1] for point in trajectory]
+            trajectory = self._downsample(trajectories[name])
+            if len(trajectory) == 0:
+                continue
+            x_coords, y_coords = trajectory[:, 0], trajectory[:, 1]
             
             plt.plot(x_coords, y_coords, color=colors[i], label=name, alpha=0.7)
             plt.scatter(x_coords[0], y_coords[0], color=colors[i], s=50, marker='o')
@@ -460,35 +873,24 @@ class DataVisualizer:
         plt.savefig(trajectory_path, dpi=300, bbox_inches='tight')
         plt.close()
     
-    def _plot_feature_changes(self, poses_sequence: List[List[Dict[str, Any]]], 
-                             output_path: str):
-        """绘制特征变化图"""
-        feature_extractor = FeatureExtractor()
-        features_list = []
-        
-        for poses in poses_sequence:
-            if poses:
-                features = feature_extractor.extract_features_from_poses(poses)
-                if len(features) > 0:
-                    features_list.append(features[0])
-                else:
-                    features_list.append(np.zeros(51))  # 假设特征维度为51
-            else:
-                features_list.append(np.zeros(51))
-        
-        features_array = np.array(features_list)
+    def _plot_feature_changes(self, features: np.ndarray, output_path: str):
+        """
+        绘制特征变化图
         
-        # 绘制关键特征的变化
-        key_features = [0, 1, 2, 3, 4, 5, 6, 7, 8]  # 选择一些关键特征
-        feature_names = ['nose_x', 'nose_y', 'nose_conf', 'left_shoulder_x', 
-                        'left_shoulder_y', 'left_shoulder_conf', 'right_shoulder_x',
-                        'right_shoulder_y', 'right_shoulder_conf']
+        Args:
+            features: _extract_series 返回的特征列 (F, len(PLOT_FEATURES))；
+                      也可直接传入姿势序列，此时先提取特征
+        """
+        if not isinstance(features, np.ndarray):
+            features = self._extract_series(features)[1]
+        frame_numbers = np.arange(len(features), dtype=np.float64)
         
         fig, axes = plt.subplots(3, 3, figsize=(15, 10))
         axes = axes.flatten()
         
-        for i, (feature_idx, feature_name) in enumerate(zip(key_features, feature_names)):
-            axes[i].plot(features_array[:, feature_idx])
+        for i, feature_name in enumerate(self.PLOT_FEATURES):
+            series = self._downsample(np.column_stack([frame_numbers, features[:, i]]))
+            axes[i].plot(series[:, 0], series[:, 1])
             axes[i].set_title(feature_name)
             axes[i].set_xlabel('帧数')
             axes[i].set_ylabel('值')
@@ -515,7 +917,7 @@ def main():
     
     # 示例用法
     # 1. 处理数据集
-    # preprocessor.process_video_dataset("path/to/dataset", "processed_data")
+    # preprocessor.process_video_dataset("path/to/dataset", "processed_data", num_workers=4)
     
     # 2. 训练模型
     # X, y = trainer.prepare_training_data("processed_data")
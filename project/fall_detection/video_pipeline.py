@@ -0,0 +1,237 @@
+"""
+视频处理流水线工具
+为解码 / 推理 / 渲染三个阶段提供丢弃旧帧的有界队列和分阶段耗时统计，
+以及根据画面运动情况调整检测频率的运动门控
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class LatestFrameQueue:
+    """有界队列：满时丢弃最旧的元素，消费者总是拿到最新的帧"""
+
+    def __init__(self, maxsize: int = 2):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0  # 因队列已满被丢弃的帧数
+
+    def put(self, item: Any):
+        """放入元素，队列已满时挤掉最旧的元素"""
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """取出最早的元素，超时返回None"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def get_latest(self) -> Optional[Any]:
+        """非阻塞地取出最新元素并丢弃其余的旧元素"""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StageStats:
+    """各阶段耗时统计（滑动窗口），线程安全"""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        """记录某阶段一次处理的耗时（秒）"""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def mean_ms(self, stage: str) -> float:
+        """某阶段平均耗时（毫秒），无数据时返回0"""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if not samples:
+                return 0.0
+            return sum(samples) / len(samples) * 1000
+
+    def max_ms(self, stage: str) -> float:
+        """某阶段窗口内最大耗时（毫秒）"""
+        with self._lock:
+            samples = self._samples.get(stage)
+            return max(samples) * 1000 if samples else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        """所有阶段的平均耗时（毫秒）"""
+        with self._lock:
+            stages = list(self._samples)
+        return {stage: self.mean_ms(stage) for stage in stages}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class RateCounter:
+    """滑动时间窗口内的事件速率统计"""
+
+    def __init__(self, window_seconds: float = 2.0):
+        self.window_seconds = window_seconds
+        self._timestamps = deque()
+        self._lock = threading.Lock()
+
+    def tick(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._timestamps.append(now)
+            self._trim(now)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """每秒事件数"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._trim(now)
+            return len(self._timestamps) / self.window_seconds
+
+    def reset(self):
+        with self._lock:
+            self._timestamps.clear()
+
+    def _trim(self, now: float):
+        while self._timestamps and now - self._timestamps[0] > self.window_seconds:
+            self._timestamps.popleft()
+
+
+class MotionGate:
+    """
+    基于帧差的运动门控，决定某一帧是否需要运行姿势检测
+
+    - 画面静止时只按 idle_interval 低频检测（仍需定期检测，防止漏掉摔倒后静止不动的人）
+    - 检测到运动后的 hold_seconds 秒内按 active_interval 检测
+    - 疑似摔倒时调用 boost()，在 boost_seconds 秒内逐帧检测
+    """
+
+    def __init__(self, active_interval: float = 0.05, idle_interval: float = 1.0,
+                 hold_seconds: float = 2.0, boost_seconds: float = 3.0,
+                 diff_threshold: int = 15, motion_ratio: float = 0.005, sample_width: int = 160):
+        """
+        Args:
+            active_interval: 有运动时的检测间隔（秒）
+            idle_interval: 画面静止时的检测间隔（秒）
+            hold_seconds: 运动停止后保持高频检测的时长
+            boost_seconds: 疑似摔倒后逐帧检测的时长
+            diff_threshold: 灰度差超过该值的像素视为变化
+            motion_ratio: 变化像素占比超过该值视为有运动
+            sample_width: 计算帧差前缩小到的宽度
+        """
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.hold_seconds = hold_seconds
+        self.boost_seconds = boost_seconds
+        self.diff_threshold = diff_threshold
+        self.motion_ratio = motion_ratio
+        self.sample_width = sample_width
+
+        self.enabled = True
+        self.motion_score = 0.0
+        self.skipped = 0  # 因画面静止而跳过检测的帧数
+        self.detection_rate = RateCounter(window_seconds=2.0)
+        self._prev_sample: Optional[np.ndarray] = None
+        self._last_detection = 0.0
+        self._active_until = 0.0
+        self._boost_until = 0.0
+
+    def measure(self, frame: np.ndarray) -> float:
+        """计算与上一帧相比的变化像素占比"""
+        height, width = frame.shape[:2]
+        sample_height = max(1, int(height * self.sample_width / width))
+        # INTER_LINEAR大比例缩小时只采样少量像素，比INTER_AREA快约20倍，噪声由后面的模糊抑制
+        sample = cv2.resize(frame, (self.sample_width, sample_height), interpolation=cv2.INTER_LINEAR)
+        if sample.ndim == 3:
+            sample = cv2.cvtColor(sample, cv2.COLOR_BGR2GRAY)
+        sample = cv2.GaussianBlur(sample, (5, 5), 0)
+
+        prev = self._prev_sample
+        self._prev_sample = sample
+        if prev is None or prev.shape != sample.shape:
+            self.motion_score = 1.0
+        else:
+            changed = cv2.absdiff(sample, prev) > self.diff_threshold
+            self.motion_score = float(np.count_nonzero(changed)) / changed.size
+        return self.motion_score
+
+    def current_interval(self, now: float) -> float:
+        """当前应使用的检测间隔"""
+        if not self.enabled:
+            return self.active_interval
+        if now < self._boost_until:
+            return 0.0
+        if now < self._active_until:
+            return self.active_interval
+        return self.idle_interval
+
+    def should_detect(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        """判断该帧是否需要检测；返回True时视为已执行一次检测"""
+        now = time.time() if now is None else now
+        if self.enabled and self.measure(frame) > self.motion_ratio:
+            self._active_until = now + self.hold_seconds
+
+        if now - self._last_detection < self.current_interval(now):
+            self.skipped += 1
+            return False
+
+        self._last_detection = now
+        self.detection_rate.tick(now)
+        return True
+
+    def boost(self, now: Optional[float] = None):
+        """疑似摔倒时调用，短时间内逐帧检测"""
+        now = time.time() if now is None else now
+        self._boost_until = now + self.boost_seconds
+        self._active_until = max(self._active_until, self._boost_until + self.hold_seconds)
+
+    def mode(self, now: Optional[float] = None) -> str:
+        """当前状态：boost(疑似摔倒) / active(有运动) / idle(静止)"""
+        now = time.time() if now is None else now
+        if not self.enabled:
+            return 'active'
+        if now < self._boost_until:
+            return 'boost'
+        if now < self._active_until:
+            return 'active'
+        return 'idle'
+
+    def reset(self):
+        self.motion_score = 0.0
+        self.skipped = 0
+        self.detection_rate.reset()
+        self._prev_sample = None
+        self._last_detection = 0.0
+        self._active_until = 0.0
+        self._boost_until = 0.0
@@ -6,6 +6,8 @@ Enhanced Components - 增强组件模块
 """
 import sys
 import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import time
@@ -18,37 +20,64 @@ from PySide6.QtGui import *
 from ultralytics import YOLO
 
 from project.fall_detection_H.ui.Xmanager import StyleManager
+from project.fall_detection_H.ui.camera_capture import open_camera_capture, CameraGrabber, ReconnectSupervisor
 
 
 class BatchDetectionThread(QThread):
-    """批量检测线程"""
+    """
+    批量检测线程
+
+    解码线程池按顺序预读图片，凑满 batch_size 张后一次送入模型推理；
+    结果图绘制、保存和信号发送交给另一个线程池，推理线程只负责调用模型。
+    预读和待绘制的图片数量都有上限，内存占用与文件夹大小无关。
+    提供 result_store 时结果写入磁盘，只发送不含图片的 result_stored 信号。
+    """
     result_ready = Signal(str, object, object, float, object, list)  # 文件路径, 原图, 结果图, 耗时, 检测结果, 类别名称
+    result_stored = Signal(dict)  # BatchResultStore 写入的结果记录
     progress_updated = Signal(int)
     current_file_changed = Signal(str)
     status_changed = Signal(str)
     error_occurred = Signal(str)
     finished = Signal()
 
-    def __init__(self, model, folder_path, confidence_threshold=0.25, supported_formats=None):
+    def __init__(self, model, folder_path, confidence_threshold=0.25, supported_formats=None,
+                 batch_size=8, decode_workers=4, render_workers=2, save_dir=None, result_store=None):
+        """
+        Args:
+            batch_size: 每次送入模型的图片数
+            decode_workers: 图片解码线程数
+            render_workers: 结果图绘制/保存线程数
+            save_dir: 结果图保存目录，为None时不保存
+            result_store: BatchResultStore，提供时结果写入磁盘而不是通过 result_ready 发送图片
+        """
         super().__init__()
         self.model = model
         self.folder_path = folder_path
         self.confidence_threshold = confidence_threshold
         self.supported_formats = supported_formats or ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp', '.tif']
+        self.batch_size = max(1, batch_size)
+        self.decode_workers = max(1, decode_workers)
+        self.render_workers = max(1, render_workers)
+        self.save_dir = Path(save_dir) if save_dir else None
+        self.result_store = result_store
         self.is_running = False
         self.processed_count = 0
         self.error_count = 0
+        self._count_lock = threading.Lock()
+
+    def collect_image_files(self):
+        """遍历一次文件夹收集所有支持的图片（后缀不区分大小写），按路径排序"""
+        formats = {fmt.lower() for fmt in self.supported_formats}
+        return sorted(p for p in Path(self.folder_path).rglob('*')
+                      if p.suffix.lower() in formats and p.is_file())
 
     def run(self):
         self.is_running = True
+        self.processed_count = 0
+        self.error_count = 0
 
         try:
-            # 收集所有支持的图片文件
-            image_files = []
-            for fmt in self.supported_formats:
-                image_files.extend(Path(self.folder_path).rglob(f'*{fmt}'))
-                # image_files.extend(Path(self.folder_path).rglob(f'*{fmt.upper()}'))
-
+            image_files = self.collect_image_files()
             total_files = len(image_files)
             if total_files == 0:
                 self.status_changed.emit("文件夹中没有找到支持的图片格式")
@@ -56,47 +85,54 @@ class BatchDetectionThread(QThread):
                 return
 
             self.status_changed.emit(f"开始批量处理 {total_files} 个文件...")
+            if self.save_dir:
+                self.save_dir.mkdir(parents=True, exist_ok=True)
 
             # 获取类别名称
             class_names = list(self.model.names.values())
 
-            for i, img_path in enumerate(image_files):
-                if not self.is_running:
-                    break
-
-                self.current_file_changed.emit(str(img_path))
-
-                try:
-                    # 处理单个图片
-                    start_time = time.time()
-                    results = self.model(str(img_path), conf=self.confidence_threshold, verbose=False)
-                    end_time = time.time()
-
-                    # 获取原图
-                    original_img = cv2.imread(str(img_path))
-                    if original_img is not None:
-                        original_img = cv2.cvtColor(original_img, cv2.COLOR_BGR2RGB)
-
-                        # 获取结果图
-                        result_img = results[0].plot()
-                        result_img = cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB)
-
-                        self.result_ready.emit(str(img_path), original_img, result_img,
-                                               end_time - start_time, results, class_names)
-                        self.processed_count += 1
-
-                except Exception as e:
-                    self.error_occurred.emit(f"处理文件 {img_path.name} 时发生错误: {str(e)}")
-                    self.error_count += 1
-
-                # 更新进度
-                progress = int(((i + 1) / total_files) * 100)
-                self.progress_updated.emit(progress)
+            decode_pool = ThreadPoolExecutor(self.decode_workers, thread_name_prefix='batch-decode')
+            render_pool = ThreadPoolExecutor(self.render_workers, thread_name_prefix='batch-render')
+            pending_renders = deque()
+            start_time = time.time()
+            done = 0
+            try:
+                for batch in self._iter_decoded_batches(decode_pool, image_files):
+                    if not self.is_running:
+                        break
 
-                # 状态更新
-                if (i + 1) % 10 == 0 or i == total_files - 1:
-                    self.status_changed.emit(
-                        f"处理进度: {i + 1}/{total_files} (成功: {self.processed_count}, 错误: {self.error_count})")
+                    self.current_file_changed.emit(str(batch[0][0]))
+                    valid = [(path, img) for path, img in batch if img is not None]
+                    for path, img in batch:
+                        if img is None:
+                            self._report_error(f"处理文件 {path.name} 时发生错误: 无法读取图片")
+
+                    if valid:
+                        try:
+                            # 整批一次推理，耗时按张数均摊
+                            t0 = time.time()
+                            results = self.model([img for _, img in valid], conf=self.confidence_threshold,
+                                                 verbose=False)
+                            per_image_time = (time.time() - t0) / len(valid)
+                        except Exception as e:
+                            for path, _ in valid:
+                                self._report_error(f"处理文件 {path.name} 时发生错误: {str(e)}")
+                        else:
+                            for (path, img), result in zip(valid, results):
+                                pending_renders.append(render_pool.submit(
+                                    self._render_result, path, img, result, per_image_time, class_names))
+
+                    # 待绘制的结果不超过两批，避免绘制跟不上时结果在内存中堆积
+                    while len(pending_renders) > self.batch_size * 2:
+                        pending_renders.popleft().result()
+
+                    done += len(batch)
+                    self._report_progress(done, total_files, time.time() - start_time)
+            finally:
+                decode_pool.shutdown(wait=True, cancel_futures=True)
+                render_pool.shutdown(wait=True)
+            # 绘制全部完成后再报告一次，成功/错误计数为最终结果
+            self._report_progress(done, total_files, time.time() - start_time)
 
         except Exception as e:
             self.error_occurred.emit(f"批量处理发生错误: {str(e)}")
@@ -104,27 +140,101 @@ class BatchDetectionThread(QThread):
             self.is_running = False
             # self.finished.emit()
 
+    def _iter_decoded_batches(self, decode_pool, image_files):
+        """按顺序产出解码好的批次 [(路径, BGR图或None), ...]，最多提前解码两批"""
+        futures = deque()
+        file_iter = iter(image_files)
+        prefetch = self.batch_size * 3
+
+        def fill():
+            while len(futures) < prefetch and self.is_running:
+                path = next(file_iter, None)
+                if path is None:
+                    return
+                futures.append((path, decode_pool.submit(cv2.imread, str(path))))
+
+        fill()
+        while futures:
+            batch = []
+            while futures and len(batch) < self.batch_size:
+                path, future = futures.popleft()
+                batch.append((path, future.result()))
+            fill()
+            yield batch
+
+    def _render_result(self, path, original_img, result, inference_time, class_names):
+        """绘制结果图、可选保存，并发送结果（在绘制线程池中执行）"""
+        try:
+            result_img = result.plot()
+            if self.save_dir:
+                cv2.imwrite(str(self.save_dir / f"{path.stem}_result{path.suffix}"), result_img)
+
+            if self.result_store is not None:
+                self.result_stored.emit(self.result_store.add(path, original_img, result_img, inference_time,
+                                                              result, class_names))
+            else:
+                self.result_ready.emit(str(path), cv2.cvtColor(original_img, cv2.COLOR_BGR2RGB),
+                                       cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB),
+                                       inference_time, [result], class_names)
+            with self._count_lock:
+                self.processed_count += 1
+        except Exception as e:
+            self._report_error(f"处理文件 {path.name} 时发生错误: {str(e)}")
+
+    def _report_error(self, message):
+        with self._count_lock:
+            self.error_count += 1
+        self.error_occurred.emit(message)
+
+    def _report_progress(self, done, total_files, elapsed):
+        """每批更新一次进度、速度和预计剩余时间"""
+        self.progress_updated.emit(int(done / total_files * 100))
+        speed = done / elapsed if elapsed > 0 else 0.0
+        eta = (total_files - done) / speed if speed > 0 else 0.0
+        self.status_changed.emit(
+            f"处理进度: {done}/{total_files} (成功: {self.processed_count}, 错误: {self.error_count}) "
+            f"{speed:.1f} 张/秒, 预计剩余 {int(eta // 60)}分{int(eta % 60):02d}秒")
+
     def stop(self):
         """停止批量检测"""
         self.is_running = False
 
 
-
 class MultiCameraMonitorThread(QThread):
+    """
+    多摄像头监控线程
+
+    每个摄像头一个 CameraGrabber 采集线程，只保留最新帧；本线程作为调度器，
+    把到期摄像头的最新帧合成一批，一次调用模型推理，并按各摄像头的目标帧率限速。
+    断线重连由 ReconnectSupervisor 负责，各摄像头的健康状态定期通过 camera_health 发送。
+    """
     camera_result_ready = Signal(int, object, object, float, object, list)
     camera_error        = Signal(int, str)
     camera_status       = Signal(int, str)
+    camera_health       = Signal(int, dict)
     finished            = Signal()
 
-    def __init__(self, model, camera_ids, conf=0.25, fps=10):
+    def __init__(self, model, camera_ids, conf=0.25, fps=10, capture_factory=None, health_interval=1.0):
+        """
+        Args:
+            fps: 每个摄像头的目标检测帧率；也可以是 {摄像头ID: 帧率} 字典，未列出的摄像头按10帧
+            capture_factory: 打开摄像头的函数，默认 open_camera_capture；测试时可返回 VideoFileCamera
+            health_interval: 发送健康状态的间隔（秒）
+        """
         super().__init__()
         self.model   = model
         self.cam_ids = camera_ids
         self.conf    = conf
-        self.period  = 1.0 / fps                # 帧间隔
-        self.caps    = {}                       # {id: cv2.VideoCapture}
-        self.active  = {}                       # {id: bool} 是否在线
-        self.last_t  = {}                       # {id: float}
+        if isinstance(fps, dict):
+            self.periods = {cid: 1.0 / fps.get(cid, 10) for cid in camera_ids}
+        else:
+            self.periods = {cid: 1.0 / fps for cid in camera_ids}   # 帧间隔
+        self.capture_factory = capture_factory or open_camera_capture
+        self.health_interval = health_interval
+        self.supervisor = None
+        self.grabbers = {}                      # {id: CameraGrabber}
+        self.last_t   = {}                      # {id: float} 上次送检时间
+        self.last_seq = {}                      # {id: int} 上次送检的帧序号
 
         # 线程同步
         self._run_flag   = True
@@ -134,28 +244,31 @@ class MultiCameraMonitorThread(QThread):
 
     # ----------------- 生命周期 -----------------
     def run(self):
-        self._open_all()
-        if not self.caps:
-            self.finished.emit()
-            return
-
+        self._start_grabbers()
         cls_names = list(self.model.names.values())
+        last_health_t = 0.0
 
-        while self._run_flag:
-            self._pause_mutex.lock()
-            if self._paused_flag:
-                self._pause_cond.wait(self._pause_mutex)
-            self._pause_mutex.unlock()
-
-            for cid in list(self.caps.keys()):
-                if not self._run_flag:
-                    break
-                if not self._grab_and_infer(cid, cls_names):
-                    self._reconnect_later(cid)      # 断线后异步重连
-            self.msleep(10)
-
-        self._close_all()
-        self.finished.emit()
+        try:
+            while self._run_flag:
+                now = time.time()
+                if now - last_health_t >= self.health_interval:
+                    last_health_t = now
+                    for cid, health in self.get_health().items():
+                        self.camera_health.emit(cid, health)
+
+                self._pause_mutex.lock()
+                if self._paused_flag:
+                    self._pause_cond.wait(self._pause_mutex)
+                self._pause_mutex.unlock()
+
+                batch = self._collect_due_frames()
+                if not batch:
+                    self.msleep(5)
+                    continue
+                self._infer_batch(batch, cls_names)
+        finally:
+            self._stop_grabbers()
+            self.finished.emit()
 
     def stop(self):
         self._run_flag = False
@@ -174,77 +287,68 @@ class MultiCameraMonitorThread(QThread):
         self._pause_cond.wakeAll()
 
     # ----------------- 私有工具 -----------------
-    def _open_all(self):
-        for cid in self.cam_ids:
-            cap = cv2.VideoCapture(cid, cv2.CAP_DSHOW)
-            if cap.isOpened():
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                cap.set(cv2.CAP_PROP_FPS, 30)
-                self.caps[cid] = cap
-                self.active[cid] = True
-                self.last_t[cid] = 0.0
-                self.camera_status.emit(cid, "已连接")
-            else:
-                self.camera_error.emit(cid, "无法打开")
-                cap.release()
-
-    def _close_all(self):
-        for cap in self.caps.values():
-            cap.release()
-        self.caps.clear()
-
-    def _grab_and_infer(self, cid, cls_names):
-        cap = self.caps.get(cid)
-        if not cap or not cap.isOpened():
-            return False
-
-        # 读帧非阻塞：先 grab 再 retrieve
-        if not cap.grab():
-            return False
-
+    def get_health(self):
+        """各摄像头当前的健康状态 {id: dict}"""
         now = time.time()
-        if now - self.last_t[cid] < self.period:
-            return True   # 未超时，但帧已 grab，避免堆积
-        self.last_t[cid] = now
-
-        ret, frame = cap.retrieve()
-        if not ret:
-            return False
+        return {cid: grabber.health.snapshot(now) for cid, grabber in list(self.grabbers.items())}
 
+    def _start_grabbers(self):
+        # 每个摄像头最多占用一个探测线程，卡住的打开操作不会挤占其他摄像头
+        self.supervisor = ReconnectSupervisor(self.capture_factory, max_workers=len(self.cam_ids))
+        self.supervisor.start()
+        for cid in self.cam_ids:
+            grabber = CameraGrabber(cid, self.supervisor,
+                                    on_status=self.camera_status.emit, on_error=self.camera_error.emit)
+            self.grabbers[cid] = grabber
+            self.last_t[cid] = 0.0
+            self.last_seq[cid] = 0
+            grabber.start()
+
+    def _stop_grabbers(self):
+        self.supervisor.stop()
+        for grabber in self.grabbers.values():
+            grabber.stop()
+        # 采集线程可能正卡在读取上，最多等待一会儿，之后由其自行退出
+        for grabber in self.grabbers.values():
+            grabber.join(timeout=1.0)
+        self.grabbers.clear()
+
+    def _collect_due_frames(self):
+        """收集已到检测时间且有新帧的摄像头 [(id, 帧), ...]"""
+        now = time.time()
+        batch = []
+        for cid, grabber in self.grabbers.items():
+            if now - self.last_t[cid] < self.periods[cid]:
+                continue
+            latest = grabber.latest(self.last_seq[cid])
+            if latest is None:
+                continue
+            self.last_seq[cid], frame = latest
+            self.last_t[cid] = now
+            batch.append((cid, frame))
+        return batch
+
+    def _infer_batch(self, batch, cls_names):
+        """所有摄像头的最新帧一次推理"""
         try:
             t0 = time.time()
-            results = self.model(frame, conf=self.conf, verbose=False)
-            infer_ms = (time.time() - t0) * 1000
-            out_img = results[0].plot()
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            rgb_out   = cv2.cvtColor(out_img, cv2.COLOR_BGR2RGB)
-            self.camera_result_ready.emit(cid, rgb_frame, rgb_out,
-                                          infer_ms/1000.0, results, cls_names)
-            return True
+            results = self.model([frame for _, frame in batch], conf=self.conf, verbose=False)
+            infer_s = time.time() - t0
         except Exception as e:
-            self.camera_error.emit(cid, f"推理异常: {e}")
-            return False
-
-    def _reconnect_later(self, cid):
-        # 简单策略：5 秒后重试
-        if self.active.get(cid) is False:
+            for cid, _ in batch:
+                self.camera_error.emit(cid, f"推理异常: {e}")
             return
-        self.active[cid] = False
-        self.camera_status.emit(cid, "重连中…")
-        threading.Timer(5.0, lambda: self._try_reopen(cid)).start()
-
-    def _try_reopen(self, cid):
-        if cid in self.caps:
-            self.caps[cid].release()
-        cap = cv2.VideoCapture(cid)
-        if cap.isOpened():
-            self.caps[cid] = cap
-            self.active[cid] = True
-            self.camera_status.emit(cid, "已重连")
-        else:
-            cap.release()
-            self._reconnect_later(cid)
+
+        for (cid, frame), result in zip(batch, results):
+            try:
+                out_img = result.plot()
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                rgb_out   = cv2.cvtColor(out_img, cv2.COLOR_BGR2RGB)
+                self.camera_result_ready.emit(cid, rgb_frame, rgb_out, infer_s, [result], cls_names)
+            except Exception as e:
+                self.camera_error.emit(cid, f"推理异常: {e}")
+
+
 class ModelSelectionDialog(QDialog):
     """模型选择对话框"""
 
@@ -453,6 +557,7 @@ class MonitoringWidget(QWidget):
         self.monitor_history_dir.mkdir(exist_ok=True)
         self.current_memory_usage = 0  # MB
         self.max_memory_limit = 500  # MB
+        self.record_storage = None   # RecordStorageIndex，开始自动保存时创建
         
         self.init_ui()
 
@@ -656,6 +761,7 @@ class MonitoringWidget(QWidget):
         self.monitoring_thread = MultiCameraMonitorThread(self.current_model, camera_ids)
         self.monitoring_thread.camera_result_ready.connect(self.update_camera_display)
         self.monitoring_thread.camera_error.connect(self.handle_camera_error)
+        self.monitoring_thread.camera_health.connect(self.update_camera_health)
         self.monitoring_thread.finished.connect(self.on_monitoring_finished)
 
         self.monitoring_thread.start()
@@ -921,6 +1027,26 @@ class MonitoringWidget(QWidget):
             self.camera_labels[camera_id]['status'].setText(f"错误: {error_msg}")
             self.camera_labels[camera_id]['status'].setStyleSheet("color: red; font-size: 10px;")
 
+    def update_camera_health(self, camera_id, health):
+        """显示摄像头健康状态：在线时放在状态标签的提示里，断线时直接显示重连信息"""
+        if camera_id not in self.camera_labels:
+            return
+        status_label = self.camera_labels[camera_id]['status']
+        age = health['last_frame_age']
+        status_label.setToolTip(
+            f"采集帧率: {health['fps']:.1f} FPS\n"
+            f"最新帧: {'无' if age is None else f'{age:.1f} 秒前'}\n"
+            f"重连次数: {health['reconnect_count']}")
+
+        if health['state'] == 'online':
+            status_label.setStyleSheet("color: #7f8c8d; font-size: 10px;")
+        else:
+            retry_in = health['next_retry_in']
+            state_text = "重连中" if health['state'] == 'reconnecting' else "连接中"
+            status_label.setText(f"状态: {state_text} (失败 {health['failed_attempts']} 次"
+                                 f"{'' if retry_in is None else f', {retry_in:.0f} 秒后重试'})")
+            status_label.setStyleSheet("color: #e67e22; font-size: 10px;")
+
     def on_monitoring_finished(self):
         """监控结束"""
         self.start_monitor_btn.setEnabled(True)
@@ -956,6 +1082,11 @@ class MonitoringWidget(QWidget):
         
         self.is_auto_saving = True
         self.max_memory_limit = self.memory_limit_spinbox.value()
+        # 只在第一次启动时扫描目录，之后按保存的记录增量统计
+        if self.record_storage is None:
+            self.record_storage = RecordStorageIndex(self.monitor_history_dir, self.max_memory_limit)
+        else:
+            self.record_storage.set_quota(self.max_memory_limit)
         
         self.auto_save_btn.setText("⏹️ 停止自动保存")
 
@@ -965,6 +1096,17 @@ class MonitoringWidget(QWidget):
         
         QMessageBox.information(self, "成功", "自动保存监控快照已启动")
     
+    def discard_record(self, json_path):
+        """快照在别处被删除后，从存储占用统计中移除"""
+        if self.record_storage is not None:
+            self.record_storage.discard(json_path)
+    
+    def close_record_storage(self):
+        """停止存储清理线程（窗口关闭时调用）"""
+        if self.record_storage is not None:
+            self.record_storage.close()
+            self.record_storage = None
+    
     def stop_auto_save(self):
         """停止自动保存监控快照"""
         self.is_auto_saving = False
@@ -1003,56 +1145,118 @@ class MonitoringWidget(QWidget):
         if camera_id not in self.camera_recorders:
             self.camera_recorders[camera_id] = CameraVideoRecorder(
                 camera_id, camera_name, self.monitor_history_dir,
-                self.recording_fps_spinbox.value()
+                self.recording_fps_spinbox.value(), on_saved=self.record_storage.add
             )
             # 开始录制
             self.camera_recorders[camera_id].start_recording()
         
         # 添加帧到录制器
         self.camera_recorders[camera_id].add_frame(frame, detection_info)
-        
-        # 检查内存使用情况
-        self.check_memory_usage()
-    
-    def check_memory_usage(self):
-        """检查内存使用情况，超过限制时清理最旧的记录"""
-        # 计算当前内存使用
-        total_size = 0
-        for json_file in self.monitor_history_dir.glob("*.json"):
-            mp4_file = json_file.with_suffix('.mp4')
-            if mp4_file.exists():
-                total_size += mp4_file.stat().st_size
-        
-        current_usage_mb = total_size / (1024 * 1024)
-        
-        if current_usage_mb > self.max_memory_limit:
-            # 删除最旧的记录
-            self.cleanup_oldest_records()
-    
-    def cleanup_oldest_records(self):
-        """清理最旧的记录"""
-        json_files = list(self.monitor_history_dir.glob("*.json"))
-        if not json_files:
-            return
-        
-        # 按修改时间排序，删除最旧的
-        json_files.sort(key=lambda x: x.stat().st_mtime)
-        
-        for json_file in json_files[:len(json_files)//4]:  # 删除25%的最旧记录
-            mp4_file = json_file.with_suffix('.mp4')
+
+
+class RecordStorageIndex:
+    """
+    监控快照存储占用统计
+
+    启动时扫描一次目录，之后每保存一条记录只累加它的文件大小，并按保存顺序维护记录索引；
+    超出配额时由后台线程从最旧的记录开始删除，删到不超过配额为止
+    """
+
+    def __init__(self, directory, quota_mb):
+        self.directory = Path(directory)
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self._records = OrderedDict()   # {json路径: 记录字节数}，旧 -> 新
+        self._total_bytes = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._scan()
+
+        self._worker = threading.Thread(target=self._evict_loop, daemon=True, name="record-evictor")
+        self._worker.start()
+
+    @property
+    def usage_mb(self):
+        return self._total_bytes / (1024 * 1024)
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, json_path, mp4_path=None):
+        """登记一条新保存的记录（json和同名mp4）"""
+        json_path = Path(json_path)
+        size = self._record_size(json_path)
+        with self._cond:
+            self._total_bytes += size - self._records.pop(json_path, 0)
+            self._records[json_path] = size
+            if self._total_bytes > self.quota_bytes:
+                self._cond.notify()
+
+    def discard(self, json_path):
+        """移除一条已在别处删除的记录（如在快照界面中手动删除），不再计入占用"""
+        with self._cond:
+            self._total_bytes -= self._records.pop(Path(json_path), 0)
+
+    def set_quota(self, quota_mb):
+        with self._cond:
+            self.quota_bytes = int(quota_mb * 1024 * 1024)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _scan(self):
+        """启动时扫描一次目录，按json修改时间从旧到新建立索引"""
+        entries = []
+        for json_file in self.directory.glob("*.json"):
             try:
-                if json_file.exists():
-                    json_file.unlink()
-                if mp4_file.exists():
-                    mp4_file.unlink()
-            except Exception as e:
-                print(f"清理文件失败 {json_file}: {e}")
+                entries.append((json_file.stat().st_mtime, json_file))
+            except OSError:
+                continue
+        for _, json_file in sorted(entries):
+            size = self._record_size(json_file)
+            self._records[json_file] = size
+            self._total_bytes += size
+
+    def _evict_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and (self._total_bytes <= self.quota_bytes or not self._records):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                json_path, size = self._records.popitem(last=False)
+                self._total_bytes -= size
+
+            # 删除文件在锁外进行，不阻塞新记录的登记
+            for path in (json_path, json_path.with_suffix('.mp4')):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass    # 已在快照界面中手动删除
+                except Exception as e:
+                    print(f"清理文件失败 {path}: {e}")
+
+    @staticmethod
+    def _record_size(json_path):
+        size = 0
+        for path in (json_path, json_path.with_suffix('.mp4')):
+            try:
+                size += path.stat().st_size
+            except OSError:
+                pass
+        return size
 
 
 class CameraVideoRecorder:
     """摄像头视频录制器"""
     
-    def __init__(self, camera_id, camera_name, output_dir, fps=20):
+    def __init__(self, camera_id, camera_name, output_dir, fps=20, on_saved=None):
+        """
+        Args:
+            on_saved: 每保存一段录制后调用 on_saved(json路径, mp4路径)，用于存储占用统计
+        """
         self.camera_id = camera_id
         self.camera_name = camera_name
         self.output_dir = output_dir
@@ -1065,6 +1269,7 @@ class CameraVideoRecorder:
         self.start_time = None
         self.end_time = None
         self.max_frames_per_file = fps * 30  # 30秒的视频
+        self.on_saved = on_saved
         
     def start_recording(self):
         """开始录制"""
@@ -1174,6 +1379,9 @@ class CameraVideoRecorder:
         print(f"文件路径: {self.mp4_path}")
         print(f"JSON路径: {self.json_path}")
 
+        if self.on_saved:
+            self.on_saved(self.json_path, self.mp4_path)
+
 
 class VideoWidget(QWidget):
     """自定义视频显示组件，带控制功能"""
@@ -1948,6 +2156,7 @@ class EnhancedMonitoringWidget(QWidget):
 
 class SnapshotWidget(QWidget):
     """监控快照组件 - 用于显示和回放已保存的监控快照"""
+    snapshot_deleted = Signal(str)  # 被删除快照的json路径
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -2557,6 +2766,7 @@ class SnapshotWidget(QWidget):
                 # 删除MP4和JSON文件
                 Path(snapshot['mp4_path']).unlink()
                 Path(snapshot['json_path']).unlink()
+                self.snapshot_deleted.emit(snapshot['json_path'])
                 
                 # 从列表中移除
                 self.snapshots.pop(self.current_snapshot_index)
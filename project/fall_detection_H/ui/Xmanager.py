@@ -20,6 +20,9 @@ import os
 import cv2
 import time
 import json
+import shutil
+import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
@@ -536,6 +539,176 @@ class ModelManager:
             return "Unknown"
 
 
+class BatchResultStore:
+    """
+    批量检测结果存储
+
+    原图/结果图的缩略图和原尺寸结果图写入磁盘，每张图片的检测摘要写入SQLite索引，
+    界面按页读取，内存占用与批量图片数量无关。add() 可在多个线程中同时调用。
+    """
+
+    THUMB_SIZE = 960
+    COMMIT_INTERVAL = 50  # 每写入多少条记录提交一次
+
+    def __init__(self, root_dir, thumb_size=THUMB_SIZE):
+        self.root_dir = Path(root_dir)
+        self.thumb_dir = self.root_dir / "thumbs"
+        self.result_dir = self.root_dir / "results"
+        self.thumb_dir.mkdir(parents=True, exist_ok=True)
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        self.thumb_size = thumb_size
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root_dir / "index.db"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "id INTEGER PRIMARY KEY, file_key TEXT, file_path TEXT, inference_time REAL, "
+            "object_count INTEGER, class_counts TEXT, min_conf REAL, max_conf REAL, mean_conf REAL)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        self._next_key = self._count
+        self._uncommitted = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, file_path, original_img, result_img, inference_time, result, class_names):
+        """
+        写入一张图片的检测结果
+
+        Args:
+            file_path: 图片路径
+            original_img: 原图 (BGR)
+            result_img: 结果图 (BGR)
+            inference_time: 推理耗时（秒）
+            result: 该图片的ultralytics检测结果
+            class_names: 类别名称列表
+
+        Returns:
+            结果记录字典（不含图片），index 为记录的序号
+        """
+        with self._lock:
+            file_key = f"{self._next_key:07d}"
+            self._next_key += 1
+
+        # 图片编码在锁外进行，多个线程可同时写入
+        cv2.imwrite(str(self.thumb_dir / f"{file_key}_orig.jpg"), self._thumbnail(original_img))
+        cv2.imwrite(str(self.thumb_dir / f"{file_key}_result.jpg"), self._thumbnail(result_img))
+        cv2.imwrite(str(self.result_dir / f"{file_key}.jpg"), result_img)
+
+        record = {'file_key': file_key, 'file_path': str(file_path), 'inference_time': inference_time}
+        record.update(self._summarize(result, class_names))
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO results (file_key, file_path, inference_time, object_count, class_counts, "
+                "min_conf, max_conf, mean_conf) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_key, record['file_path'], inference_time, record['object_count'],
+                 json.dumps(record['class_counts'], ensure_ascii=False),
+                 record['min_conf'], record['max_conf'], record['mean_conf']))
+            record['index'] = cursor.lastrowid - 1
+            self._count += 1
+            self._uncommitted += 1
+            if self._uncommitted >= self.COMMIT_INTERVAL:
+                self._conn.commit()
+                self._uncommitted = 0
+        return record
+
+    def page(self, offset, limit):
+        """按序号读取一页记录"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, file_key, file_path, inference_time, object_count, class_counts, "
+                "min_conf, max_conf, mean_conf FROM results WHERE id > ? ORDER BY id LIMIT ?",
+                (offset, limit)).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def iter_records(self, page_size=500):
+        """逐页遍历所有记录"""
+        offset = 0
+        while True:
+            records = self.page(offset, page_size)
+            if not records:
+                return
+            yield from records
+            offset += len(records)
+
+    def summary(self):
+        """返回 (图片数量, 目标总数)"""
+        with self._lock:
+            count, total_objects = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(object_count), 0) FROM results").fetchone()
+        return count, total_objects
+
+    def load_images(self, record):
+        """读取一条记录的原图和结果图缩略图 (RGB)"""
+        images = []
+        for suffix in ('orig', 'result'):
+            img = cv2.imread(str(self.thumb_dir / f"{record['file_key']}_{suffix}.jpg"))
+            images.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if img is not None else None)
+        return tuple(images)
+
+    def result_image_path(self, record):
+        """原尺寸结果图路径"""
+        return self.result_dir / f"{record['file_key']}.jpg"
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def clear(self):
+        """关闭并删除全部结果文件"""
+        with self._lock:
+            self._conn.close()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    @staticmethod
+    def remove_stale_runs(parent_dir):
+        """删除 parent_dir 下遗留的批量结果目录（如程序异常退出时未清理的）"""
+        parent_dir = Path(parent_dir)
+        if not parent_dir.is_dir():
+            return
+        for run_dir in parent_dir.glob("batch_*"):
+            if run_dir.is_dir():
+                shutil.rmtree(run_dir, ignore_errors=True)
+
+    def _thumbnail(self, img):
+        height, width = img.shape[:2]
+        scale = self.thumb_size / max(height, width)
+        if scale >= 1:
+            return img
+        return cv2.resize(img, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _summarize(result, class_names):
+        """检测结果摘要：目标数量、类别统计和置信度范围"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return {'object_count': 0, 'class_counts': {}, 'min_conf': None, 'max_conf': None, 'mean_conf': None}
+
+        confidences = boxes.conf.cpu().numpy()
+        class_counts = {}
+        for cls in boxes.cls.cpu().numpy().astype(int):
+            class_name = class_names[cls] if cls < len(class_names) else f"类别{cls}"
+            class_counts[class_name] = class_counts.get(class_name, 0) + 1
+        return {'object_count': len(confidences), 'class_counts': class_counts,
+                'min_conf': float(np.min(confidences)), 'max_conf': float(np.max(confidences)),
+                'mean_conf': float(np.mean(confidences))}
+
+    @staticmethod
+    def _row_to_record(row):
+        keys = ('index', 'file_key', 'file_path', 'inference_time', 'object_count', 'class_counts',
+                'min_conf', 'max_conf', 'mean_conf')
+        record = dict(zip(keys, row))
+        record['index'] -= 1
+        record['class_counts'] = json.loads(record['class_counts'])
+        return record
+
+
 class DetectionThread(QThread):
     """增强的检测线程"""
     result_ready = Signal(object, object, float, object, list)  # 原图, 结果图, 耗时, 检测结果, 类别名称
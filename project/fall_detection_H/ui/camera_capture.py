@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+摄像头采集模块
+打开摄像头、用视频文件模拟摄像头、单摄像头采集线程、断线重连管理和健康状态，不依赖Qt
+"""
+import os
+import sys
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import time
+
+
+def open_camera_capture(camera_id):
+    """
+    打开摄像头；Windows下的摄像头索引使用DirectShow，视频文件/网络流使用默认后端
+
+    本地视频文件不是实时源，用 VideoFileCamera 按文件帧率读取并循环播放，
+    否则采集线程会以解码速度读到结尾并占满一个CPU核
+    """
+    if isinstance(camera_id, (str, os.PathLike)) and os.path.isfile(camera_id):
+        return VideoFileCamera(camera_id)
+    if isinstance(camera_id, int) and sys.platform == 'win32':
+        cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
+    else:
+        cap = cv2.VideoCapture(camera_id)
+    if cap.isOpened() and isinstance(camera_id, int):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        cap.set(cv2.CAP_PROP_FPS, 30)
+    return cap
+
+
+class VideoFileCamera:
+    """
+    用视频文件模拟摄像头，便于在没有硬件时测试监控和重连；监控源为本地视频文件时也用它按帧率读取
+
+    按视频帧率节流读取，播放到结尾后从头循环；disconnect_after 帧后 read() 失败，模拟设备掉线。
+    文件不存在时 isOpened() 为False，模拟无法打开的设备。
+    """
+
+    def __init__(self, path, fps=None, disconnect_after=None):
+        self._cap = cv2.VideoCapture(str(path))
+        source_fps = self._cap.get(cv2.CAP_PROP_FPS) if self._cap.isOpened() else 0
+        self.period = 1.0 / (fps or source_fps or 25)
+        self.disconnect_after = disconnect_after
+        self.frames_read = 0
+        self._next_t = time.time()
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def read(self):
+        if self.disconnect_after is not None and self.frames_read >= self.disconnect_after:
+            return False, None
+        delay = self._next_t - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_t = max(self._next_t + self.period, time.time())
+
+        ret, frame = self._cap.read()
+        if not ret:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        if ret:
+            self.frames_read += 1
+        return ret, frame
+
+    def release(self):
+        self._cap.release()
+
+
+class CameraHealth:
+    """单个摄像头的健康状态（线程安全）"""
+
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.state = 'connecting'       # connecting / online / reconnecting
+        self.fps = 0.0                  # 实际采集帧率（帧间隔指数滑动平均的倒数）
+        self._frame_interval = 0.0
+        self.last_frame_time = None
+        self.reconnect_count = 0        # 成功重连次数
+        self.failed_attempts = 0        # 当前连续打开失败次数
+        self.next_retry_time = None
+        self._interval_start = None     # 计算帧间隔的起点，(重新)连接后重置，断线时长不计入帧率
+        self._lock = threading.Lock()
+
+    def connected(self, reconnected):
+        """摄像头（重新）连接成功"""
+        with self._lock:
+            self.state = 'online'
+            self.failed_attempts = 0
+            self.next_retry_time = None
+            self.reconnect_count += int(reconnected)
+            self.fps = 0.0
+            self._frame_interval = 0.0
+            self._interval_start = None
+
+    def frame_received(self, now):
+        with self._lock:
+            if self._interval_start is not None and now > self._interval_start:
+                # 平均帧间隔而不是瞬时帧率，避免追帧时的极短间隔把帧率拉高
+                interval = now - self._interval_start
+                self._frame_interval = (interval if self._frame_interval == 0
+                                        else 0.9 * self._frame_interval + 0.1 * interval)
+                self.fps = 1.0 / self._frame_interval
+            self._interval_start = now
+            self.last_frame_time = now
+
+    def update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def snapshot(self, now=None):
+        """返回状态字典：state, fps, last_frame_age, reconnect_count, failed_attempts, next_retry_in"""
+        now = now or time.time()
+        with self._lock:
+            online = self.state == 'online'
+            return {
+                'state': self.state,
+                'fps': round(self.fps, 1) if online else 0.0,
+                'last_frame_age': None if self.last_frame_time is None else round(now - self.last_frame_time, 2),
+                'reconnect_count': self.reconnect_count,
+                'failed_attempts': self.failed_attempts,
+                'next_retry_in': None if self.next_retry_time is None or online
+                else round(max(0.0, self.next_retry_time - now), 1)
+            }
+
+
+class ReconnectSupervisor(threading.Thread):
+    """
+    摄像头重连管理线程
+
+    断线的摄像头登记到这里，按指数退避加随机抖动的时间重新打开；打开操作在独立的探测线程中执行，
+    每个摄像头同一时间最多一个探测，打开卡住的设备不会影响其他摄像头的采集和重连。
+    """
+
+    def __init__(self, capture_factory, base_delay=1.0, max_delay=30.0, jitter=0.3, max_workers=4):
+        """
+        Args:
+            capture_factory: 打开摄像头的函数，capture_factory(camera_id) -> VideoCapture
+            base_delay: 第一次重试的等待时间（秒）
+            max_delay: 重试等待时间上限（秒）
+            jitter: 随机抖动比例，等待时间在 [1-jitter, 1+jitter] 倍之间浮动，避免多个摄像头同时重试
+            max_workers: 探测线程数
+        """
+        super().__init__(daemon=True, name="camera-reconnect")
+        self.capture_factory = capture_factory
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._pending = {}      # {id: (到期时间, CameraGrabber)}
+        self._probing = set()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max(1, max_workers), thread_name_prefix='camera-probe')
+
+    def backoff_delay(self, failed_attempts):
+        """第 failed_attempts 次失败后的等待时间"""
+        delay = min(self.max_delay, self.base_delay * (2 ** failed_attempts))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def request(self, grabber, immediate=False):
+        """登记需要（重新）打开的摄像头"""
+        with self._cond:
+            cid = grabber.camera_id
+            if self._stopped or cid in self._pending or cid in self._probing:
+                return
+            delay = 0.0 if immediate else self.backoff_delay(grabber.health.failed_attempts)
+            due = time.time() + delay
+            self._pending[cid] = (due, grabber)
+            grabber.health.update(next_retry_time=due)
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.time()
+                due = [cid for cid, (t, _) in self._pending.items() if t <= now]
+                if not due:
+                    timeout = min((t for t, _ in self._pending.values()), default=now + 1.0) - now
+                    self._cond.wait(timeout)
+                    continue
+                grabbers = [self._pending.pop(cid)[1] for cid in due]
+                self._probing.update(due)
+
+            for grabber in grabbers:
+                try:
+                    self._executor.submit(self._probe, grabber)
+                except RuntimeError:
+                    return  # 已停止
+
+    def _probe(self, grabber):
+        """尝试打开一次摄像头（在探测线程中执行，可能阻塞）"""
+        cap = None
+        try:
+            cap = self.capture_factory(grabber.camera_id)
+            opened = cap.isOpened()
+        except Exception:
+            opened = False
+
+        with self._cond:
+            self._probing.discard(grabber.camera_id)
+            stopped = self._stopped
+
+        if opened and not stopped:
+            grabber.attach(cap)
+            return
+        if cap is not None:
+            cap.release()
+        if not stopped:
+            grabber.probe_failed()
+            self.request(grabber)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify()
+        # 卡在打开操作上的探测线程不等待，结束后自行退出
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CameraGrabber(threading.Thread):
+    """
+    单个摄像头的采集线程
+
+    持续读取摄像头，只保留最新一帧，读取卡住或断线只影响本摄像头；
+    打开和重连交给 ReconnectSupervisor，本线程只负责读帧
+    """
+
+    def __init__(self, camera_id, supervisor, on_status=None, on_error=None):
+        super().__init__(daemon=True, name=f"camera-grabber-{camera_id}")
+        self.camera_id = camera_id
+        self.supervisor = supervisor
+        self.on_status = on_status or (lambda cid, msg: None)
+        self.on_error = on_error or (lambda cid, msg: None)
+        self.health = CameraHealth(camera_id)
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_seq = 0      # 每读到一帧加1，调度器据此判断是否有新帧
+        self._attached_cap = None
+        self._attached = threading.Event()
+        self._connected_before = False
+        self._stop_event = threading.Event()
+
+    def attach(self, cap):
+        """由重连管理线程调用，交付已打开的摄像头"""
+        with self._lock:
+            if self._stop_event.is_set():
+                cap.release()
+                return
+            self._attached_cap = cap
+        self._attached.set()
+
+    def probe_failed(self):
+        """由重连管理线程调用，记录一次打开失败"""
+        self.health.update(failed_attempts=self.health.failed_attempts + 1,
+                           state='reconnecting' if self._connected_before else 'connecting')
+        if not self._connected_before and self.health.failed_attempts == 1:
+            self.on_error(self.camera_id, "无法打开")
+
+    def run(self):
+        cap = None
+        self.supervisor.request(self, immediate=True)
+        try:
+            while not self._stop_event.is_set():
+                if cap is None:
+                    if not self._attached.wait(0.2):
+                        continue
+                    with self._lock:
+                        cap, self._attached_cap = self._attached_cap, None
+                        self._attached.clear()
+                    self.health.connected(self._connected_before)
+                    self.on_status(self.camera_id, "已重连" if self._connected_before else "已连接")
+                    self._connected_before = True
+
+                ret, frame = cap.read()
+                if not ret:
+                    # 断线：释放后交给重连管理线程，本线程等待新的连接
+                    cap.release()
+                    cap = None
+                    self.health.update(state='reconnecting')
+                    self.on_status(self.camera_id, "重连中…")
+                    self.supervisor.request(self)
+                    continue
+
+                with self._lock:
+                    self._frame = frame
+                    self._frame_seq += 1
+                self.health.frame_received(time.time())
+        finally:
+            if cap is not None:
+                cap.release()
+            with self._lock:
+                if self._attached_cap is not None:
+                    self._attached_cap.release()
+                    self._attached_cap = None
+
+    def latest(self, after_seq=0):
+        """返回 (帧序号, 帧)；没有比 after_seq 更新的帧时返回 None"""
+        with self._lock:
+            if self._frame is None or self._frame_seq <= after_seq:
+                return None
+            return self._frame_seq, self._frame
+
+    def stop(self):
+        self._stop_event.set()
@@ -10,6 +10,7 @@ import os
 import cv2
 import time
 import json
+import shutil
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
@@ -20,7 +21,7 @@ from PySide6.QtGui import *
 import numpy as np
 
 # 导入自定义模块
-from Xmanager import StyleManager, CameraManager, ModelManager, DetectionThread, YOLO
+from Xmanager import StyleManager, CameraManager, ModelManager, DetectionThread, BatchResultStore, YOLO
 from Components import (BatchDetectionThread, DetectionResultWidget,
                         ModelSelectionDialog, MonitoringWidget, VideoWidget, EnhancedMonitoringWidget, SnapshotWidget)
 
@@ -36,7 +37,12 @@ class EnhancedDetectionUI(QMainWindow):
         self.current_source_type = 'image'
         self.current_source_path = None
         self.confidence_threshold = 0.25
-        self.batch_results = []
+        # 批量结果保存在磁盘上，界面只缓存当前一页记录
+        self.batch_store = None
+        self.batch_page = []
+        self.batch_page_offset = 0
+        self.batch_page_size = 50
+        self.batch_count = 0
         self.current_batch_index = 0
 
         # 快照相关属性
@@ -285,11 +291,12 @@ class EnhancedDetectionUI(QMainWindow):
         self.tab_widget.addTab(batch_tab, "📊 批量结果")
 
         # 监控页面标签页
-        monitor_tab = MonitoringWidget(self.model_manager, self.camera_manager)
-        self.tab_widget.addTab(monitor_tab, "🖥️ 实时监控")
+        self.monitor_widget = MonitoringWidget(self.model_manager, self.camera_manager)
+        self.tab_widget.addTab(self.monitor_widget, "🖥️ 实时监控")
         
-        # 监控快照标签页
+        # 监控快照标签页；手动删除的快照同步从监控页的存储占用统计中移除
         self.snapshot_widget = SnapshotWidget()
+        self.snapshot_widget.snapshot_deleted.connect(self.monitor_widget.discard_record)
         self.tab_widget.addTab(self.snapshot_widget, "🎬 监控快照")
         
         layout.addWidget(self.tab_widget)
@@ -654,14 +661,20 @@ class EnhancedDetectionUI(QMainWindow):
 
     def start_batch_detection(self):
         """开始批量检测"""
-        self.batch_results.clear()
+        self.clear_batch_results()
+        # 批量结果只在本次会话中浏览，需要保留时通过"保存结果"导出；清理之前异常退出遗留的目录
+        BatchResultStore.remove_stale_runs(self.history_dir / "batch")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.batch_store = BatchResultStore(self.history_dir / "batch" / f"batch_{timestamp}")
 
         self.batch_detection_thread = BatchDetectionThread(
-            self.model, self.current_source_path, self.confidence_threshold
+            self.model, self.current_source_path, self.confidence_threshold, result_store=self.batch_store
         )
-        self.batch_detection_thread.result_ready.connect(self.on_batch_result)
+        self.batch_detection_thread.result_stored.connect(self.on_batch_result)
         self.batch_detection_thread.progress_updated.connect(self.progress_bar.setValue)
-        self.batch_detection_thread.current_file_changed.connect(self.statusBar().showMessage)
+        # 状态栏显示每批的进度、速度和预计剩余时间
+        self.batch_detection_thread.status_changed.connect(self.statusBar().showMessage)
+        self.batch_detection_thread.error_occurred.connect(self.log_message)
         self.batch_detection_thread.finished.connect(self.on_batch_finished)
 
         self.update_detection_ui_state(True)
@@ -702,6 +715,7 @@ class EnhancedDetectionUI(QMainWindow):
         if self.batch_detection_thread and self.batch_detection_thread.is_running:
             self.batch_detection_thread.stop()
             self.batch_detection_thread.wait()
+            self.batch_store.flush()
 
         self.on_detection_finished()
 
@@ -780,33 +794,23 @@ class EnhancedDetectionUI(QMainWindow):
         else:
             self.log_message(f"⚪ 未检测到目标 (耗时: {inference_time:.3f}s)")
 
-    def on_batch_result(self, file_path, original_img, result_img, inference_time, results, class_names):
-        """批量检测结果回调"""
-        # 计算目标数量
-        object_count = len(results[0].boxes) if results and results[0].boxes else 0
-
-        # 保存结果
-        result_data = {
-            'file_path': file_path,
-            'original_img': original_img,
-            'result_img': result_img,
-            'inference_time': inference_time,
-            'results': results,
-            'class_names': class_names,
-            'object_count': object_count
-        }
-
-        self.batch_results.append(result_data)
+    def on_batch_result(self, record):
+        """批量检测结果回调（record 为 BatchResultStore 中的结果记录，不含图片）"""
+        self.batch_count = max(self.batch_count, record['index'] + 1)
 
         # 显示第一个结果
-        if len(self.batch_results) == 1:
+        if self.batch_count == 1:
             self.current_batch_index = 0
             self.show_batch_result(0)
+        else:
+            self.result_index_label.setText(f"{self.current_batch_index + 1}/{self.batch_count}")
 
         self.update_batch_navigation()
 
         # 记录日志
-        filename = Path(file_path).name
+        filename = Path(record['file_path']).name
+        object_count = record['object_count']
+        inference_time = record['inference_time']
         if object_count > 0:
             self.log_message(f"✅ {filename}: {object_count} 个目标 ({inference_time:.3f}s)")
         else:
@@ -814,15 +818,17 @@ class EnhancedDetectionUI(QMainWindow):
 
     def on_batch_finished(self):
         """批量检测完成"""
-        total_count = len(self.batch_results)
-        total_objects = sum(result['object_count'] for result in self.batch_results)
+        self.batch_store.flush()
+        total_count, total_objects = self.batch_store.summary()
+        self.batch_count = total_count
 
         self.log_message(f"🎉 批量检测完成! 处理了 {total_count} 张图片，检测到 {total_objects} 个目标")
         self.statusBar().showMessage(f"批量检测完成 - {total_count} 张图片，{total_objects} 个目标")
 
         self.save_results_btn.setEnabled(True)
         self.clear_results_btn.setEnabled(True)
-        self.result_index_label.setText(f"1/{len(self.batch_results)}")
+        self.result_index_label.setText(f"{self.current_batch_index + 1}/{total_count}")
+        self.update_batch_navigation()
         self.on_detection_finished()
 
     def on_detection_finished(self):
@@ -835,38 +841,44 @@ class EnhancedDetectionUI(QMainWindow):
         if self.video_is_auto_saving:
             self.stop_auto_save()
 
+    def get_batch_record(self, index):
+        """读取第 index 条批量结果，不在当前缓存页时从磁盘加载所在的页"""
+        page_offset = index - index % self.batch_page_size
+        if page_offset != self.batch_page_offset or index - page_offset >= len(self.batch_page):
+            self.batch_page = self.batch_store.page(page_offset, self.batch_page_size)
+            self.batch_page_offset = page_offset
+        if index - page_offset < len(self.batch_page):
+            return self.batch_page[index - page_offset]
+        return None
+
     def show_batch_result(self, index):
         """显示批量结果"""
-        if 0 <= index < len(self.batch_results):
-            result = self.batch_results[index]
-
-            self.display_image(result['original_img'], self.batch_original_label)
-            self.display_image(result['result_img'], self.batch_result_label)
-
-            filename = Path(result['file_path']).name
-            object_count = result['object_count']
-            inference_time = result['inference_time']
+        if self.batch_store is None or not 0 <= index < self.batch_count:
+            return
+        result = self.get_batch_record(index)
+        if result is None:
+            return
 
-            info_text = f"📁 文件: {filename}\n"
-            info_text += f"🎯 检测目标: {object_count} 个\n"
-            info_text += f"⏱️ 推理耗时: {inference_time:.3f} 秒\n"
+        original_img, result_img = self.batch_store.load_images(result)
+        self.display_image(original_img, self.batch_original_label)
+        self.display_image(result_img, self.batch_result_label)
 
-            if result['results'] and result['results'][0].boxes and len(result['results'][0].boxes) > 0:
-                # 显示类别统计
-                classes = result['results'][0].boxes.cls.cpu().numpy().astype(int)
-                confidences = result['results'][0].boxes.conf.cpu().numpy()
+        filename = Path(result['file_path']).name
+        object_count = result['object_count']
+        inference_time = result['inference_time']
 
-                class_counts = {}
-                for cls in classes:
-                    class_name = result['class_names'][cls] if cls < len(result['class_names']) else f"类别{cls}"
-                    class_counts[class_name] = class_counts.get(class_name, 0) + 1
+        info_text = f"📁 文件: {filename}\n"
+        info_text += f"🎯 检测目标: {object_count} 个\n"
+        info_text += f"⏱️ 推理耗时: {inference_time:.3f} 秒\n"
 
-                info_text += "📊 类别统计: " + ", ".join(
-                    [f"{name}:{count}" for name, count in class_counts.items()]) + ""
-                info_text += f"🎯 平均置信度: {np.mean(confidences):.3f}"
+        if object_count > 0:
+            # 显示类别统计
+            info_text += "📊 类别统计: " + ", ".join(
+                [f"{name}:{count}" for name, count in result['class_counts'].items()]) + ""
+            info_text += f"🎯 平均置信度: {result['mean_conf']:.3f}"
 
-            self.batch_info_label.setText(info_text)
-            self.result_index_label.setText(f"{index + 1}/{len(self.batch_results)}")
+        self.batch_info_label.setText(info_text)
+        self.result_index_label.setText(f"{index + 1}/{self.batch_count}")
 
     def show_prev_result(self):
         """显示上一个结果"""
@@ -877,19 +889,25 @@ class EnhancedDetectionUI(QMainWindow):
 
     def show_next_result(self):
         """显示下一个结果"""
-        if self.current_batch_index < len(self.batch_results) - 1:
+        if self.current_batch_index < self.batch_count - 1:
             self.current_batch_index += 1
             self.show_batch_result(self.current_batch_index)
             self.update_batch_navigation()
 
     def update_batch_navigation(self):
         """更新批量结果导航"""
-        has_results = len(self.batch_results) > 0
+        has_results = self.batch_count > 0
         self.prev_result_btn.setEnabled(has_results and self.current_batch_index > 0)
-        self.next_result_btn.setEnabled(has_results and self.current_batch_index < len(self.batch_results) - 1)
+        self.next_result_btn.setEnabled(has_results and self.current_batch_index < self.batch_count - 1)
 
     def clear_batch_results(self):
-        self.batch_results.clear()
+        if self.batch_store is not None:
+            self.batch_store.clear()
+            self.batch_store = None
+        self.batch_page = []
+        self.batch_page_offset = 0
+        self.batch_count = 0
+        self.current_batch_index = 0
         self.batch_result_label.setText('🎯 批量检测: 结果图')
         self.batch_original_label.setText('📷 批量检测: 原图')
         self.batch_info_label.setText('📁 选择文件夹开始批量检测...')
@@ -902,7 +920,7 @@ class EnhancedDetectionUI(QMainWindow):
 
     def save_batch_results(self):
         """保存批量检测结果"""
-        if not self.batch_results:
+        if self.batch_store is None or self.batch_count == 0:
             QMessageBox.information(self, "提示", "没有可保存的结果")
             return
 
@@ -916,12 +934,11 @@ class EnhancedDetectionUI(QMainWindow):
             result_dir = save_path / f"detection_results_{timestamp}"
             result_dir.mkdir(exist_ok=True)
 
-            # 保存检测结果图片
-            for i, result in enumerate(self.batch_results):
+            # 复制原尺寸检测结果图片
+            for result in self.batch_store.iter_records():
                 file_name = Path(result['file_path']).stem
-                result_img = cv2.cvtColor(result['result_img'], cv2.COLOR_RGB2BGR)
                 result_save_path = result_dir / f"{file_name}_result.jpg"
-                cv2.imwrite(str(result_save_path), result_img)
+                shutil.copyfile(self.batch_store.result_image_path(result), result_save_path)
 
             # 保存检测报告
             self.save_detection_report(result_dir)
@@ -942,30 +959,23 @@ class EnhancedDetectionUI(QMainWindow):
             f.write("=" * 60 + "\n")
             f.write(f"📅 处理时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write(f"🎚️ 置信度阈值: {self.confidence_threshold}\n")
-            f.write(f"📂 处理图片数量: {len(self.batch_results)}\n")
-            f.write(f"🎯 总检测目标数: {sum(r['object_count'] for r in self.batch_results)}\n")
+            total_count, total_objects = self.batch_store.summary()
+            f.write(f"📂 处理图片数量: {total_count}\n")
+            f.write(f"🎯 总检测目标数: {total_objects}\n")
             f.write("\n📊 详细结果:\n")
             f.write("-" * 60 + "\n")
 
-            for i, result in enumerate(self.batch_results, 1):
+            for i, result in enumerate(self.batch_store.iter_records(), 1):
                 f.write(f"{i}. 📁 {Path(result['file_path']).name}\n")
                 f.write(f"   🎯 检测目标: {result['object_count']} 个\n")
                 f.write(f"   ⏱️ 推理耗时: {result['inference_time']:.3f} 秒\n")
 
-                if result['results'] and result['results'][0].boxes and len(result['results'][0].boxes) > 0:
-                    confidences = result['results'][0].boxes.conf.cpu().numpy()
-                    classes = result['results'][0].boxes.cls.cpu().numpy().astype(int)
-
-                    f.write(f"   📈 置信度范围: {np.min(confidences):.3f} - {np.max(confidences):.3f}\n")
+                if result['object_count'] > 0:
+                    f.write(f"   📈 置信度范围: {result['min_conf']:.3f} - {result['max_conf']:.3f}\n")
 
                     # 类别统计
-                    class_counts = {}
-                    for cls in classes:
-                        class_name = result['class_names'][cls] if cls < len(result['class_names']) else f"类别{cls}"
-                        class_counts[class_name] = class_counts.get(class_name, 0) + 1
-
                     f.write("   📊 类别分布: " + ", ".join(
-                        [f"{name}:{count}" for name, count in class_counts.items()]) + "\n")
+                        [f"{name}:{count}" for name, count in result['class_counts'].items()]) + "\n")
 
                 f.write("\n")
 
@@ -1011,6 +1021,17 @@ class EnhancedDetectionUI(QMainWindow):
         self.log_text.clear()
         self.log_message("🗑️ 日志已清除")
 
+    def closeEvent(self, event):
+        """关闭窗口时停止批量检测并删除本次的批量结果，停止监控快照的存储清理线程"""
+        if self.batch_detection_thread and self.batch_detection_thread.is_running:
+            self.batch_detection_thread.stop()
+            self.batch_detection_thread.wait()
+        if self.batch_store is not None:
+            self.batch_store.clear()
+            self.batch_store = None
+        self.monitor_widget.close_record_storage()
+        super().closeEvent(event)
+
     def create_enhanced_icon(self, size=64):
         """创建增强的应用图标"""
         icon = QIcon()
@@ -0,0 +1,124 @@
+"""
+摄像头采集测试
+用 VideoFileCamera 代替真实摄像头驱动 CameraGrabber 和 ReconnectSupervisor，检查断线重连计数、
+重连等待时间的抖动范围，以及一个摄像头打开卡住时其他摄像头的采集帧率不受影响；
+检查本地视频文件作为监控源时按文件帧率读取
+
+用法:
+    python -m pytest test_camera_capture.py
+"""
+
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from camera_capture import open_camera_capture, VideoFileCamera, CameraGrabber, ReconnectSupervisor
+
+
+def _write_video(path, num_frames=50, width=64, height=48):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 25, (width, height))
+    rng = np.random.default_rng(0)
+    for _ in range(num_frames):
+        writer.write(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_reconnect_after_disconnect(tmp_path):
+    video_path = _write_video(tmp_path / "cam.avi")
+    opened = []
+
+    def factory(camera_id):
+        cap = VideoFileCamera(video_path, fps=100, disconnect_after=10)
+        opened.append(cap)
+        return cap
+
+    supervisor = ReconnectSupervisor(factory, base_delay=0.05, max_delay=0.2)
+    grabber = CameraGrabber(0, supervisor)
+    supervisor.start()
+    grabber.start()
+    try:
+        assert _wait_until(lambda: grabber.health.reconnect_count >= 2)
+    finally:
+        grabber.stop()
+        supervisor.stop()
+        grabber.join(2)
+
+    # 每次掉线前都读满 disconnect_after 帧，之后由重连管理线程重新打开
+    assert len(opened) >= 3
+    assert all(cap.frames_read == 10 for cap in opened[:-1])
+    assert grabber.latest() is not None
+    assert grabber.health.failed_attempts == 0
+
+
+def test_backoff_delay_within_jitter_bounds():
+    supervisor = ReconnectSupervisor(lambda camera_id: None, base_delay=0.5, max_delay=8.0, jitter=0.3)
+    for failed_attempts in range(8):
+        delay = min(8.0, 0.5 * (2 ** failed_attempts))
+        samples = [supervisor.backoff_delay(failed_attempts) for _ in range(200)]
+        assert all(delay * 0.7 <= s <= delay * 1.3 for s in samples)
+        # 抖动确实生效，不是固定值
+        assert max(samples) - min(samples) > delay * 0.1
+
+
+def test_healthy_camera_keeps_fps_while_other_open_hangs(tmp_path):
+    video_path = _write_video(tmp_path / "cam.avi")
+    release_hung = threading.Event()
+
+    def factory(camera_id):
+        if camera_id == 'hung':
+            # 模拟驱动卡住的设备：打开操作长时间不返回，最终也打不开
+            release_hung.wait(10)
+            return VideoFileCamera(tmp_path / "missing.avi")
+        return VideoFileCamera(video_path, fps=50)
+
+    supervisor = ReconnectSupervisor(factory, base_delay=0.05, max_delay=0.2, max_workers=2)
+    healthy = CameraGrabber('healthy', supervisor)
+    hung = CameraGrabber('hung', supervisor)
+    supervisor.start()
+    hung.start()
+    healthy.start()
+    try:
+        assert _wait_until(lambda: healthy.health.snapshot()['state'] == 'online')
+        time.sleep(1.5)
+        healthy_status = healthy.health.snapshot()
+        hung_status = hung.health.snapshot()
+    finally:
+        release_hung.set()
+        healthy.stop()
+        hung.stop()
+        supervisor.stop()
+        healthy.join(2)
+        hung.join(2)
+
+    assert 40 <= healthy_status['fps'] <= 60
+    assert healthy_status['last_frame_age'] < 0.2
+    assert hung_status['state'] == 'connecting'
+    assert hung.latest() is None
+
+
+def test_file_source_paced_to_file_fps(tmp_path):
+    video_path = _write_video(tmp_path / "cam.avi", num_frames=20)
+    cap = open_camera_capture(video_path)
+    try:
+        assert cap.isOpened()
+        start = time.perf_counter()
+        for _ in range(11):
+            ret, frame = cap.read()
+            assert ret
+        elapsed = time.perf_counter() - start
+    finally:
+        cap.release()
+    # 25fps 的文件：读取11帧经过10个帧间隔
+    assert 0.35 <= elapsed < 1.0